@@ -1,12 +1,15 @@
 import tkinter as tk
 from tkinter import messagebox
-import requests
-import threading
 
 
 import os
+import sys
 from dotenv import load_dotenv
 
+# Shared Discord notifier lives in RFID Signin/common
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RFID Signin"))
+from common.notifier import DiscordNotifier, COALESCED, DROPPED
+
 load_dotenv()
 
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
@@ -17,37 +20,38 @@ DISCORD_MESSAGE = {
     "username": "Mr Doorbell"
 }
 
-def send_ping_background():
-    """Sends the request in a background thread to keep the GUI responsive."""
-    try:
-        if WEBHOOK_URL == "YOUR_WEBHOOK_URL_GOES_HERE" or WEBHOOK_URL == "":
-            status_label.config(text="Error: Config URL missing", fg="red")
-            messagebox.showerror("Configuration Error", "Please open the script and paste your Webhook URL.")
-            return
+def on_send_result(ok, detail, payload):
+    """Called from the notifier's worker thread; hand the result to the Tk loop."""
+    root.after(0, lambda: show_result(ok, detail))
 
-        status_label.config(text="Sending...", fg="orange")
-        
-        response = requests.post(WEBHOOK_URL, json=DISCORD_MESSAGE)
-        
-        if response.status_code == 204:
-            status_label.config(text="Message Sent!", fg="green")
-            root.after(2000, lambda: status_label.config(text="Ready"))
-        else:
-            status_label.config(text="Failed", fg="red")
-            messagebox.showerror("Error", f"Failed to send: {response.status_code}\n{response.text}")
-
-    except requests.exceptions.MissingSchema:
-        status_label.config(text="Config Error", fg="red")
-        messagebox.showerror("Configuration Error", "Invalid Webhook URL format.\nPlease check the URL in the script.")
-    except requests.exceptions.RequestException as e:
-        status_label.config(text="Network Error", fg="red")
-        messagebox.showerror("Network Error", f"Check your internet connection.\n{e}")
+def show_result(ok, detail):
+    if ok:
+        status_label.config(text="Message Sent!", fg="green")
+        root.after(2000, lambda: status_label.config(text="Ready", fg="gray"))
+    else:
+        status_label.config(text="Failed", fg="red")
+        messagebox.showerror("Error", f"Failed to send:\n{detail}")
+
+notifier = None
 
 def on_button_click():
-    """Wrapper to start the sending function in a thread."""
+    """Queues the ping; the notifier sends it in the background."""
+    global notifier
+    if not WEBHOOK_URL or WEBHOOK_URL == "YOUR_WEBHOOK_URL_GOES_HERE":
+        status_label.config(text="Error: Config URL missing", fg="red")
+        messagebox.showerror("Configuration Error", "Please set WEBHOOK_URL in the .env file.")
+        return
+    if notifier is None:
+        notifier = DiscordNotifier(WEBHOOK_URL, on_result=on_send_result)
+
     send_button.config(state="disabled")
-    
-    threading.Thread(target=send_ping_background, daemon=True).start()
+    result = notifier.notify(DISCORD_MESSAGE["content"], username=DISCORD_MESSAGE["username"])
+    if result == COALESCED:
+        status_label.config(text="Already sent, skipping repeat", fg="orange")
+    elif result == DROPPED:
+        status_label.config(text="Too many pings queued", fg="red")
+    else:
+        status_label.config(text="Sending...", fg="orange")
 
     root.after(1000, lambda: send_button.config(state="normal"))
 
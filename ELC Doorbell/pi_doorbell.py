@@ -1,7 +1,11 @@
-import requests
+import os
+import sys
 from gpiozero import Button
 from signal import pause
-import time
+
+# Shared Discord notifier lives in RFID Signin/common
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "RFID Signin"))
+from common.notifier import DiscordNotifier, COALESCED, DROPPED
 
 # Default is GPIO 17 (Physical Pin 11)
 BUTTON_PIN = 17
@@ -15,27 +19,27 @@ DISCORD_MESSAGE = {
     "username": "Mr Doorbell"
 }
 
+def report(ok, detail, payload):
+    if ok:
+        print("Message Sent Successfully!")
+    else:
+        print(f"Failed to send: {detail}")
+
+notifier = DiscordNotifier(WEBHOOK_URL, on_result=report)
+
 def send_ping():
-    """Sends the request to Discord when the button is pressed."""
+    """Queues the Discord message when the button is pressed; sent in the background."""
     print("Button pressed! Sending message...")
-    
-    try:
-        if WEBHOOK_URL == "YOUR_WEBHOOK_URL_GOES_HERE" or WEBHOOK_URL == "":
-            print("Error: Config URL missing. Please edit the script.")
-            return
-
-        response = requests.post(WEBHOOK_URL, json=DISCORD_MESSAGE)
-        
-        if response.status_code == 204:
-            print("Message Sent Successfully!")
-        else:
-            print(f"Failed to send: {response.status_code}")
-            print(response.text)
-
-    except requests.exceptions.MissingSchema:
-        print("Error: Invalid Webhook URL format.")
-    except requests.exceptions.RequestException as e:
-        print(f"Network Error: {e}")
+
+    if WEBHOOK_URL == "YOUR_WEBHOOK_URL_GOES_HERE" or WEBHOOK_URL == "":
+        print("Error: Config URL missing. Please edit the script.")
+        return
+
+    result = notifier.notify(DISCORD_MESSAGE["content"], username=DISCORD_MESSAGE["username"])
+    if result == COALESCED:
+        print("Same message was just sent; skipping the repeat.")
+    elif result == DROPPED:
+        print("Too many messages queued; dropped this one.")
 
 def main():
     print(f"Doorbell System Active.")
@@ -0,0 +1,95 @@
+"""
+Persistent UID -> card content cache.
+
+Reading a MIFARE card means select + authenticate + sector reads, which is
+the slowest part of a tap and the one that fails with auth errors. The
+anticollision step already yields the UID, so for a card we have seen (or
+written) before the content can come from here instead.
+
+Entries written through this server are trusted. Cards rewritten somewhere
+else are caught by the periodic verify: after VERIFY_EVERY cached hits, or
+VERIFY_SECONDS since the last full read, the next tap does a real read.
+"""
+import json
+import os
+import threading
+import time
+
+VERIFY_EVERY = 25
+VERIFY_SECONDS = 7 * 24 * 3600
+
+
+def uid_key(uid):
+    """ Anticoll returns a list of ints (4 UID bytes + BCC); key on the hex string """
+    return "".join(f"{b:02x}" for b in uid)
+
+
+class CardCache:
+    def __init__(self, path, verify_every=VERIFY_EVERY, verify_seconds=VERIFY_SECONDS):
+        self.path = path
+        self.verify_every = verify_every
+        self.verify_seconds = verify_seconds
+        self.lock = threading.Lock()
+        self.entries = {}  # uid_key -> {"data": str, "verified": epoch, "hits": int}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+            print(f"[CACHE] Loaded {len(self.entries)} known cards")
+        except FileNotFoundError:
+            self.entries = {}
+        except Exception as e:
+            print(f"[CACHE] Ignoring unreadable cache file: {e}")
+            self.entries = {}
+
+    def save(self):
+        """ Atomic write so a power cut mid-save can't corrupt the cache """
+        tmp_path = self.path + ".tmp"
+        try:
+            with self.lock:
+                snapshot = json.dumps(self.entries)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[CACHE] Save failed: {e}")
+
+    def lookup(self, uid):
+        """ Returns the cached content, or None if unknown or due for a verify read """
+        key = uid_key(uid)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry["hits"] >= self.verify_every or time.time() - entry["verified"] > self.verify_seconds:
+                return None
+            entry["hits"] += 1
+            return entry["data"]
+
+    def peek(self, uid):
+        """ Returns the cached content without counting a hit """
+        with self.lock:
+            entry = self.entries.get(uid_key(uid))
+            return entry["data"] if entry else None
+
+    def store(self, uid, data):
+        """ Records content that was just read from (or written to) the card """
+        key = uid_key(uid)
+        with self.lock:
+            old = self.entries.get(key)
+            changed = old is None or old["data"] != data
+            self.entries[key] = {"data": data, "verified": time.time(), "hits": 0}
+        if changed:
+            self.save()
+
+    def invalidate(self, uid):
+        key = uid_key(uid)
+        with self.lock:
+            removed = self.entries.pop(key, None) is not None
+        if removed:
+            self.save()
+
+    def __len__(self):
+        return len(self.entries)
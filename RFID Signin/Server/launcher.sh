@@ -53,18 +53,18 @@ while true; do
         echo "Skipping update check (offline)." | tee -a "$LOG_FILE"
     fi
 
-    # 2. Launch Server with Timeout
+    # 2. Launch Server
+    # The server supervises itself (reader re-init, socket re-bind) in process,
+    # so it only comes back here on a crash or a deliberate exit (code 3: memory growth or a stuck reader thread).
     if [ -f "$SERVER_SCRIPT" ]; then
-        echo "Starting Server with 6h timeout..." | tee -a "$LOG_FILE"
+        echo "Starting Server..." | tee -a "$LOG_FILE"
         
-        # Run python script with a 6-hour timeout (21600 seconds)
-        # We use 'timeout' command. It sends SIGTERM by default.
-        timeout --preserve-status 21600s python3 "$SERVER_SCRIPT"
+        python3 "$SERVER_SCRIPT"
         
         EXIT_CODE=$?
         
-        if [ $EXIT_CODE -eq 124 ]; then
-            echo "Server reached 6h time limit. Restarting..." | tee -a "$LOG_FILE"
+        if [ $EXIT_CODE -eq 3 ]; then
+            echo "Server requested a fresh process (memory growth or stuck reader). Restarting..." | tee -a "$LOG_FILE"
         else
             echo "Server exited (Code: $EXIT_CODE). Restarting in 5s..." | tee -a "$LOG_FILE"
             sleep 5
@@ -0,0 +1,133 @@
+"""
+Counters, gauges and latency histograms for the RFID server.
+
+Everything is kept in memory and read through Metrics.snapshot(), which
+backs both the {"action": "stats"} protocol command and the optional
+HTTP/JSON endpoint (GET /stats).
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 15000]
+
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is overflow
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(self.bounds) and ms > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, pct):
+        """ Upper bound of the bucket holding the pct-th observation """
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(float(self.bounds[i]), round(self.max, 2)) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max, 2),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.gauge_sources = {}  # name -> callable, evaluated at snapshot time
+
+    def incr(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def gauge_from(self, name, source):
+        """ Registers a live gauge (e.g. a queue's qsize) read on every snapshot """
+        self.gauge_sources[name] = source
+
+    def observe(self, name, seconds):
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.observe(seconds * 1000)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        live = {}
+        for name, source in list(self.gauge_sources.items()):
+            try:
+                live[name] = source()
+            except Exception as e:
+                live[name] = f"error: {e}"
+        with self.lock:
+            return {
+                "uptime_s": round(time.time() - self.started, 1),
+                "counters": dict(self.counters),
+                "gauges": {**self.gauges, **live},
+                "latency": {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+
+
+def start_http_endpoint(metrics, host, port):
+    """ Serves GET /stats as JSON on a daemon thread; returns the HTTP server """
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/stats"):
+                self.send_error(404)
+                return
+            body = json.dumps(metrics.snapshot(), indent=2).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the journal for real events
+
+    httpd = ThreadingHTTPServer((host, port), StatsHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"[METRICS] HTTP stats on http://{host}:{httpd.server_address[1]}/stats")
+    return httpd
@@ -0,0 +1,327 @@
+"""
+Card reader backends for the RFID server.
+
+RFIDServer only talks to the small interface below, so the whole server
+(and the protocol/client stack behind it) can run on a normal Linux box
+with SimulatedReader instead of the MFRC522 on the Pi.
+"""
+import json
+import random
+import threading
+import time
+
+from common.card_format import BLOCK_SIZE, DATA_BLOCKS, CAPACITY, blocks_needed, encode_card, parse_text
+
+BLOCK_BYTES = CAPACITY  # SimpleMFRC522 stores text in 3 blocks of 16 bytes
+DATA_BLOCK_ADDRS = (8, 9, 10)  # Sector 2, the blocks SimpleMFRC522 uses
+TRAILER_BLOCK = 11
+RAW_IO_TIMEOUT = 3.0  # Seconds read_raw/write_raw keep retrying for a card before giving up
+
+
+class CardReader:
+    """ Interface every reader backend implements """
+
+    def version(self):
+        """ Returns the chip version register (0x00 / 0xFF means not wired up) """
+        raise NotImplementedError
+
+    def detect(self):
+        """ Returns the UID (list of ints) of a card in the field, or None """
+        raise NotImplementedError
+
+    def read(self):
+        """ Full sector read of the card in the field -> (id, text) """
+        raise NotImplementedError
+
+    def write(self, text):
+        """ Writes text to the card in the field -> (id, text actually written) """
+        raise NotImplementedError
+
+    def read_raw(self, timeout=RAW_IO_TIMEOUT):
+        """ Reads only the data blocks the card's content needs -> (id, bytes). Raises if it takes longer than timeout """
+        raise NotImplementedError
+
+    def write_raw(self, data, timeout=RAW_IO_TIMEOUT):
+        """ Writes bytes to the card's data blocks, zero padded -> (id, bytes written). Raises after timeout """
+        raise NotImplementedError
+
+    def reinit(self):
+        """ Resets the chip in place after it stopped responding """
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class MFRC522Reader(CardReader):
+    """ The real RC522 on the Pi's SPI bus """
+
+    def __init__(self):
+        # Imported here so the rest of the server loads without Pi libraries
+        import RPi.GPIO as GPIO
+        from mfrc522 import SimpleMFRC522
+        self.GPIO = GPIO
+        self.simple = SimpleMFRC522()
+
+    def version(self):
+        return self.simple.READER.Read_MFRC522(0x37)
+
+    def detect(self):
+        try:
+            reader = self.simple.READER
+            (status, TagType) = reader.MFRC522_Request(reader.PICC_REQIDL)
+            if status != reader.MI_OK: return None
+            (status, uid) = reader.MFRC522_Anticoll()
+            if status != reader.MI_OK: return None
+            return uid
+        except:
+            return None
+
+    def read(self):
+        return self.simple.read()
+
+    def write(self, text):
+        return self.simple.write(text)
+
+    def read_raw(self, timeout=RAW_IO_TIMEOUT):
+        return self._retry(self._read_blocks, timeout)
+
+    def write_raw(self, data, timeout=RAW_IO_TIMEOUT):
+        data = bytes(data[:BLOCK_BYTES]).ljust(BLOCK_BYTES, b"\x00")
+        return self._retry(lambda reader: self._write_blocks(reader, data), timeout)
+
+    def _retry(self, action, timeout):
+        """
+        Retries until a card is selected, like SimpleMFRC522's loops, but
+        gives up after timeout so the hardware thread always comes back
+        to its loop (and notices a supervisor restart).
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            id, result = self._with_sector(action)
+            if id:
+                return id, result
+            if time.monotonic() > deadline:
+                raise Exception("No card selected (card removed?)")
+
+    def _with_sector(self, action):
+        """ Selects the card in the field and authenticates its data sector, like SimpleMFRC522 does """
+        reader = self.simple.READER
+        (status, TagType) = reader.MFRC522_Request(reader.PICC_REQIDL)
+        if status != reader.MI_OK: return None, None
+        (status, uid) = reader.MFRC522_Anticoll()
+        if status != reader.MI_OK: return None, None
+        id = self.simple.uid_to_num(uid)
+        reader.MFRC522_SelectTag(uid)
+        try:
+            status = reader.MFRC522_Auth(reader.PICC_AUTHENT1A, TRAILER_BLOCK, self.simple.KEY, uid)
+            if status != reader.MI_OK:
+                raise Exception("AUTH ERROR!! Authentication failed")
+            return id, action(reader)
+        finally:
+            reader.MFRC522_StopCrypto1()
+
+    def _read_blocks(self, reader):
+        data = b""
+        for i, block_num in enumerate(DATA_BLOCK_ADDRS):
+            if i and i >= blocks_needed(data[:BLOCK_SIZE]):
+                break
+            block = reader.MFRC522_Read(block_num)
+            if block is None:
+                raise Exception(f"Read error on block {block_num}")
+            data += bytes(block)
+        return data
+
+    def _write_blocks(self, reader, data):
+        for i, block_num in enumerate(DATA_BLOCK_ADDRS):
+            reader.MFRC522_Write(block_num, list(data[i * BLOCK_SIZE:(i + 1) * BLOCK_SIZE]))
+        return data
+
+    def reinit(self):
+        # Soft reset + antenna/timer configuration, same sequence as at construction
+        self.simple.READER.MFRC522_Init()
+
+    def cleanup(self):
+        self.GPIO.cleanup()
+
+
+class SimulatedReader(CardReader):
+    """
+    Plays back a scripted tap schedule.
+
+    Each tap is {"at": seconds after start, "uid": [5 ints], "data": "card text"
+    (or "card": fields to store as a version 1 record), "hold": seconds on
+    the reader, "auth_fail": bool}. Cards keep their data
+    between taps, and writes change it, like real cards. read_latency and
+    write_latency add (mean, jitter) delays; error_rate / auth_error_rate
+    make reads fail at random.
+    """
+
+    def __init__(self, taps=None, read_latency=(0.0, 0.0), write_latency=(0.0, 0.0),
+                 error_rate=0.0, auth_error_rate=0.0, version=0x92, seed=None):
+        self.taps = sorted(taps or [], key=lambda t: t["at"])
+        self.read_latency = read_latency
+        self.write_latency = write_latency
+        self.error_rate = error_rate
+        self.auth_error_rate = auth_error_rate
+        self.chip_version = version
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.cards = {}  # uid tuple -> stored bytes (legacy text is space padded, like SimpleMFRC522 writes it)
+        for tap in self.taps:
+            if "card" in tap:
+                content = encode_card(tap["card"]).ljust(BLOCK_BYTES, b"\x00")
+            else:
+                content = tap.get("data", "").encode("ascii", "replace").ljust(BLOCK_BYTES)
+            self.cards.setdefault(tuple(tap["uid"]), content[:BLOCK_BYTES])
+        self.start_time = time.monotonic()
+        self.index = 0
+        self.last_tap = None  # Most recent tap seen by detect(), for load test bookkeeping
+        self.stats = {"detects": 0, "reads": 0, "blocks_read": 0, "writes": 0, "errors": 0, "reinits": 0}
+        self.faulted = False  # A faulted chip reads version 0x00 and sees no cards until reinit()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """ Loads {"taps": [...], ...options} from a JSON schedule file """
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        options = {k: v for k, v in spec.items() if k != "taps"}
+        for key in ("read_latency", "write_latency"):
+            if key in options:
+                options[key] = tuple(options[key])
+        options.update(kwargs)
+        return cls(spec.get("taps", []), **options)
+
+    @staticmethod
+    def random_taps(count, rate, cards=50, hold=0.3, seed=None, compact=False):
+        """ Builds a schedule of `count` taps arriving at `rate` taps/second (version 1 cards if compact) """
+        rng = random.Random(seed)
+        pool = []
+        for i in range(cards):
+            uid = [rng.randrange(256) for _ in range(4)]
+            uid.append(uid[0] ^ uid[1] ^ uid[2] ^ uid[3])  # BCC, like real anticoll output
+            pool.append((uid, f"user{i},First{i},Last{i},False"))
+        taps = []
+        at = 0.0
+        for _ in range(count):
+            at += rng.expovariate(rate)
+            uid, data = rng.choice(pool)
+            tap = {"at": round(at, 4), "uid": uid, "hold": hold}
+            if compact:
+                tap["card"] = parse_text(data)
+            else:
+                tap["data"] = data
+            taps.append(tap)
+        return taps
+
+    def restart_clock(self):
+        with self.lock:
+            self.start_time = time.monotonic()
+            self.index = 0
+
+    def finished(self):
+        with self.lock:
+            self._advance(time.monotonic() - self.start_time)
+            return self.index >= len(self.taps)
+
+    def _advance(self, now):
+        while self.index < len(self.taps):
+            tap = self.taps[self.index]
+            if now <= tap["at"] + tap.get("hold", 0.5):
+                break
+            self.index += 1
+
+    def _current_tap(self):
+        now = time.monotonic() - self.start_time
+        self._advance(now)
+        if self.index < len(self.taps):
+            tap = self.taps[self.index]
+            if tap["at"] <= now:
+                return tap
+        return None
+
+    def _delay(self, latency):
+        mean, jitter = latency
+        if mean or jitter:
+            time.sleep(max(0.0, self.random.gauss(mean, jitter)))
+
+    def inject_fault(self):
+        """ Simulates the chip dropping off the SPI bus (brown-out, loose wire) """
+        self.faulted = True
+
+    def reinit(self):
+        self.faulted = False
+        self.stats["reinits"] += 1
+
+    def version(self):
+        return 0x00 if self.faulted else self.chip_version
+
+    def detect(self):
+        if self.faulted:
+            return None
+        with self.lock:
+            tap = self._current_tap()
+            self.stats["detects"] += 1
+            if tap:
+                self.last_tap = tap
+        return list(tap["uid"]) if tap else None
+
+    def _tap_for(self, stat):
+        """ The tap in the field for a read/write, or the simulated failure (lock held) """
+        tap = self._current_tap()
+        self.stats[stat] += 1
+        if tap is None:
+            self.stats["errors"] += 1
+            raise Exception("No card in field")
+        if tap.get("auth_fail") or self.random.random() < self.auth_error_rate:
+            self.stats["errors"] += 1
+            raise Exception("AUTH ERROR!! Authentication failed")
+        return tap
+
+    def read(self):
+        self._delay(self.read_latency)
+        with self.lock:
+            tap = self._tap_for("reads")
+            if self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                raise Exception("Read error (simulated)")
+            self.stats["blocks_read"] += DATA_BLOCKS
+            data = self.cards.get(tuple(tap["uid"]), b"")
+        return self._uid_number(tap["uid"]), data.decode("latin-1").ljust(BLOCK_BYTES)[:BLOCK_BYTES]
+
+    def read_raw(self, timeout=RAW_IO_TIMEOUT):
+        with self.lock:
+            tap = self._current_tap()
+            data = self.cards.get(tuple(tap["uid"]), b"") if tap else b""
+        # read_latency is for all data blocks; reading fewer costs proportionally less
+        blocks = blocks_needed(data[:BLOCK_SIZE])
+        mean, jitter = self.read_latency
+        self._delay((mean * blocks / DATA_BLOCKS, jitter * blocks / DATA_BLOCKS))
+        with self.lock:
+            tap = self._tap_for("reads")
+            data = self.cards.get(tuple(tap["uid"]), b"")[:blocks * BLOCK_SIZE]
+            self.stats["blocks_read"] += blocks
+            if self.random.random() < self.error_rate:
+                # A misread block comes back as garbage rather than an error
+                self.stats["errors"] += 1
+                data = bytes(self.random.randrange(256) for _ in range(BLOCK_SIZE)) + data[BLOCK_SIZE:]
+        return self._uid_number(tap["uid"]), data
+
+    def write(self, text):
+        id, written = self.write_raw(text[:BLOCK_BYTES].encode("ascii", "replace").ljust(BLOCK_BYTES))
+        return id, written.decode("latin-1")
+
+    def write_raw(self, data, timeout=RAW_IO_TIMEOUT):
+        self._delay(self.write_latency)
+        with self.lock:
+            tap = self._tap_for("writes")
+            written = bytes(data[:BLOCK_BYTES]).ljust(BLOCK_BYTES, b"\x00")
+            self.cards[tuple(tap["uid"])] = written
+        return self._uid_number(tap["uid"]), written
+
+    @staticmethod
+    def _uid_number(uid):
+        n = 0
+        for b in uid:
+            n = n * 256 + b
+        return n
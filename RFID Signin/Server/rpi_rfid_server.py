@@ -1,31 +1,69 @@
 #!/usr/bin/env python3
+import argparse
 import socket
 import threading
-import json
 import time
 import sys
-import queue
 import os
 
-# --- Hardware Imports ---
-import RPi.GPIO as GPIO
-from mfrc522 import SimpleMFRC522
+# Make the shared 'common' package (RFID Signin/common) importable
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.protocol import (
+    MessageDecoder, RECV_SIZE, HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, HEARTBEAT_TICK,
+    encode_message, encode_batch, hello_message, is_hello, recv_messages, enable_keepalive
+)
+from common.discovery import DISCOVERY_PORT, DiscoveryResponder, announce_message
+from common.card_format import CardFormatError, decode_card, encode_write, payload
+
+from card_cache import CardCache, uid_key
+from metrics import Metrics, start_http_endpoint
+from supervisor import Supervisor
+from reader import MFRC522Reader, SimulatedReader
+from write_jobs import WriteJobQueue, QUEUED, WAITING, WRITING, DONE, FAILED, TIMEOUT, CANCELLED
 
 # --- Configuration ---
 HOST = '0.0.0.0'
 PORT = 65432
+CARD_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_cache.json")
+WRITE_SETTLE = 5  # Seconds a freshly written card is ignored, so leaving it on the reader isn't a sign-in
+READER_CHECK_INTERVAL = 30  # Seconds between version register reads from the hardware loop
 
 class RFIDServer:
-    def __init__(self):
+    def __init__(self, reader=None, host=HOST, port=PORT, cache_file=CARD_CACHE_FILE,
+                 name=None, discovery_port=DISCOVERY_PORT):
         self.running = True
+        self.host = host
+        self.port = port
+        self.name = name or socket.gethostname()
+        self.discovery_port = discovery_port  # None: don't answer discovery probes
+        self.discovery = None
         self.client_socket = None
+        self.client_caps = set()
+        self.last_rx = self.last_tx = 0.0
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = HEARTBEAT_TIMEOUT
         self.lock = threading.Lock()
-        self.command_queue = queue.Queue()
-        self.reader = SimpleMFRC522()
+        self.write_jobs = WriteJobQueue()
+        self.active_job = None
+        self.settling = None  # (uid_key, until) of the card we just wrote
+        self.hw_generation = 0  # Bumped to retire a hardware loop thread
+        self.hw_heartbeat = 0.0  # Monotonic time of the hardware loop's last pass
+        self.reader_version = None  # Last version register value (None: read failed)
+        self.reader_checked = 0.0
+        self.accept_errors = 0  # Consecutive accept() failures
+        self.accept_generation = 0  # Bumped to retire an accept loop thread
+        self.ready = threading.Event()
+        self.scan_cooldown = 2  # Seconds to ignore the reader after a successful tap
+        self.reader = reader if reader is not None else MFRC522Reader()
+        self.card_cache = CardCache(cache_file)
+        self.metrics = Metrics()
+        self.metrics.gauge_from("write_queue_depth", self.write_jobs.qsize)
+        self.metrics.gauge_from("cached_cards", lambda: len(self.card_cache))
+        self.metrics.set_gauge("clients", 0)
 
     def check_hardware_connection(self):
         try:
-            version = self.reader.READER.Read_MFRC522(0x37)
+            version = self.reader.version()
             print(f"[STARTUP] MFRC522 Version: {hex(version)}")
             if version == 0x00 or version == 0xFF:
                 return False, f"Invalid Version {hex(version)} (Check Wiring!)"
@@ -37,6 +75,15 @@ class RFIDServer:
             return False, str(e)
 
     def start(self):
+        self.start_components()
+        try:
+            self.accept_loop()
+        except KeyboardInterrupt:
+            self.stop()
+            sys.exit(0)
+
+    def start_components(self):
+        """ Hardware check, listening socket and hardware thread; everything but the accept loop """
         ok, msg = self.check_hardware_connection()
         if not ok:
             print(f"[CRITICAL ERROR] {msg}")
@@ -44,91 +91,258 @@ class RFIDServer:
         else:
             print(f"[HARDWARE] {msg}")
 
+        if not self.bind_socket():
+            sys.exit(1)
+
+        self.start_hardware_thread()
+        self.start_discovery()
+
+        print("[READY] System is live.")
+        self.ready.set()
+
+    def bind_socket(self):
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         
         try:
-            self.server_socket.bind((HOST, PORT))
+            self.server_socket.bind((self.host, self.port))
             self.server_socket.listen()
-            print(f"[SERVER] Listening on {HOST}:{PORT}")
+            self.port = self.server_socket.getsockname()[1]
+            self.accept_errors = 0
+            print(f"[SERVER] Listening on {self.host}:{self.port}")
+            return True
         except Exception as e:
             print(f"[ERROR] Bind failed: {e}")
-            sys.exit(1)
+            return False
 
-        self.hw_thread = threading.Thread(target=self.hardware_loop, daemon=True)
+    def start_hardware_thread(self, reinit=False):
+        """ reinit: reset the chip first, on the new thread (SPI isn't shared across threads) """
+        self.hw_generation += 1
+        self.hw_heartbeat = time.monotonic()
+        self.hw_thread = threading.Thread(target=self.hardware_loop, args=(self.hw_generation, reinit), daemon=True)
         self.hw_thread.start()
 
-        print("[READY] System is live.")
-
-        while self.running:
+    def accept_loop(self, generation=None):
+        while self.running and generation in (None, self.accept_generation):
             try:
                 conn, addr = self.server_socket.accept()
+                self.accept_errors = 0
                 with self.lock:
                     self.client_socket = conn
+                self.metrics.incr("client_connections")
+                self.metrics.set_gauge("clients", 1)
                 print(f"[SERVER] Client Connected: {addr}")
                 self.handle_client(conn)
             except KeyboardInterrupt:
-                self.stop()
+                raise
             except Exception as e:
+                if not self.running: break
+                self.accept_errors += 1
                 print(f"[ERROR] Connection loop: {e}")
                 time.sleep(1)
 
+    def start_discovery(self):
+        """ Answers LAN discovery probes so clients find us without a typed-in IP """
+        if self.discovery_port is None:
+            return
+        try:
+            self.discovery = DiscoveryResponder(lambda: announce_message(self.name, self.port),
+                                                port=self.discovery_port, host=self.host).start()
+            print(f"[DISCOVERY] Answering probes on UDP {self.discovery.port} as '{self.name}'")
+        except OSError as e:
+            # Clients can still connect by IP
+            print(f"[DISCOVERY] Disabled, could not bind UDP {self.discovery_port}: {e}")
+            self.discovery = None
+
     def stop(self):
         self.running = False
-        GPIO.cleanup()
-        sys.exit(0)
+        if self.discovery:
+            self.discovery.stop()
+        # shutdown() (not just close) is what wakes a thread blocked in accept/recv
+        for sock in (getattr(self, "server_socket", None), self.client_socket):
+            if sock:
+                try: sock.shutdown(socket.SHUT_RDWR)
+                except: pass
+                try: sock.close()
+                except: pass
+        self.reader.cleanup()
 
     def handle_client(self, conn):
-        buffer = ""
+        decoder = MessageDecoder()
+        recv_buffer = bytearray(RECV_SIZE)
+        conn.settimeout(HEARTBEAT_TICK)
+        enable_keepalive(conn)
+        self.last_rx = self.last_tx = time.monotonic()
         try:
             while self.running:
-                data = conn.recv(1024)
-                if not data: break
-                buffer += data.decode('utf-8')
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    if not line: continue
-                    self.process_command(line)
+                try:
+                    messages = recv_messages(conn, decoder, recv_buffer)
+                    if messages is None: break
+                    self.last_rx = time.monotonic()
+                    for cmd in messages:
+                        try:
+                            self.process_command(cmd)
+                        except Exception as e:
+                            # One bad command must not cost the client its connection
+                            print(f"[CMD] Could not handle {cmd!r:.80}: {e}")
+                except socket.timeout:
+                    pass
+                if not self.check_client_heartbeat():
+                    break
         except:
             pass
         finally:
             print("[SERVER] Client disconnected.")
             with self.lock:
                 self.client_socket = None
+                self.client_caps = set()
+            self.metrics.set_gauge("clients", 0)
             conn.close()
 
-    def process_command(self, line):
-        try:
-            cmd = json.loads(line)
-            action = cmd.get("action")
-            if action == "write":
-                content = cmd.get("content", "")
-                print(f"[CMD] Queuing Write request...")
-                self.command_queue.put(content)
-        except json.JSONDecodeError:
-            pass
+    def check_client_heartbeat(self):
+        """ Pings an idle client; returns False once it has been silent too long """
+        if "heartbeat" not in self.client_caps:
+            return True  # v1 clients never send anything unprompted
+        now = time.monotonic()
+        if now - self.last_rx > self.heartbeat_timeout:
+            print(f"[SERVER] Client silent for {now - self.last_rx:.1f}s, dropping connection.")
+            self.metrics.incr("dead_peers")
+            return False
+        if now - self.last_tx > self.heartbeat_interval:
+            self.send_to_client({"type": "PING", "t": time.time()})
+        return True
+
+    def process_command(self, cmd):
+        if is_hello(cmd):
+            with self.lock:
+                self.client_caps = set(cmd.get("capabilities", []))
+            print(f"[CMD] Client protocol v{cmd.get('version')} caps={sorted(self.client_caps)}")
+            self.send_to_client(hello_message("server"))
+            return
+
+        action = cmd.get("action")
+        if action == "ping":
+            self.send_to_client({"type": "PONG", "t": cmd.get("t"), "server_time": time.time()})
+        elif action == "pong":
+            pass  # Receiving it already refreshed last_rx
+        elif action == "write":
+            content, error = b"", None
+            try:
+                timeout = None if cmd.get("timeout") is None else float(cmd["timeout"])
+                priority = int(cmd.get("priority", 0))
+            except (TypeError, ValueError):
+                timeout, priority = None, 0
+                error = f"Invalid timeout or priority ({cmd.get('timeout')!r}, {cmd.get('priority')!r})"
+            if error is None:
+                # Cards get the compact record (see common/card_format.py); "card" carries the exact fields
+                try:
+                    content = encode_write(cmd.get("content", ""), cmd.get("card"))
+                except CardFormatError as e:
+                    error = str(e)
+            job_id = None if cmd.get("job_id") is None else str(cmd["job_id"])
+            if error:
+                # Never queued, so the hardware loop can't pick it up; the result still carries the job id
+                self.finish_job(self.write_jobs.reject(job_id), FAILED, error)
+                return
+            job = self.write_jobs.submit(content,
+                                         job_id=job_id,
+                                         timeout=timeout,
+                                         priority=priority,
+                                         overwrite=bool(cmd.get("overwrite", True)),
+                                         verify=bool(cmd.get("verify", False)))
+            print(f"[CMD] Queued write job {job.job_id} (priority {job.priority})")
+            self.send_job_progress(job)
+        elif action == "cancel_write":
+            job = self.write_jobs.cancel(cmd.get("job_id"))
+            # Queued jobs end here; the hardware loop reports the active one
+            if job and job.status == QUEUED:
+                self.finish_job(job, CANCELLED, "Cancelled")
+        elif action == "write_jobs":
+            self.send_to_client({"type": "WRITE_JOBS", "jobs": self.write_jobs.snapshot()})
+        elif action == "stats":
+            self.send_to_client({"type": "STATS", "stats": self.metrics.snapshot()})
 
     def send_to_client(self, payload):
+        self.send_many_to_client([payload])
+
+    def send_many_to_client(self, payloads):
+        """ Sends several messages, as one batch line if the client supports it """
+        if not payloads:
+            return
         with self.lock:
             if self.client_socket:
                 try:
-                    msg = json.dumps(payload) + "\n"
-                    self.client_socket.sendall(msg.encode('utf-8'))
+                    if "batch" in self.client_caps:
+                        data = encode_batch(payloads)
+                    else:
+                        data = b"".join(encode_message(p) for p in payloads)
+                    with self.metrics.timer("send"):
+                        self.client_socket.sendall(data)
+                    self.last_tx = time.monotonic()
+                    self.metrics.incr("bytes_sent", len(data))
+                    self.metrics.incr("messages_sent", len(payloads))
                 except:
-                    pass
+                    self.metrics.incr("send_errors")
+                    # Wake handle_client so the dead connection is released now
+                    try: self.client_socket.shutdown(socket.SHUT_RDWR)
+                    except: pass
 
-    def hardware_loop(self):
-        while self.running:
-            if not self.command_queue.empty():
-                try:
-                    text_to_write = self.command_queue.get_nowait()
-                    self.perform_write(text_to_write)
-                except queue.Empty:
-                    pass
+    def send_job_progress(self, job):
+        self.send_to_client({"type": "WRITE_PROGRESS", **job.to_dict()})
+
+    def finish_job(self, job, status, msg):
+        if not self.write_jobs.finish(job):
+            return  # Already finished (e.g. by the hardware thread just before a supervisor restart)
+        job.status = status
+        job.message = msg
+        if status != DONE:
+            self.metrics.incr("writes_failed")
+        print(f"[HW] Write job {job.job_id}: {status} ({msg})")
+        self.send_many_to_client([
+            {"type": "WRITE_PROGRESS", **job.to_dict()},
+            {"type": "WRITE_RESULT", "success": status == DONE, "msg": msg, "job_id": job.job_id},
+        ])
+
+    def hardware_loop(self, generation=None, reinit=False):
+        if reinit:
+            self.reinit_reader()
+        while self.running and generation in (None, self.hw_generation):
+            self.hw_heartbeat = time.monotonic()
+            if self.hw_heartbeat - self.reader_checked > READER_CHECK_INTERVAL:
+                self.check_reader_version()
+
+            if self.active_job is None:
+                self.active_job = self.write_jobs.next_job()
+                if self.active_job:
+                    job = self.active_job
+                    print(f"[HW] Write job {job.job_id}: '{decode_card(job.content)[1]}' ({len(job.content)} bytes, "
+                          f"place card within {job.timeout:g}s)")
+                    self.send_job_progress(job)
+
+            if self.active_job:
+                if self.poll_write_job(self.active_job):
+                    self.active_job = None
             else:
                 self.perform_scan()
             time.sleep(0.1)
 
+    def reinit_reader(self):
+        try:
+            self.reader.reinit()
+        except Exception as e:
+            print(f"[HW] Reader re-init failed: {e}")
+        self.check_reader_version()
+        print(f"[HW] Reader version after re-init: {self.reader_version!r}")
+
+    def check_reader_version(self):
+        """ Reads the version register from the hardware thread (SPI isn't shared across threads) """
+        try:
+            self.reader_version = self.reader.version()
+        except Exception as e:
+            print(f"[HW] Version check failed: {e}")
+            self.reader_version = None
+        self.reader_checked = time.monotonic()
+
     def blink_onboard_led(self):
         """Blinks the Raspberry Pi onboard ACT LED."""
         led_path = None
@@ -176,49 +390,131 @@ class RFIDServer:
         except Exception as e:
             print(f"[HW] LED Blink Warning: {e}")
 
-    def perform_write(self, text):
-        print(f"[HW] Writing: '{text}' (Place card within 15s)")
-        start_time = time.time()
-        success = False
-        msg = "Timed out"
-        
-        while (time.time() - start_time) < 15:
-            uid = self.check_card_presence()
-            if uid:
-                try:
-                    print(f"[HW] Card found {uid}. Writing...")
-                    self.reader.write(text)
-                    success = True
-                    msg = "Write Successful"
-                    print("[HW] Write Complete!")
-                    self.blink_onboard_led()
-                    break
-                except Exception as e:
-                    # Catch Auth Error specifically if possible, logic is generic here
-                    err_str = str(e)
-                    print(f"[HW] Write Error: {err_str}")
-                    if "auth" in err_str.lower() or "0x8" in err_str:
-                        print("     -> Hint: Try holding card still or use a new card.")
-                    time.sleep(0.5)
-            time.sleep(0.1)
-            
-        self.send_to_client({"type": "WRITE_RESULT", "success": success, "msg": msg})
-        if success: time.sleep(2)
+    def poll_write_job(self, job):
+        """ One pass of the active write job. Returns True once the job is finished """
+        if job.cancel_requested:
+            self.finish_job(job, CANCELLED, "Cancelled")
+            return True
+        if job.expired():
+            self.finish_job(job, TIMEOUT, "Timed out")
+            return True
 
-    def perform_scan(self):
         uid = self.check_card_presence()
-        if uid:
-            try:
-                id, text = self.reader.read()
-                data = text.strip()
-                print(f"[HW] Read: {data}")
+        if not uid or self.is_settling(uid):
+            return False
+
+        if not job.overwrite and self.holds_member_data(uid):
+            # Someone tapping in while we wait for a blank card: treat it as a normal scan
+            self.perform_scan(uid)
+            return False
+
+        job.status = WRITING
+        job.attempts += 1
+        self.send_job_progress(job)
+        try:
+            print(f"[HW] Card found {uid}. Writing...")
+            with self.metrics.timer("card_write"):
+                _, written = self.reader.write_raw(job.content)
+            written = payload(written)
+            if job.verify and self.read_card() != written.decode("latin-1"):
+                raise Exception("Verify failed: card content does not match")
+            # We know exactly what is on the card now (write truncates to the data blocks)
+            self.card_cache.store(uid, written.decode("latin-1"))
+            self.settling = (uid_key(uid), time.monotonic() + WRITE_SETTLE)
+            print("[HW] Write Complete!")
+            self.metrics.incr("writes_ok")
+            with self.metrics.timer("led_blink"):
                 self.blink_onboard_led()
-                self.send_to_client({"type": "READ", "data": data})
-                time.sleep(2)
+            self.finish_job(job, DONE, "Write Successful")
+            time.sleep(self.scan_cooldown)
+            return True
+        except Exception as e:
+            # Catch Auth Error specifically if possible, logic is generic here
+            err_str = str(e)
+            print(f"[HW] Write Error: {err_str}")
+            # A failed write may have left some blocks changed
+            self.card_cache.invalidate(uid)
+            self.metrics.incr("write_errors")
+            if "auth" in err_str.lower() or "0x8" in err_str:
+                self.metrics.incr("auth_errors")
+                print("     -> Hint: Try holding card still or use a new card.")
+            job.status = WAITING
+            job.message = err_str
+            self.send_job_progress(job)
+            time.sleep(0.5)
+            return False
+
+    def is_settling(self, uid):
+        if self.settling and self.settling[0] == uid_key(uid):
+            if time.monotonic() < self.settling[1]:
+                return True
+            self.settling = None
+        return False
+
+    def holds_member_data(self, uid):
+        """ True if the card already carries member data (so it must not be overwritten) """
+        data = self.card_cache.peek(uid)
+        if data is None:
+            try:
+                data = self.read_card()
+                decode_card(data.encode("latin-1"))
+                self.card_cache.store(uid, data)
+            except Exception:
+                return False  # Unreadable or corrupt: let the write attempt decide
+        return bool(data)
+
+    def read_card(self):
+        """
+        Reads the card in the field (only the blocks its content needs).
+        Returns the content without padding, as a latin-1 string: the form
+        kept in the card cache, and plain text for legacy cards.
+        """
+        with self.metrics.timer("card_read"):
+            _, raw = self.reader.read_raw()
+        return payload(raw).decode("latin-1")
+
+    def perform_scan(self, uid=None):
+        if uid is None:
+            uid = self.check_card_presence()
+        if uid and not self.is_settling(uid):
+            detected = time.time()  # Wall clock: the client lines these up with its own via ping/pong
+            try:
+                self.metrics.incr("cards_detected")
+                data = self.card_cache.lookup(uid)
+                cached = data is not None
+                if not cached:
+                    data = self.read_card()
+                    self.metrics.incr("reads")
+                try:
+                    card, text = decode_card(data.encode("latin-1"))
+                except CardFormatError as e:
+                    # Torn or misread: never reaches the log; the card is read again on the next pass
+                    self.metrics.incr("corrupt_reads")
+                    print(f"[HW] Rejected card read: {e}")
+                    if cached:
+                        self.card_cache.invalidate(uid)
+                    return
+                read_done = time.time()
+                if cached:
+                    self.metrics.incr("cache_hits")
+                    print(f"[HW] Read (cached): {text}")
+                else:
+                    self.card_cache.store(uid, data)
+                    print(f"[HW] Read: {text}")
+                with self.metrics.timer("led_blink"):
+                    self.blink_onboard_led()
+                msg = {"type": "READ", "data": text}
+                if card:
+                    msg["card"] = card  # Exact fields; "data" is the legacy text older clients parse
+                msg["trace"] = {"detected": detected, "read": read_done, "sent": time.time()}
+                self.send_to_client(msg)
+                time.sleep(self.scan_cooldown)
             except Exception as e:
                 err_str = str(e)
+                self.metrics.incr("read_errors")
                 # Filter out spammy errors mostly
                 if "auth" in err_str.lower():
+                     self.metrics.incr("auth_errors")
                      print("[HW] Read Auth Error: Authentication Failed (Bad Key or Bad Read)")
                 else:
                      print(f"[HW] Read Error: {e}")
@@ -226,15 +522,39 @@ class RFIDServer:
 
     def check_card_presence(self):
         try:
-            reader = self.reader.READER
-            (status, TagType) = reader.MFRC522_Request(reader.PICC_REQIDL)
-            if status != reader.MI_OK: return None
-            (status, uid) = reader.MFRC522_Anticoll()
-            if status != reader.MI_OK: return None
-            return uid
+            with self.metrics.timer("presence_check"):
+                return self.reader.detect()
         except:
             return None
 
+def main():
+    parser = argparse.ArgumentParser(description="ELC MakerSpace RFID server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--name", help="Name announced to discovering clients (default: hostname)")
+    parser.add_argument("--discovery-port", type=int, default=DISCOVERY_PORT)
+    parser.add_argument("--no-discovery", action="store_true", help="Don't answer LAN discovery probes")
+    parser.add_argument("--simulate", metavar="SCHEDULE.json",
+                        help="Use a simulated reader driven by a tap schedule instead of the MFRC522")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Also serve GET /stats as JSON on this port (off by default)")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--heartbeat-interval", type=float, default=HEARTBEAT_INTERVAL)
+    parser.add_argument("--heartbeat-timeout", type=float, default=HEARTBEAT_TIMEOUT)
+    parser.add_argument("--no-supervisor", action="store_true",
+                        help="Run the bare server without the in-process health supervisor")
+    args = parser.parse_args()
+
+    reader = SimulatedReader.from_file(args.simulate) if args.simulate else None
+    server = RFIDServer(reader=reader, port=args.port, name=args.name,
+                        discovery_port=None if args.no_discovery else args.discovery_port)
+    server.heartbeat_interval = args.heartbeat_interval
+    server.heartbeat_timeout = args.heartbeat_timeout
+    if args.metrics_port:
+        start_http_endpoint(server.metrics, args.metrics_host, args.metrics_port)
+    if args.no_supervisor:
+        server.start()
+    else:
+        Supervisor(server).run()
+
 if __name__ == "__main__":
-    server = RFIDServer()
-    server.start()
+    main()
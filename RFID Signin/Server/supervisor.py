@@ -0,0 +1,194 @@
+"""
+In-process supervisor for RFIDServer.
+
+Replaces the launcher's periodic kill/restart: instead of restarting the
+whole process every six hours, it watches the server's health and
+restarts only the part that failed, in place:
+
+- Hardware loop stalled (no pass for HW_STALL_SECONDS, e.g. stuck in a
+  write) or reader version register invalid twice in a row: the hardware
+  thread is retired and, once it has exited, a new one started that
+  re-initialises the chip first. A thread that won't exit (blocked in a
+  driver call) means the process exits with EXIT_RESTART instead, since
+  two threads must never drive SPI at once.
+- Accept loop died or keeps failing: the listening socket is re-bound and
+  a new accept thread started.
+- Memory grew more than MEMORY_GROWTH_LIMIT over the post-startup
+  baseline: that can't be fixed in place, so the process exits with
+  EXIT_RESTART and the launcher starts a fresh one.
+
+Restarts are counted in the server metrics and listed under the
+"supervisor" gauge of the stats command.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+
+from write_jobs import WRITING, FAILED
+
+CHECK_INTERVAL = 2
+HW_STALL_SECONDS = 15
+ACCEPT_ERROR_LIMIT = 5
+MEMORY_BASELINE_DELAY = 60  # Let caches warm up before taking the baseline
+MEMORY_GROWTH_LIMIT = 64 * 1024 * 1024
+HW_EXIT_WAIT = 5  # Seconds a retired hardware thread gets to return (reader I/O gives up after RAW_IO_TIMEOUT)
+EXIT_RESTART = 3  # launcher.sh restarts the process right away
+MAX_RESTART_LOG = 50
+
+
+def current_rss():
+    """ Resident set size in bytes, or None where it can't be read """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, KiB on Linux
+        except Exception:
+            return None
+
+
+class Supervisor:
+    def __init__(self, server, check_interval=CHECK_INTERVAL):
+        self.server = server
+        self.check_interval = check_interval
+        self.started = time.monotonic()
+        self.restarts = []  # Most recent last: {"component", "reason", "time"}
+        self.bad_version_checks = 0
+        self.last_version_check = 0.0
+        self.memory_baseline = None
+        self.accept_thread = None
+        self.lock = threading.Lock()
+        server.metrics.gauge_from("supervisor", self.status)
+
+    def run(self):
+        """ Starts the server components and supervises them until stopped """
+        self.server.start_components()
+        self.start_accept_thread()
+        print("[SUPERVISOR] Watching server health.")
+        try:
+            while self.server.running:
+                time.sleep(self.check_interval)
+                self.check()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.stop()
+
+    def start_accept_thread(self):
+        self.server.accept_generation += 1
+        self.accept_thread = threading.Thread(target=self.server.accept_loop,
+                                              args=(self.server.accept_generation,), daemon=True)
+        self.accept_thread.start()
+
+    def check(self):
+        self.check_hardware()
+        self.check_socket()
+        self.check_memory()
+
+    # --- Health checks ---
+    def check_hardware(self):
+        server = self.server
+        stalled_for = time.monotonic() - server.hw_heartbeat
+        if stalled_for > HW_STALL_SECONDS:
+            job = server.active_job
+            if job is not None and job.status == WRITING:
+                reason = f"write job {job.job_id} stuck for {stalled_for:.0f}s"
+            else:
+                reason = f"hardware loop stalled for {stalled_for:.0f}s"
+            self.restart_hardware(reason)
+            return
+
+        if server.reader_checked != self.last_version_check:
+            self.last_version_check = server.reader_checked
+            version = server.reader_version
+            if version is None or version in (0x00, 0xFF):
+                self.bad_version_checks += 1
+                print(f"[SUPERVISOR] Reader version check failed ({self.bad_version_checks})")
+            else:
+                self.bad_version_checks = 0
+            if self.bad_version_checks >= 2:
+                self.bad_version_checks = 0
+                self.restart_hardware(f"reader version register reads {version!r}")
+
+    def check_socket(self):
+        server = self.server
+        if not server.running:
+            return
+        if self.accept_thread is None or not self.accept_thread.is_alive():
+            self.restart_socket("accept loop exited")
+        elif server.accept_errors >= ACCEPT_ERROR_LIMIT:
+            self.restart_socket(f"{server.accept_errors} consecutive accept errors")
+
+    def check_memory(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        if self.memory_baseline is None:
+            if time.monotonic() - self.started > MEMORY_BASELINE_DELAY:
+                self.memory_baseline = rss
+            return
+        if rss - self.memory_baseline > MEMORY_GROWTH_LIMIT:
+            self.exit_for_restart(f"memory grew {(rss - self.memory_baseline) / 2**20:.0f} MiB over baseline")
+
+    def exit_for_restart(self, reason):
+        self.record("process", reason)
+        print("[SUPERVISOR] Exiting so the launcher can start a fresh process.")
+        self.server.stop()
+        sys.stdout.flush()
+        os._exit(EXIT_RESTART)
+
+    # --- In-place restarts ---
+    def restart_hardware(self, reason):
+        server = self.server
+        self.record("reader", reason)
+        old_thread = server.hw_thread
+        server.hw_generation += 1  # The old loop exits at its next pass
+        old_thread.join(timeout=HW_EXIT_WAIT)
+        if old_thread.is_alive():
+            # Still inside the reader: a second thread on the SPI bus would corrupt both
+            self.exit_for_restart(f"hardware thread still blocked {HW_EXIT_WAIT}s after retiring it")
+            return
+
+        # The old thread is gone, so nothing else can finish this job (finish_job reports it once anyway)
+        job = server.active_job
+        server.active_job = None
+        if job is not None and not job.finished():
+            server.finish_job(job, FAILED, "Reader restarted")
+
+        server.start_hardware_thread(reinit=True)
+
+    def restart_socket(self, reason):
+        server = self.server
+        self.record("socket", reason)
+        server.accept_generation += 1  # The old loop exits at its next pass
+        # shutdown() wakes a thread blocked in accept(); close() alone doesn't on Linux
+        try: server.server_socket.shutdown(socket.SHUT_RDWR)
+        except: pass
+        try: server.server_socket.close()
+        except: pass
+        if self.accept_thread is not None:
+            self.accept_thread.join(timeout=5)
+        if server.bind_socket():
+            self.start_accept_thread()
+
+    def record(self, component, reason):
+        print(f"[SUPERVISOR] Restarting {component}: {reason}")
+        self.server.metrics.incr(f"restarts_{component}")
+        with self.lock:
+            self.restarts.append({"component": component, "reason": reason, "time": time.time()})
+            del self.restarts[:-MAX_RESTART_LOG]
+
+    def status(self):
+        with self.lock:
+            return {
+                "restarts": len(self.restarts),
+                "recent": self.restarts[-5:],
+                "memory_rss": current_rss(),
+                "memory_baseline": self.memory_baseline,
+                "hw_loop_age_s": round(time.monotonic() - self.server.hw_heartbeat, 2),
+                "reader_version": self.server.reader_version,
+            }
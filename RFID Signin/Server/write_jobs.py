@@ -0,0 +1,124 @@
+"""
+Write jobs for the RFID server.
+
+A write request from the client becomes a WriteJob with an id, a timeout,
+a priority and a status that moves through:
+
+    queued -> waiting_for_card -> writing -> done
+                                          \\-> failed / timeout / cancelled
+
+The hardware loop only ever polls the active job once per pass, so card
+scanning keeps running while a job waits for its card.
+"""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+
+DEFAULT_TIMEOUT = 15
+MAX_TIMEOUT = 120
+
+QUEUED = "queued"
+WAITING = "waiting_for_card"
+WRITING = "writing"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, TIMEOUT, CANCELLED)
+
+
+class WriteJob:
+    def __init__(self, job_id, content, timeout=DEFAULT_TIMEOUT, priority=0, overwrite=True, verify=False):
+        self.job_id = job_id
+        self.content = content
+        self.timeout = timeout
+        self.priority = priority
+        self.overwrite = overwrite  # False: only blank cards may be written, member cards still scan
+        self.verify = verify  # Read the card back after writing and compare
+        self.status = QUEUED
+        self.message = ""
+        self.created = time.time()
+        self.deadline = None
+        self.attempts = 0
+        self.cancel_requested = False
+
+    def start(self):
+        """ Called when the job becomes active; the timeout runs from here """
+        self.status = WAITING
+        self.deadline = time.monotonic() + self.timeout
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def finished(self):
+        return self.status in FINISHED
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "msg": self.message,
+            "priority": self.priority,
+            "attempts": self.attempts,
+            "created": self.created,
+        }
+
+
+class WriteJobQueue:
+    """ Priority queue of pending jobs (higher priority first, FIFO within a priority) """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.heap = []
+        self.jobs = {}  # job_id -> WriteJob, for queued and active jobs
+        self.counter = itertools.count()
+
+    def submit(self, content, job_id=None, timeout=None, priority=0, overwrite=True, verify=False):
+        timeout = DEFAULT_TIMEOUT if timeout is None else max(1, min(float(timeout), MAX_TIMEOUT))
+        job = WriteJob(job_id or uuid.uuid4().hex[:8], content, timeout, int(priority), overwrite, verify)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            heapq.heappush(self.heap, (-job.priority, next(self.counter), job))
+        return job
+
+    def reject(self, job_id=None):
+        """ Registers a job that is never queued, so a bad write command can still be finished as FAILED """
+        job = WriteJob(job_id or uuid.uuid4().hex[:8], b"")
+        with self.lock:
+            self.jobs[job.job_id] = job
+        return job
+
+    def next_job(self):
+        """ Pops the next job to run, skipping ones cancelled while queued """
+        with self.lock:
+            while self.heap:
+                _, _, job = heapq.heappop(self.heap)
+                if not job.cancel_requested:
+                    job.start()  # Under the lock, so cancel() never sees a popped job as queued
+                    return job
+                self.jobs.pop(job.job_id, None)
+        return None
+
+    def cancel(self, job_id):
+        """ Flags a job as cancelled; the hardware loop reports it. Returns the job or None """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished():
+                return None
+            job.cancel_requested = True
+            return job
+
+    def finish(self, job):
+        """ Forgets a job. Returns False if it was already finished, so it is only reported once """
+        with self.lock:
+            return self.jobs.pop(job.job_id, None) is not None
+
+    def snapshot(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def qsize(self):
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job.status == QUEUED and not job.cancel_requested)
@@ -0,0 +1,103 @@
+"""
+Daily Excel export: pandas DataFrame.to_excel vs the streaming openpyxl writer.
+
+Generates a backup journal with --scans rows, then exports it with each
+method in a fresh interpreter that already has the client modules loaded,
+so time and peak memory include pandas/openpyxl import cost the way the
+kiosk pays it on its first export.
+
+    python benchmarks/bench_export.py [--scans 10000] [--people 400]
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+FIELDS = ["Date", "Time", "Action", "First Name", "Last Name", "Email", "Raw Data"]
+DAY = "2025-01-15"
+
+
+def make_journal(path, scans, people, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        t = datetime.datetime(2025, 1, 15, 8, 0, 0)
+        for i in range(scans):
+            n = rng.randrange(people)
+            t += datetime.timedelta(seconds=rng.randint(1, 5))
+            user, first, last = f"user{n}", f"First{n}", f"Last{n}"
+            writer.writerow([DAY, t.strftime("%I:%M:%S %p"), rng.choice(["SIGN IN", "SIGN OUT"]), first, last,
+                             f"{user}@student.monroecc.edu", f"{user},{first},{last},False"])
+
+
+def run_pandas(journal, out_dir):
+    """ The previous export: the day's scans as a list of dicts, then a DataFrame """
+    import pandas as pd
+    with open(journal, newline="", encoding="utf-8") as f:
+        log_data = list(csv.DictReader(f))
+    df = pd.DataFrame(log_data)[FIELDS]
+    path = os.path.join(out_dir, "pandas.xlsx")
+    df.to_excel(path, index=False)
+    return path
+
+
+def run_stream(journal, out_dir):
+    from client.journal import read_rows
+    logic.EXPORT_DIR = out_dir
+    ok, msg = logic.export_logs_to_excel(read_rows(journal), DAY)
+    if not ok:
+        raise RuntimeError(msg)
+    return msg
+
+
+def child(method, journal, out_dir):
+    # The client already has its own modules loaded; only the export's imports (pandas/openpyxl) count
+    global logic
+    import client.logic as logic
+    start = time.perf_counter()
+    path = {"pandas": run_pandas, "stream": run_stream}[method](journal, out_dir)
+    elapsed = time.perf_counter() - start
+    peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+    print(f"{elapsed:.3f} {peak_kib} {os.path.getsize(path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scans", type=int, default=10000)
+    parser.add_argument("--people", type=int, default=400)
+    parser.add_argument("--child", nargs=3, metavar=("METHOD", "JOURNAL", "OUT_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return 0
+
+    work = tempfile.mkdtemp()
+    journal = os.path.join(work, "daily_backup.csv")
+    make_journal(journal, args.scans, args.people)
+    print(f"--- Export of {args.scans} scans by {args.people} people (fresh interpreter each) ---")
+    for method in ("pandas", "stream"):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", method, journal, work],
+                              capture_output=True, text=True, cwd=ROOT)
+        if proc.returncode != 0:
+            print(f"{method:7s} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr else proc.returncode}")
+            continue
+        elapsed, peak_kib, size = proc.stdout.split()
+        print(f"{method:7s} {float(elapsed) * 1000:8.0f} ms (incl. pandas/openpyxl import)   "
+              f"peak RSS {int(peak_kib) / 1024:6.1f} MiB   file {int(size) / 1024:6.0f} KiB")
+    shutil.rmtree(work, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
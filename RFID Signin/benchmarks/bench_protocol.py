@@ -0,0 +1,77 @@
+"""
+Loopback throughput benchmark for the RFID wire protocol.
+
+Compares the old str-concat/split receive loop against common.protocol's
+MessageDecoder, for single messages and for batched sends.
+
+    python benchmarks/bench_protocol.py [message_count]
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.protocol import MessageDecoder, RECV_SIZE, encode_message, encode_batch, recv_messages
+
+SAMPLE = {"type": "READ", "data": "jdoe,Jöhn,Doé,False"}  # Non-ASCII on purpose
+
+
+def legacy_receive(sock, expected):
+    """ The pre-protocol loop from handle_client/listen_loop """
+    buffer = ""
+    count = 0
+    while count < expected:
+        data = sock.recv(1024)
+        if not data:
+            break
+        buffer += data.decode("utf-8", errors="replace")  # Strict decode would crash on split chars
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            if not line: continue
+            json.loads(line)
+            count += 1
+    return count
+
+
+def framed_receive(sock, expected):
+    decoder = MessageDecoder()
+    recv_buffer = bytearray(RECV_SIZE)
+    count = 0
+    while count < expected:
+        messages = recv_messages(sock, decoder, recv_buffer)
+        if messages is None:
+            break
+        count += len(messages)
+    return count
+
+
+def run(name, receiver, payload, expected):
+    a, b = socket.socketpair()
+    sender = threading.Thread(target=a.sendall, args=(payload,), daemon=True)
+    start = time.perf_counter()
+    sender.start()
+    received = receiver(b, expected)
+    elapsed = time.perf_counter() - start
+    sender.join()
+    a.close()
+    b.close()
+    rate = received / elapsed if elapsed else float("inf")
+    print(f"{name:<28} {received:>8} msgs  {elapsed * 1000:8.1f} ms  {rate:>12,.0f} msg/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    single = encode_message(SAMPLE) * count
+    batched = b"".join(encode_batch([SAMPLE] * 100) for _ in range(count // 100))
+
+    print(f"--- Protocol loopback benchmark ({count} messages, {len(single) / 1024:.0f} KiB) ---")
+    run("legacy str split", legacy_receive, single, count)
+    run("framed decoder", framed_receive, single, count)
+    run("framed decoder, batch=100", framed_receive, batched, (count // 100) * 100)
+
+
+if __name__ == "__main__":
+    main()
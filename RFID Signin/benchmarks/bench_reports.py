@@ -0,0 +1,84 @@
+"""
+Semester report over the daily Excel exports: cold backfill vs cached index.
+
+Writes --days daily exports (weekdays only) with the client's exporter into
+a temp Exports tree, then runs the report three times: a serial cold build,
+a cold build through the process pool, and a warm run where every file is
+unchanged and only the index is read.
+
+    python benchmarks/bench_reports.py [--days 110] [--people 300] [--scans 400]
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from client import logic, reports
+
+
+def make_exports(export_dir, days, people, scans, seed=1):
+    rng = random.Random(seed)
+    logic.EXPORT_DIR = export_dir
+    day = datetime.date(2026, 8, 31)
+    made = 0
+    while made < days:
+        if day.weekday() < 5:
+            rows = []
+            inside = set()
+            t = datetime.datetime.combine(day, datetime.time(8, 0))
+            for _ in range(scans):
+                n = rng.randrange(people)
+                t += datetime.timedelta(seconds=rng.randint(10, 90))
+                action = "SIGN OUT" if n in inside else "SIGN IN"
+                inside ^= {n}
+                rows.append({"Date": day.isoformat(), "Time": t.strftime("%I:%M:%S %p"), "Action": action,
+                             "First Name": f"First{n}", "Last Name": f"Last{n}",
+                             "Email": f"user{n}@student.monroecc.edu", "Raw Data": f"user{n},First{n},Last{n},False"})
+            ok, msg = logic.export_logs_to_excel(rows, day.isoformat())
+            if not ok:
+                raise RuntimeError(msg)
+            made += 1
+        day += datetime.timedelta(days=1)
+
+
+def timed_report(export_dir, pool):
+    reports.POOL_THRESHOLD = 1 if pool else 10 ** 9
+    start = time.perf_counter()
+    index = reports.ReportIndex(export_dir)
+    parsed, failed = index.refresh()
+    summary, rows = reports.build_report(index, "2026-09-01", "2026-12-31", "member")
+    return time.perf_counter() - start, parsed, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, default=110)
+    parser.add_argument("--people", type=int, default=300)
+    parser.add_argument("--scans", type=int, default=400, help="Scans per day")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    export_dir = os.path.join(work, "Exports")
+    start = time.perf_counter()
+    make_exports(export_dir, args.days, args.people, args.scans)
+    print(f"--- {args.days} exports x {args.scans} scans ({time.perf_counter() - start:.1f}s to generate) ---")
+
+    for label, pool, drop_index in (("cold, serial", False, True), ("cold, pool", True, True),
+                                    ("warm (cached)", True, False)):
+        if drop_index and os.path.exists(os.path.join(export_dir, "report_index.json")):
+            os.remove(os.path.join(export_dir, "report_index.json"))
+        elapsed, parsed, summary = timed_report(export_dir, pool)
+        print(f"{label:14s} {elapsed * 1000:8.0f} ms  parsed {parsed:4d}  -> {summary}")
+    shutil.rmtree(work, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
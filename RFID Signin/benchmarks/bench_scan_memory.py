@@ -0,0 +1,91 @@
+"""
+Memory held per scan, and the client daemon's memory over a busy day.
+
+1. Bytes per record kept in memory: the 7-key dict process_scan_data
+   builds (formatted Date/Time, fresh strings per scan) vs the journal's
+   compact ScanRecord.
+2. A ClientDaemon in a temp directory records --scans taps from --people
+   members; traced memory is printed as it goes and should stay flat,
+   since scans go to the journal and only the RECENT_SCANS a
+   resubscribing GUI replays (as ScanRecords) stay in memory.
+   (Expect one early step when sys.intern grows the interpreter's table.)
+
+    python benchmarks/bench_scan_memory.py [--records 100000] [--scans 50000] [--people 300]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client.journal import ScanRecord
+from client.logic import process_scan_data
+
+
+def card_text(n):
+    # Built per call, like text decoded off a card: equal strings, separate objects
+    return ",".join([f"user{n}", f"First{n}", f"Last{n}", "False"])
+
+
+def bytes_per_record(records, people, compact):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for i in range(records):
+        record = process_scan_data(card_text(i % people), "SIGN IN")
+        kept.append(ScanRecord.from_row(record) if compact else record)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / records
+
+
+def daemon_steady_state(scans, people):
+    from client.daemon import ClientDaemon
+    work = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        daemon = ClientDaemon(port=0)
+        daemon.presence.repeat_seconds = 0  # Every tap is a state change
+        tracemalloc.start()
+        checkpoints = max(1, scans // 5)
+        base = None
+        for i in range(1, scans + 1):
+            daemon.record_scan(card_text(i % people))
+            if i % checkpoints == 0:
+                current = tracemalloc.get_traced_memory()[0]
+                if base is None:
+                    base = current  # Presence full size, one-off allocations (e.g. the intern table) done
+                print(f"  {i:7d} scans: {current / 1024:8.1f} KiB traced ({(current - base) / 1024:+.1f} KiB)")
+        tracemalloc.stop()
+        daemon.listener.close()
+        daemon.officer_manager.cleanup()
+        daemon.backup.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--scans", type=int, default=50000)
+    parser.add_argument("--people", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"--- {args.records} records from {args.people} members ---")
+    as_dicts = bytes_per_record(args.records, args.people, compact=False)
+    as_compact = bytes_per_record(args.records, args.people, compact=True)
+    print(f"dict record    {as_dicts:7.0f} bytes/record")
+    print(f"ScanRecord     {as_compact:7.0f} bytes/record ({as_dicts / as_compact:.1f}x smaller)")
+
+    print(f"--- Client daemon, {args.scans} scans ---")
+    daemon_steady_state(args.scans, args.people)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Burst of scan events into a Tk window: one root.after(0) per event vs the
+frame-paced UIEventQueue.
+
+A thread posts --events SCAN events (a replay, or a queue of students
+tapping) while the Tk mainloop runs three labels like the read view.
+Reports label repaints, how long until the last event is on screen, and
+the queue-to-paint latency. Needs a display.
+
+    python benchmarks/bench_ui_updates.py [--events 2000] [--rate 0]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client.ui_queue import UIEventQueue
+
+
+class ReadView:
+    """ The labels _show_scan reconfigures, plus the clear timer it resets """
+
+    def __init__(self, root):
+        self.root = root
+        self.header = tk.Label(root, text="")
+        self.name = tk.Label(root, text="", font=("Helvetica", 36, "bold"))
+        self.status = tk.Label(root, text="")
+        for label in (self.header, self.name, self.status):
+            label.pack()
+        self.clear_timer = None
+        self.shown = 0
+
+    def show(self, event):
+        self.header.config(text=f"Welcome {event['name']} to the\nEngineering Leadership Council MakerSpace")
+        self.name.config(text=event["name"])
+        self.status.config(text=f"SIGN IN Recorded at {event['n']}")
+        if self.clear_timer:
+            self.root.after_cancel(self.clear_timer)
+        self.clear_timer = self.root.after(5000, lambda: None)
+        self.shown += 1
+
+
+def run(mode, events, rate):
+    root = tk.Tk()
+    view = ReadView(root)
+    ui_events = UIEventQueue(root)
+    latencies = []
+    done = threading.Event()
+    result = {}
+
+    def apply_direct(event):
+        view.show(event)
+        root.update_idletasks()
+        latencies.append(time.perf_counter() - event["posted"])
+        if event["n"] == events - 1:
+            finish()
+
+    def apply_queued(event):
+        view.show(event)
+        if event["n"] == events - 1:
+            root.after_idle(finish)
+
+    def finish():
+        result["elapsed"] = time.perf_counter() - result["start"]
+        done.set()
+        root.quit()
+
+    def producer():
+        result["start"] = time.perf_counter()
+        for n in range(events):
+            event = {"n": n, "name": f"First{n % 300} Last{n % 300}", "posted": time.perf_counter()}
+            if mode == "direct":
+                root.after(0, lambda e=event: apply_direct(e))
+            else:
+                ui_events.post(apply_queued, event, key="SCAN")
+            if rate:
+                time.sleep(1.0 / rate)
+
+    if mode == "queued":
+        ui_events.start()
+    root.after(100, lambda: threading.Thread(target=producer, daemon=True).start())
+    root.mainloop()
+    ui_events.stop()
+    root.destroy()
+
+    if mode == "queued":
+        stats = ui_events.stats()
+    else:
+        samples = sorted(latencies)
+        stats = {"p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+                 "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 1),
+                 "max_ms": round(samples[-1] * 1000, 1)}
+    print(f"{mode:7s} repaints {view.shown:5d}  last on screen after {result.get('elapsed', 0) * 1000:7.0f} ms  "
+          f"queue-to-paint p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=0, help="Events per second (0 = as fast as possible)")
+    args = parser.parse_args()
+
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        print(f"No display: {e}")
+        return 1
+    print(f"--- {args.events} scan events{f' at {args.rate:g}/s' if args.rate else ', one burst'} ---")
+    for mode in ("direct", "queued"):
+        run(mode, args.events, args.rate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+End-to-end load test: simulated reader -> RFIDServer -> protocol -> NetworkClient.
+
+Runs entirely on loopback, no Pi required.
+
+    python benchmarks/load_test.py [--taps 200] [--rate 5] [--auth-errors 0.05] [--read-latency 0.05]
+                                   [--compact] [--corrupt 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "Server"))
+
+from rpi_rfid_server import RFIDServer
+from reader import SimulatedReader
+from client.network import NetworkClient
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--taps", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=5.0, help="Taps per second")
+    parser.add_argument("--cards", type=int, default=50)
+    parser.add_argument("--read-latency", type=float, default=0.05)
+    parser.add_argument("--auth-errors", type=float, default=0.05)
+    parser.add_argument("--cooldown", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compact", action="store_true", help="Cards hold version 1 records instead of text")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="Fraction of reads returning a garbled block")
+    args = parser.parse_args()
+
+    taps = SimulatedReader.random_taps(args.taps, args.rate, cards=args.cards, seed=args.seed, compact=args.compact)
+    reader = SimulatedReader(taps, read_latency=(args.read_latency, args.read_latency / 4),
+                             auth_error_rate=args.auth_errors, error_rate=args.corrupt, seed=args.seed)
+
+    cache_file = os.path.join(tempfile.mkdtemp(), "card_cache.json")
+    server = RFIDServer(reader=reader, host="127.0.0.1", port=0, cache_file=cache_file,
+                        discovery_port=None)
+    server.scan_cooldown = args.cooldown
+    threading.Thread(target=server.start, daemon=True).start()
+    server.ready.wait(5)
+
+    received = []
+    start_ref = [0.0]
+
+    def on_read(data, card=None, trace=None):
+        # Runs on the client thread right after the server's send, so the
+        # reader's last detected tap is the one that produced this READ
+        tap = reader.last_tap
+        received.append((time.monotonic() - start_ref[0], tap["at"] if tap else None))
+
+    client = NetworkClient(on_read, lambda success, msg, job_id=None: None)
+    ok, msg = client.connect("127.0.0.1", port=server.port)
+    if not ok:
+        print(f"Could not connect: {msg}")
+        return 1
+
+    reader.restart_clock()
+    start_ref[0] = reader.start_time
+    duration = taps[-1]["at"] + 1
+    print(f"--- Load test: {args.taps} taps at {args.rate}/s over {duration:.1f}s ---")
+    while not reader.finished():
+        time.sleep(0.1)
+    time.sleep(0.5)
+
+    latencies = [arrival - tap_at for arrival, tap_at in received if tap_at is not None]
+
+    client.disconnect()
+    server.stop()
+
+    print(f"Taps scheduled:   {len(taps)}")
+    print(f"READs received:   {len(received)} ({len(received) / len(taps):.0%})")
+    print(f"Reader stats:     {reader.stats}")
+    print(f"Cached cards:     {len(server.card_cache)}")
+    print(f"Rejected reads:   {server.metrics.counters.get('corrupt_reads', 0)}")
+    print(f"Tap -> client latency p50 {percentile(latencies, 50) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 95) * 1000:.0f} ms, max {max(latencies or [0]) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Exercise the Discord notifier against a local stand-in webhook.
+
+The stand-in answers like Discord: 204 on success, a 429 with a JSON
+retry_after once its bucket of --bucket messages per --window seconds is
+used up, and optionally a 502 on a fraction of requests. Runs on
+loopback; nothing is sent to Discord.
+
+    python benchmarks/webhook_standin.py [--messages 30] [--duplicates 0.3] [--bucket 5] [--server-errors 0.1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import common.notifier as notifier_module
+from common.notifier import DiscordNotifier
+
+
+class StandIn:
+    def __init__(self, bucket, window, error_rate, seed):
+        self.bucket = bucket
+        self.window = window
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.used = 0
+        self.delivered = []
+        self.responses = {}
+        self.connections = set()
+
+    def handle(self, body, client_port):
+        with self.lock:
+            self.connections.add(client_port)
+            now = time.monotonic()
+            if now - self.window_start >= self.window:
+                self.window_start, self.used = now, 0
+            reset_after = self.window - (now - self.window_start)
+            if self.used >= self.bucket:
+                status, reply = 429, {"message": "You are being rate limited.", "retry_after": round(reset_after, 3)}
+            elif self.rng.random() < self.error_rate:
+                status, reply = 502, None
+            else:
+                self.used += 1
+                self.delivered.append(json.loads(body)["content"])
+                status, reply = 204, None
+            self.responses[status] = self.responses.get(status, 0) + 1
+            headers = {
+                "X-RateLimit-Remaining": str(max(0, self.bucket - self.used)),
+                "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            }
+            return status, reply, headers
+
+
+def serve(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse shows up
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            status, reply, headers = standin.handle(body, self.client_address[1])
+            data = json.dumps(reply).encode("utf-8") if reply else b""
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            if data:
+                self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="Fraction of messages repeating an earlier one")
+    parser.add_argument("--bucket", type=int, default=5, help="Messages allowed per window")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--server-errors", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    notifier_module.BACKOFF_BASE = 0.05  # Keep the run short
+    standin = StandIn(args.bucket, args.window, args.server_errors, args.seed)
+    httpd = serve(standin)
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/api/webhooks/test"
+
+    rng = random.Random(args.seed)
+    notifier = DiscordNotifier(url, username="Load Test", queue_size=args.messages, coalesce_window=60)
+    results = {}
+    unique = []
+    start = time.monotonic()
+    for i in range(args.messages):
+        if unique and rng.random() < args.duplicates:
+            content = rng.choice(unique).upper()  # Same text, different case: still a duplicate
+        else:
+            content = f"Officer {len(unique)} is here!"
+            unique.append(content)
+        result = notifier.notify(content)
+        results[result] = results.get(result, 0) + 1
+    drained = notifier.flush(timeout=120)
+    elapsed = time.monotonic() - start
+    notifier.close()
+    httpd.shutdown()
+
+    print(f"--- Notifier: {args.messages} messages, bucket {args.bucket}/{args.window:g}s, "
+          f"{args.server_errors:.0%} server errors ---")
+    print(f"notify() results:   {results}")
+    print(f"Notifier stats:     {notifier.stats}")
+    print(f"Stand-in responses: {dict(sorted(standin.responses.items()))}")
+    print(f"Delivered:          {len(standin.delivered)} of {len(unique)} unique, "
+          f"{len(set(standin.delivered))} distinct")
+    print(f"HTTP connections:   {len(standin.connections)}")
+    print(f"Elapsed:            {elapsed:.2f}s{'' if drained else ' (queue not drained)'}")
+    return 0 if len(set(standin.delivered)) == len(unique) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,18 +18,42 @@ except ImportError:
 
 # --- Configuration ---
 LOG_FILE = "rfid_logs_client.txt" # Kept local or move? client side only
-BACKUP_CSV = os.path.join("Backups", "daily_backup.csv")
+BACKUP_CSV = os.path.join("Backups", "daily_backup.csv")  # Current day; older days are gzipped next to it
+BACKUP_FLUSH_SECONDS = float(os.getenv("BACKUP_FLUSH_SECONDS", "2"))
+BACKUP_FLUSH_ROWS = int(os.getenv("BACKUP_FLUSH_ROWS", "20"))
+BACKUP_KEEP_DAYS = int(os.getenv("BACKUP_KEEP_DAYS", "365"))
+BACKUP_MAX_MB = int(os.getenv("BACKUP_MAX_MB", "100"))
 EXPORT_DIR = "Exports"
+# Daily attendance export time, HH:MM (24h)
+EXPORT_TIME = tuple(int(part) for part in os.getenv("EXPORT_TIME", "23:59").split(":"))
+TTS_CACHE_DIR = os.path.join("Cache", "Greetings")  # Pre-rendered officer greetings
+# Taps by the same card closer together than this are repeats, not a sign-out
+REPEAT_TAP_SECONDS = float(os.getenv("REPEAT_TAP_SECONDS", "30"))
 
 DEFAULT_PORT = 65432
+# Heartbeat: ping after this many seconds of send silence, drop after this many of receive silence
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", "2"))
+HEARTBEAT_TIMEOUT = float(os.getenv("HEARTBEAT_TIMEOUT", "6"))
 LAST_IP_FILE = "last_ip.txt"
-# OFFICERS_FILE = "officers.json"
+# Local port of the headless client daemon (python -m client.daemon) the GUI subscribes to
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "65434"))
+# GUI repaint interval for background events; a burst of taps within one frame paints once
+UI_FRAME_MS = int(os.getenv("UI_FRAME_MS", "33"))
+TRACE_FILE = "tap_latency.csv"  # Tap-to-screen timings, written from the admin panel
+# Officer roster: OFFICER_DATA below, overridden per email by this file (same JSON list), reloaded on change
+OFFICERS_FILE = os.getenv("OFFICERS_FILE", "officers.json")
+OFFICERS_POLL_SECONDS = float(os.getenv("OFFICERS_POLL_SECONDS", "2"))
 
 # Secrets (Load from Env or Default)
 ADMIN_PASSCODE = os.getenv("ADMIN_PASSCODE", "1234") 
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "")
 OFFICER_DATA_JSON = os.getenv("OFFICER_DATA", "[]")
 LAST_IP = os.getenv("LAST_IP", "192.168.1.100")
+LAST_SERVER_NAME = os.getenv("LAST_SERVER_NAME", "")
+
+# LAN discovery: find the Pi by UDP probe instead of relying on LAST_IP alone
+AUTO_DISCOVERY = os.getenv("AUTO_DISCOVERY", "1") != "0"
+DISCOVERY_PORT = int(os.getenv("DISCOVERY_PORT", "65433"))
 
 
 # --- Colors & Styles ---
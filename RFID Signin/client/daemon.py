@@ -0,0 +1,430 @@
+"""
+Headless client daemon: everything that must keep running for attendance
+to be recorded, without Tk.
+
+It owns the connection to the Pi, the scan journal, the presence index,
+officer greetings and the daily exports. GUIs subscribe over a loopback
+socket (newline-delimited JSON, the same framing as the Pi protocol) and
+only display what the daemon reports, so a GUI blocked in a dialog,
+closed or restarting never delays logging.
+
+    python -m client.daemon [--port 65434]     run in the foreground
+    python -m client.daemon --stop             ask a running daemon to exit
+
+Daemon -> GUI messages carry "type":
+    STATE       full snapshot, sent on subscribe; "recent" holds the last
+                RECENT_SCANS scans as SCAN events (+ "at", epoch seconds)
+    SCAN        {"seq", "record", "duration", "repeat", "present"} (+ "signed_in" on repeats)
+    CONNECTION  {"state", "msg", "ip", "server_name", "servers", "connected", "auto_reconnect"}
+    ACTION      {"scan_action"}
+    PRESENCE    {"present"}
+    EXPORT      {"results": [[day, success, msg], ...]}
+    TAP_LATENCY {"segments", "clock_offset_ms"} (+ "file" and "dumped", or "error", after a dump)
+    WRITE_RESULT / WRITE_PROGRESS / STATS, forwarded from the Pi
+GUI -> daemon messages carry "action": subscribe, set_action, connect,
+write, cancel_write, stats, export_now, painted ({"seq", "t"} once a SCAN
+is on screen), tap_latency ({"dump"}), stop.
+"""
+import argparse
+import collections
+import heapq
+import itertools
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from .config import DAEMON_PORT, LAST_IP, LAST_SERVER_NAME, TRACE_FILE
+from .journal import BackupWriter, ScanRecord
+from .logic import OfficerManager, process_scan_data, update_last_ip, update_env_value
+from .network import NetworkClient, CONNECTED, DISCONNECTED, DEFAULT_PORT
+from .presence import PresenceIndex, AUTO, SIGN_IN, SIGN_OUT
+from .scheduler import ExportScheduler
+from .tracing import TapTraces
+from common.protocol import MessageDecoder, RECV_SIZE, encode_message, recv_messages
+
+DAEMON_HOST = "127.0.0.1"
+SUBSCRIBER_QUEUE = 1000  # Messages buffered for a GUI that isn't reading; beyond that it is dropped
+RECENT_SCANS = 20  # Kept (compact) and sent with STATE for a (re)subscribing GUI; every scan is also in the journal
+
+
+class EventLoop:
+    """
+    Tk-style after()/after_cancel() on a single thread. All daemon state is
+    touched only from here, the way the GUI only touched it from the Tk
+    mainloop, and ExportScheduler runs on it unchanged. Thread-safe.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition(threading.RLock())  # Re-entrant: stop() may run in a signal handler
+        self.timers = []  # heap of (due, id, callback)
+        self.cancelled = set()
+        self.counter = itertools.count(1)
+        self.running = False
+
+    def after(self, ms, callback):
+        with self.cond:
+            timer_id = next(self.counter)
+            heapq.heappush(self.timers, (time.monotonic() + ms / 1000.0, timer_id, callback))
+            self.cond.notify()
+        return timer_id
+
+    def after_cancel(self, timer_id):
+        with self.cond:
+            self.cancelled.add(timer_id)
+
+    def call(self, callback):
+        """ Runs callback on the loop thread as soon as possible """
+        return self.after(0, callback)
+
+    def run(self):
+        self.running = True
+        while True:
+            with self.cond:
+                while self.running:
+                    now = time.monotonic()
+                    if self.timers and self.timers[0][0] <= now:
+                        break
+                    # Capped so Ctrl+C is noticed on Windows too
+                    self.cond.wait(min(self.timers[0][0] - now, 1.0) if self.timers else 1.0)
+                if not self.running:
+                    return
+                _, timer_id, callback = heapq.heappop(self.timers)
+                if timer_id in self.cancelled:
+                    self.cancelled.discard(timer_id)
+                    continue
+            try:
+                callback()
+            except Exception as e:
+                print(f"Daemon task error: {e}")
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+
+
+class Subscriber:
+    """ One connected GUI. Sends go through a bounded queue and a writer thread, never blocking the loop """
+
+    def __init__(self, sock, daemon):
+        self.sock = sock
+        self.daemon = daemon
+        self.outbox = queue.Queue(SUBSCRIBER_QUEUE)
+        self.closed = False
+        threading.Thread(target=self._write_loop, daemon=True).start()
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def send(self, msg):
+        if self.closed:
+            return
+        try:
+            self.outbox.put_nowait(encode_message(msg))
+        except queue.Full:
+            print("GUI stopped reading; dropping it until it reconnects")
+            self.close()
+
+    def _write_loop(self):
+        while True:
+            data = self.outbox.get()
+            if data is None or self.closed:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.close()
+                return
+
+    def _read_loop(self):
+        decoder = MessageDecoder()
+        recv_buffer = bytearray(RECV_SIZE)
+        while not self.closed:
+            try:
+                messages = recv_messages(self.sock, decoder, recv_buffer)
+            except OSError:
+                break
+            if messages is None:
+                break
+            for msg in messages:
+                self.daemon.loop.call(lambda m=msg: self.daemon.handle_command(self, m))
+        self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try: self.outbox.put_nowait(None)
+        except queue.Full: pass
+        try: self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        try: self.sock.close()
+        except OSError: pass
+        self.daemon.loop.call(lambda: self.daemon.drop_subscriber(self))
+
+
+class ClientDaemon:
+    def __init__(self, port=DAEMON_PORT, host=DAEMON_HOST):
+        self.host = host
+        self.port = port
+        self.loop = EventLoop()
+        self.subscribers = []
+        # Claim the port before touching the journal: a second daemon must not rotate the first one's file
+        self.listener = self.bind()
+
+        # Network callbacks arrive on network threads; hop onto the loop
+        self.client = NetworkClient(lambda data, card=None, trace=None:
+                                    self.loop.call(lambda: self.record_scan(data, card, trace)),
+                                    lambda success, msg, job_id=None:
+                                    self.loop.call(lambda: self.on_write_result(success, msg, job_id)))
+        self.client.callback_write_progress = lambda p: self.loop.call(lambda: self.broadcast(p))
+        self.client.callback_stats = lambda s: self.loop.call(lambda: self.broadcast({"type": "STATS", "stats": s}))
+        self.client.callback_connection = lambda state, msg: self.loop.call(lambda: self.on_connection_change(state, msg))
+        self.client.preferred_name = LAST_SERVER_NAME or None
+        self.last_ip = LAST_IP
+        self.connection = (DISCONNECTED, "Not connected")
+
+        self.scan_action = AUTO
+        self.presence = PresenceIndex()
+        self.recent = collections.deque(maxlen=RECENT_SCANS)  # (seq, ScanRecord, duration seconds)
+        self.scan_seq = itertools.count(1)
+        self.traces = TapTraces()
+        self.export_results = []  # Last export's results, for GUIs that subscribe later
+        self.officer_manager = OfficerManager()
+        self.backup = BackupWriter()
+        self.restore_today()
+        self.scheduler = ExportScheduler(self.loop, self.backup, self.on_export_result,
+                                         on_deadline=self.on_export_deadline)
+
+    # --- Lifecycle ---
+    def bind(self):
+        """ Claims the daemon port; raises OSError if another daemon already has it """
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if sys.platform != "win32":
+                # On Windows SO_REUSEADDR would let a second daemon share the port
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((self.host, self.port))
+            listener.listen(4)
+        except OSError:
+            listener.close()
+            raise
+        self.port = listener.getsockname()[1]
+        return listener
+
+    def run(self):
+        """ Serves until stop() """
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        self.loop.call(self.scheduler.start)
+        if self.last_ip or self.client.discovery_enabled:
+            self.client.start(self.last_ip)
+        print(f"Client daemon listening on {self.host}:{self.port}")
+        self.loop.run()
+        self._shutdown()
+
+    def stop(self):
+        self.loop.stop()
+
+    def _shutdown(self):
+        try: self.listener.close()
+        except OSError: pass
+        for sub in list(self.subscribers):
+            sub.close()
+        self.scheduler.stop()
+        self.officer_manager.cleanup()
+        self.client.disconnect()
+        self.backup.close()
+        print("Client daemon stopped")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.loop.call(lambda c=conn: self.subscribers.append(Subscriber(c, self)))
+
+    def drop_subscriber(self, sub):
+        if sub in self.subscribers:
+            self.subscribers.remove(sub)
+
+    def broadcast(self, msg):
+        for sub in list(self.subscribers):
+            sub.send(msg)
+
+    # --- Commands from GUIs (loop thread) ---
+    def handle_command(self, sub, cmd):
+        action = cmd.get("action")
+        if action == "subscribe":
+            sub.send(self.snapshot())
+        elif action == "set_action":
+            if cmd.get("scan_action") in (AUTO, SIGN_IN, SIGN_OUT):
+                self.scan_action = cmd["scan_action"]
+                self.broadcast({"type": "ACTION", "scan_action": self.scan_action})
+        elif action == "connect":
+            ip = (cmd.get("ip") or "").strip()
+            if ip:
+                self.last_ip = ip
+                update_last_ip(ip)  # Update .env
+                self.client.start(ip, cmd.get("port") or DEFAULT_PORT)
+        elif action == "write":
+            job_id = self.client.send_write(cmd.get("content", ""), timeout=cmd.get("timeout"),
+                                            priority=cmd.get("priority", 0), overwrite=cmd.get("overwrite", True),
+                                            verify=cmd.get("verify", False), card=cmd.get("card"),
+                                            job_id=cmd.get("job_id"))
+            if not job_id:
+                self.broadcast({"type": "WRITE_PROGRESS", "job_id": cmd.get("job_id"), "status": "failed",
+                                "msg": "Not connected to Raspberry Pi", "attempts": 0})
+                self.on_write_result(False, "Not connected to Raspberry Pi", cmd.get("job_id"))
+        elif action == "cancel_write":
+            self.client.cancel_write(cmd.get("job_id"))
+        elif action == "stats":
+            if not self.client.request_stats():
+                sub.send({"type": "STATS", "stats": None, "msg": "Not connected to Raspberry Pi"})
+        elif action == "export_now":
+            self.scheduler.export_now()
+        elif action == "painted":
+            if isinstance(cmd.get("t"), (int, float)):
+                self.traces.painted(cmd.get("seq"), cmd["t"])
+        elif action == "tap_latency":
+            sub.send(self.tap_latency(cmd.get("dump", False)))
+        elif action == "stop":
+            self.stop()
+
+    def snapshot(self):
+        state, msg = self.connection
+        return {
+            "type": "STATE",
+            **self._connection_fields(state, msg),
+            "scan_action": self.scan_action,
+            "present": self.presence.count(),
+            "recent": [{"type": "SCAN", "seq": seq, "record": scan.to_row(), "repeat": False, "duration": duration,
+                        "at": scan.at} for seq, scan, duration in self.recent],
+            "export_results": self.export_results,
+        }
+
+    def tap_latency(self, dump=False):
+        offset = self.client.clock.offset
+        reply = {"type": "TAP_LATENCY", "segments": self.traces.summary(),
+                 "clock_offset_ms": round(offset * 1000, 1) if offset is not None else None}
+        if dump:
+            try:
+                reply["dumped"] = self.traces.dump(TRACE_FILE)
+                reply["file"] = TRACE_FILE
+            except OSError as e:
+                reply["error"] = str(e)
+        return reply
+
+    # --- Scans (loop thread) ---
+    def restore_today(self):
+        """ Rebuilds presence from today's journal after a restart """
+        start = time.perf_counter()
+        count = 0
+        self.presence.clear()
+        for record in self.backup.replay_today():
+            self.presence.apply(record)
+            count += 1
+        if count:
+            print(f"Restored {count} scans and {self.presence.count()} open sessions from backup "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def record_scan(self, data, card=None, trace=None):
+        record = process_scan_data(data, SIGN_IN if self.scan_action == AUTO else self.scan_action, card)
+        if self.scan_action == AUTO:
+            if self.presence.is_repeat(record['Email']):
+                # Same card again within a few seconds: not a sign-out, and not logged twice
+                self.broadcast({"type": "SCAN", "record": record, "duration": None, "repeat": True,
+                                "signed_in": self.presence.next_action(record['Email']) == SIGN_OUT,
+                                "present": self.presence.count()})
+                return
+            record['Action'] = self.presence.next_action(record['Email'])
+        duration = self.presence.apply(record)
+
+        self.backup.append(record)
+        seq = next(self.scan_seq)
+        if trace is not None:
+            trace["persisted"] = time.time()  # In the journal's buffer; on disk within BACKUP_FLUSH_SECONDS
+            self.traces.recorded(seq, trace)
+        self.officer_manager.check_and_welcome(record['Email'])
+
+        event = {"type": "SCAN", "seq": seq, "record": record, "repeat": False, "present": self.presence.count(),
+                 "duration": duration.total_seconds() if duration is not None else None}
+        self.recent.append((seq, ScanRecord.from_row(record), event["duration"]))
+        self.broadcast(event)
+
+    # --- Pi connection (loop thread) ---
+    def on_connection_change(self, state, msg):
+        self.connection = (state, msg)
+        if state == CONNECTED:
+            self.remember_server()
+        self.broadcast({"type": "CONNECTION", **self._connection_fields(state, msg)})
+
+    def _connection_fields(self, state, msg):
+        return {"state": state, "msg": msg, "ip": self.last_ip, "server_name": self.client.server_name,
+                "servers": self.client.servers, "connected": self.client.connected,
+                "auto_reconnect": self.client.auto_reconnect}
+
+    def remember_server(self):
+        """ Caches the server we reached, so the next start (and failover) tries it first """
+        ip = self.client.target[0] if self.client.target else None
+        if ip and ip != self.last_ip:
+            self.last_ip = ip
+            update_last_ip(ip)
+        name = self.client.server_name
+        if name and name != self.client.preferred_name:
+            self.client.preferred_name = name
+            update_env_value("LAST_SERVER_NAME", name)
+
+    def on_write_result(self, success, msg, job_id=None):
+        self.broadcast({"type": "WRITE_RESULT", "success": success, "msg": msg, "job_id": job_id})
+
+    # --- Exports (loop thread) ---
+    def on_export_deadline(self, day):
+        self.presence.clear()  # Anyone still signed in is left open in that day's export
+        self.recent.clear()
+        self.broadcast({"type": "PRESENCE", "present": 0})
+
+    def on_export_result(self, results):
+        for day, success, msg in results:
+            if success:
+                print(f"Exported {day} to {msg}")
+            elif msg != "No data to export.":
+                print(f"Export Log: {day}: {msg}")
+        self.export_results = [list(r) for r in results]
+        self.broadcast({"type": "EXPORT", "results": self.export_results})
+
+
+def stop_running_daemon(port=DAEMON_PORT):
+    """ Asks the daemon on port to exit. Returns False if none is running """
+    try:
+        with socket.create_connection((DAEMON_HOST, port), timeout=2) as sock:
+            sock.sendall(encode_message({"action": "stop"}))
+        return True
+    except OSError:
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless RFID client daemon")
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    args = parser.parse_args(argv)
+
+    if args.stop:
+        print("Stop requested" if stop_running_daemon(args.port) else "No daemon running")
+        return 0
+
+    try:
+        daemon = ClientDaemon(port=args.port)
+    except OSError as e:
+        print(f"Client daemon already running on port {args.port}? ({e})")
+        return 1
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: daemon.stop())
+    daemon.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from .config import DAEMON_PORT, LOG_FILE, AUTO_DISCOVERY
+from .daemon import DAEMON_HOST
+from .network import DISCONNECTED, DEFAULT_PORT
+from common.protocol import MessageDecoder, RECV_SIZE, encode_message, recv_messages
+
+LINK_RETRY = 1.0  # Seconds between attempts to reach the daemon
+SPAWN_WAIT = 10  # Seconds a freshly started daemon gets to open its port
+
+
+class DaemonClient:
+    """
+    The GUI's handle on the client daemon (client/daemon.py).
+
+    Mirrors the parts of NetworkClient the GUI and BatchProvisioner use
+    (send_write, cancel_write, request_stats, start, connected, servers,
+    the callbacks), but every call goes to the daemon, which owns the real
+    connection to the Pi. Daemon events arrive on callback_event(msg) from
+    the link thread. If no daemon is running, one is started in the
+    background and outlives the GUI.
+    """
+
+    def __init__(self, callback_event, port=DAEMON_PORT):
+        self.callback_event = callback_event
+        self.port = port
+        self.callback_write_result = None  # Same hooks as NetworkClient, fed from daemon events
+        self.callback_write_progress = None
+        self.callback_stats = None
+        self.callback_connection = None
+
+        self.socket = None
+        self.linked = False  # Connected to the daemon
+        self.send_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.spawned = None
+
+        # Last state reported by the daemon
+        self.connected = False  # Daemon <-> Pi
+        self.auto_reconnect = False
+        self.servers = []
+        self.server_name = None
+        self.target = None
+        self.discovery_enabled = AUTO_DISCOVERY
+
+    def start_link(self):
+        threading.Thread(target=self._link_loop, daemon=True).start()
+
+    def _link_loop(self):
+        spawn_deadline = None
+        while not self.stop_event.is_set():
+            try:
+                sock = socket.create_connection((DAEMON_HOST, self.port), timeout=2)
+            except OSError:
+                if spawn_deadline is None:
+                    self.spawn_daemon()
+                    spawn_deadline = time.monotonic() + SPAWN_WAIT
+                elif time.monotonic() > spawn_deadline:
+                    spawn_deadline = None  # Never came up (crashed?): start another next pass
+                self._notify_connection(DISCONNECTED, "Client daemon not running - starting it")
+                self.stop_event.wait(LINK_RETRY)
+                continue
+            spawn_deadline = None
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.socket = sock
+            self.linked = True
+            self._send({"action": "subscribe"})
+            self._listen(sock)
+            self.linked = False
+            self.connected = False
+            try: sock.close()
+            except OSError: pass
+            if not self.stop_event.is_set():
+                self._notify_connection(DISCONNECTED, "Lost the client daemon - reconnecting")
+                self.stop_event.wait(LINK_RETRY)
+
+    def _listen(self, sock):
+        decoder = MessageDecoder()
+        recv_buffer = bytearray(RECV_SIZE)
+        while not self.stop_event.is_set():
+            try:
+                messages = recv_messages(sock, decoder, recv_buffer)
+            except OSError:
+                return
+            if messages is None:
+                return
+            for msg in messages:
+                self.process_msg(msg)
+
+    def spawn_daemon(self):
+        """ Starts `python -m client.daemon` detached, sharing our working directory (.env, Backups, Exports) """
+        parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (parent_dir, env.get("PYTHONPATH")) if p)
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW
+        else:
+            kwargs["start_new_session"] = True  # Survives the GUI's terminal closing
+        try:
+            log = open(LOG_FILE, "a", encoding="utf-8")
+            self.spawned = subprocess.Popen([sys.executable, "-u", "-m", "client.daemon", "--port", str(self.port)],
+                                            cwd=os.getcwd(), env=env, stdin=subprocess.DEVNULL,
+                                            stdout=log, stderr=subprocess.STDOUT, **kwargs)
+            log.close()
+            print(f"Started client daemon (pid {self.spawned.pid}, log in {LOG_FILE})")
+        except Exception as e:
+            print(f"Could not start client daemon: {e}")
+
+    def process_msg(self, msg):
+        mtype = msg.get("type")
+        if mtype in ("STATE", "CONNECTION"):
+            self.connected = msg.get("connected", False)
+            self.servers = msg.get("servers") or []
+            self.server_name = msg.get("server_name")
+            self.target = (msg["ip"], DEFAULT_PORT) if msg.get("ip") else None
+            self.auto_reconnect = msg.get("auto_reconnect", False)
+            self._notify_connection(msg.get("state"), msg.get("msg", ""))
+        elif mtype == "WRITE_RESULT":
+            if self.callback_write_result:
+                self.callback_write_result(msg.get("success"), msg.get("msg"), msg.get("job_id"))
+            return
+        elif mtype == "WRITE_PROGRESS":
+            if self.callback_write_progress:
+                self.callback_write_progress(msg)
+            return
+        elif mtype == "STATS":
+            if self.callback_stats and msg.get("stats") is not None:
+                self.callback_stats(msg["stats"])
+        self.callback_event(msg)
+
+    def _notify_connection(self, state, msg):
+        if self.callback_connection:
+            self.callback_connection(state, msg)
+
+    def _send(self, cmd):
+        if not self.linked:
+            return False
+        try:
+            with self.send_lock:
+                self.socket.sendall(encode_message(cmd))
+            return True
+        except OSError:
+            try: self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+            return False
+
+    # --- NetworkClient-style calls ---
+    def start(self, ip, port=DEFAULT_PORT):
+        return self._send({"action": "connect", "ip": ip, "port": port})
+
+    def send_write(self, text, timeout=None, priority=0, overwrite=True, verify=False, card=None):
+        job_id = uuid.uuid4().hex[:8]
+        cmd = {"action": "write", "content": text, "job_id": job_id, "priority": priority,
+               "overwrite": overwrite, "verify": verify, "card": card}
+        if timeout is not None:
+            cmd["timeout"] = timeout
+        return job_id if self._send(cmd) else False
+
+    def cancel_write(self, job_id):
+        return self._send({"action": "cancel_write", "job_id": job_id})
+
+    def request_stats(self):
+        return self.connected and self._send({"action": "stats"})
+
+    def set_scan_action(self, action):
+        return self._send({"action": "set_action", "scan_action": action})
+
+    def export_now(self):
+        return self._send({"action": "export_now"})
+
+    def report_painted(self, seq, when):
+        """ Tells the daemon scan seq was on screen at when (epoch seconds), completing its trace """
+        return self._send({"action": "painted", "seq": seq, "t": when})
+
+    def request_tap_latency(self, dump=False):
+        return self._send({"action": "tap_latency", "dump": dump})
+
+    def disconnect(self):
+        """ Closes the GUI's link; the daemon keeps running and recording """
+        self.stop_event.set()
+        self.linked = False
+        if self.socket:
+            try: self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError: pass
+            try: self.socket.close()
+            except OSError: pass
@@ -1,17 +1,74 @@
 import sys
 import subprocess
 import importlib.util
+import hashlib
 import time
 import os
 
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIREMENTS_FILE = os.path.join(ROOT_DIR, "requirements.txt")
+# Written after a clean check; while requirements.txt and the interpreter are unchanged the scan is skipped
+STAMP_FILE = os.path.join(ROOT_DIR, "Cache", "dependencies.stamp")
+
 REQUIRED_PACKAGES = [
     "requests",
     "pyttsx3",
     "python-dotenv",
-    "pandas",
     "openpyxl"
 ]
 
+# Mapping for import name vs package name
+IMPORT_NAMES = {"python-dotenv": "dotenv"}
+
+def required_packages():
+    """ Package names from requirements.txt (without version pins), or the built-in list """
+    try:
+        with open(REQUIREMENTS_FILE, "r", encoding="utf-8") as f:
+            lines = [line.split("#")[0].strip() for line in f]
+    except OSError:
+        return list(REQUIRED_PACKAGES)
+    packages = []
+    for line in lines:
+        for sep in ("==", ">=", "<=", "~=", "!=", ">", "<", "[", ";", " "):
+            line = line.split(sep)[0]
+        if line:
+            packages.append(line)
+    return packages
+
+def environment_stamp():
+    """ Hash of requirements.txt plus the interpreter it is checked against """
+    digest = hashlib.sha256()
+    try:
+        with open(REQUIREMENTS_FILE, "rb") as f:
+            digest.update(f.read())
+    except OSError:
+        digest.update(repr(REQUIRED_PACKAGES).encode("utf-8"))
+    digest.update(sys.executable.encode("utf-8"))
+    digest.update(sys.version.encode("utf-8"))
+    return digest.hexdigest()
+
+def stamp_is_current(stamp):
+    try:
+        with open(STAMP_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip() == stamp
+    except OSError:
+        return False
+
+def write_stamp(stamp):
+    try:
+        os.makedirs(os.path.dirname(STAMP_FILE), exist_ok=True)
+        with open(STAMP_FILE, "w", encoding="utf-8") as f:
+            f.write(stamp)
+    except OSError as e:
+        print(f"Could not save dependency stamp: {e}")
+
+def invalidate_stamp():
+    """ Forces a full check next time, e.g. after an import failed despite a current stamp """
+    try:
+        os.remove(STAMP_FILE)
+    except OSError:
+        pass
+
 def install(package):
     """ Installs a package using pip """
     try:
@@ -41,21 +98,27 @@ def progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=50,
     if iteration == total: 
         print()
 
-def check_and_install_dependencies():
-    """ Checks for required packages and installs them if missing """
+def check_and_install_dependencies(force=False):
+    """
+    Checks for required packages and installs them if missing. Skipped
+    entirely when the stamp says this interpreter already passed with the
+    current requirements.txt. Returns the seconds the check took.
+    """
+    start = time.perf_counter()
+    stamp = environment_stamp()
+    if not force and stamp_is_current(stamp):
+        return time.perf_counter() - start
+
     print("\n--- Checking Dependencies ---")
     
     missing_packages = []
     
     # 1. Check what is missing
-    total_checks = len(REQUIRED_PACKAGES)
-    for i, package in enumerate(REQUIRED_PACKAGES):
+    packages = required_packages()
+    total_checks = len(packages)
+    for i, package in enumerate(packages):
         progress_bar(i + 1, total_checks, prefix='Scanning:', suffix=f'Checking {package}', length=30)
-        time.sleep(0.1) # simulated delay for visual effect
-        
-        # Mapping for import name vs package name
-        import_name = package
-        if package == "python-dotenv": import_name = "dotenv"
+        import_name = IMPORT_NAMES.get(package.lower(), package)
         
         if importlib.util.find_spec(import_name) is None:
             missing_packages.append(package)
@@ -64,22 +127,28 @@ def check_and_install_dependencies():
     
     if not missing_packages:
         print("All dependencies satisfy requirements.")
-        return
+        write_stamp(stamp)
+        return time.perf_counter() - start
 
     print(f"Missing {len(missing_packages)} package(s): {', '.join(missing_packages)}")
     print("Installing packages... This may take a moment.")
     print("-" * 50)
 
     # 2. Install missing
+    all_installed = True
     for i, package in enumerate(missing_packages):
         print(f"\n[{i+1}/{len(missing_packages)}] Installing {package}...")
         success = install(package)
         if success:
             print(f"Successfully installed {package}")
         else:
+            all_installed = False
             print(f"FAILED to install {package}. Please install manually.")
             input("Press Enter to continue anyway (app may crash)...")
 
+    if all_installed:
+        importlib.invalidate_caches()
+        write_stamp(stamp)
     print("-" * 50)
     print("Dependency check complete.\n")
-    time.sleep(1) # Pause before clearing/starting app
+    return time.perf_counter() - start
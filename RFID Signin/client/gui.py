@@ -1,17 +1,28 @@
 import tkinter as tk
-from tkinter import messagebox, ttk, simpledialog
+from tkinter import messagebox, ttk, simpledialog, filedialog
 import os
 import ctypes
 import sys
 import datetime
+import time
 
 from .config import (
     MCC_BLACK, HEADER_BLACK, MCC_GOLD, TEXT_WHITE, ERROR_RED, SUCCESS_GREEN, ACTION_BLUE,
-    ADMIN_PASSCODE, BACKUP_CSV, LAST_IP
+    ADMIN_PASSCODE, LAST_IP, EXPORT_TIME
 )
-from .network import NetworkClient
+from .network import CONNECTING, CONNECTED, DEFAULT_PORT
+from .daemon_client import DaemonClient
+from .provisioning import BatchProvisioner
+from .presence import AUTO, SIGN_IN, SIGN_OUT, format_duration
 from .theme import apply_styles
-from .logic import OfficerManager, process_scan_data, append_to_backup, export_logs_to_excel, update_last_ip
+from .ui_queue import UIEventQueue
+from .tracing import SEGMENTS
+from .logic import member_card
+from common.card_format import CardFormatError, card_text, encode_card
+
+# Daemon events where only the newest one matters for the display
+COALESCED_EVENTS = ("SCAN", "STATE", "ACTION", "PRESENCE", "CONNECTION")
+SCAN_DISPLAY_SECONDS = 5  # How long a scan stays on screen
 
 
 class RFIDClientApp:
@@ -41,14 +52,23 @@ class RFIDClientApp:
         except Exception as e:
             print(f"Failed to load icon: {e}")
         
-        self.client = NetworkClient(self.on_rfid_read, self.on_write_result)
-        self.officer_manager = OfficerManager()
+        # The daemon (client/daemon.py) owns the Pi connection, journal, presence and exports;
+        # this window only displays its events, so scans are logged even while it is blocked or closed
+        self.client = DaemonClient(self.on_daemon_event)
+        self.client.callback_write_result = self.on_write_result
+        self.client.callback_stats = self.on_server_stats
+        self.client.callback_write_progress = self.on_write_progress
+        self.client.callback_connection = self.on_connection_change
+        self.batch = BatchProvisioner(self.client, self.refresh_batch_view)
+        self.batch_was_running = False
 
         self.mode = "READ"
-        self.scan_action = "SIGN IN" 
-        self.log_data = [] 
-        self.last_export_date = None
+        self.scan_action = AUTO  # Tap in / tap out; the button can force one action
+        self.present = 0  # People in the room, as counted by the daemon
+        self.export_requested = False  # Force Export pressed; show its result in a dialog
+        self.export_status = None  # (text, color) of the last export, kept across view changes
         self.clear_timer = None
+        self.current_write_job = None
 
         # Load last IP
         self.last_ip = LAST_IP
@@ -56,19 +76,20 @@ class RFIDClientApp:
 
         apply_styles()
         self.setup_ui()
+
+        # Background events are applied once per frame, latest display state only
+        self.ui_events = UIEventQueue(self.root)
+        self.ui_events.start()
         
-        # Auto-connect silently on startup
-        self.root.after(500, self.silent_connect)
-        
-        # Start Auto-Export Scheduler
-        self.check_auto_export()
+        # Subscribe to the daemon (starting it if needed); it connects to the Pi and runs the exports
+        self.client.start_link()
 
         # Handle Window Close Explicity
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def on_close(self):
-        """ Cleanup threads and connections on exit """
-        self.officer_manager.cleanup()
+        """ Closes the window; the daemon keeps recording scans """
+        self.ui_events.stop()
         self.client.disconnect()
         self.root.destroy()
         sys.exit(0)
@@ -108,32 +129,23 @@ class RFIDClientApp:
 
         self.setup_read_view()
 
-    def silent_connect(self):
-        if self.last_ip:
-            self.lbl_connection.config(text=f"Connecting to {self.last_ip}...", foreground=MCC_GOLD)
-            self.root.update()
-            success, msg = self.client.connect(self.last_ip)
-            if success:
-                self.lbl_connection.config(text=f"Connected to {self.last_ip}", foreground=SUCCESS_GREEN)
-            else:
-                self.lbl_connection.config(text=f"Disconnected", foreground=ERROR_RED)
-
     def prompt_connection(self):
-        ip = simpledialog.askstring("Connect to Pi", "Enter Raspberry Pi IP Address:", initialvalue=self.last_ip)
+        prompt = "Enter Raspberry Pi IP Address:"
+        if self.client.servers:
+            found = "\n".join(f"  {s.get('name')}  ({s['ip']})" for s in self.client.servers)
+            prompt = f"Servers found on the network:\n{found}\n\nEnter a name or IP Address:"
+        ip = simpledialog.askstring("Connect to Pi", prompt, initialvalue=self.last_ip)
         if ip:
+            ip = ip.strip()
+            port = DEFAULT_PORT
+            for server in self.client.servers:
+                if ip == server.get("name"):
+                    ip, port = server["ip"], server.get("port", DEFAULT_PORT)
+                    break
             self.last_ip = ip
-            update_last_ip(ip) # Update .env
-                
-            self.lbl_connection.config(text=f"Connecting to {ip}...", foreground=MCC_GOLD)
-
-            self.root.update()
-            
-            success, msg = self.client.connect(ip)
-            if success:
-                self.lbl_connection.config(text=f"Connected to {ip}", foreground=SUCCESS_GREEN)
-            else:
-                self.lbl_connection.config(text=f"Failed: {msg}", foreground=ERROR_RED)
-                messagebox.showerror("Connection Error", f"Could not connect to {ip}.\n{msg}")
+            # The daemon saves it to .env and reconnects; the label follows on_connection_change
+            if not self.client.start(ip, port):
+                messagebox.showerror("Error", "The client daemon is not running.")
 
     def change_mode(self, event=None):
         selection = self.mode_var.get()
@@ -163,13 +175,20 @@ class RFIDClientApp:
         center_frame = ttk.Frame(self.content_frame)
         center_frame.pack(expand=True, fill='both')
 
-        # Action Toggle
-        self.btn_action = tk.Button(center_frame, text="CURRENTLY: SIGN IN", 
+        # Action Toggle: AUTO by default, SIGN IN / SIGN OUT force every tap
+        self.btn_action = tk.Button(center_frame, 
                                     font=('Segoe UI', 14, 'bold'),
-                                    bg=SUCCESS_GREEN, fg="white",
+                                    fg="white",
                                     command=self.toggle_action,
                                     width=24, height=2, relief="flat")
-        self.btn_action.pack(pady=(0, 40))
+        self.btn_action.pack(pady=(0, 10))
+        self._update_action_button()
+
+        # Occupancy
+        self.lbl_occupancy = ttk.Label(center_frame, text="", foreground=TEXT_WHITE, background=MCC_BLACK,
+                                       font=('Segoe UI', 14))
+        self.lbl_occupancy.pack(pady=(0, 20))
+        self._update_occupancy()
         
         # Welcome Message Area
         self.lbl_welcome_header = ttk.Label(center_frame, 
@@ -198,30 +217,41 @@ class RFIDClientApp:
                                         justify="center")
         self.lbl_status_msg.pack(pady=10)
         
-        ttk.Label(center_frame, text="* Logs auto-export to Excel at 11:59 PM", foreground="gray", font=('Segoe UI', 9, 'italic')).pack(side="bottom", pady=20)
+        export_at = datetime.time(*EXPORT_TIME).strftime("%I:%M %p").lstrip("0")
+        self.lbl_export = ttk.Label(center_frame, text=f"* Logs auto-export to Excel at {export_at}", foreground="gray", font=('Segoe UI', 9, 'italic'))
+        self.lbl_export.pack(side="bottom", pady=20)
+        if self.export_status:
+            self.lbl_export.config(text=self.export_status[0], foreground=self.export_status[1])
 
     def toggle_action(self):
-        if self.scan_action == "SIGN IN":
-            self.scan_action = "SIGN OUT"
-            self.btn_action.config(text="CURRENTLY: SIGN OUT", bg=ACTION_BLUE) 
-        else:
-            self.scan_action = "SIGN IN"
+        order = [AUTO, SIGN_IN, SIGN_OUT]
+        self.scan_action = order[(order.index(self.scan_action) + 1) % len(order)]
+        self.client.set_scan_action(self.scan_action)
+        self._update_action_button()
+
+    def _update_action_button(self):
+        if self.scan_action == AUTO:
+            self.btn_action.config(text="AUTO: TAP IN / TAP OUT", bg=MCC_GOLD)
+        elif self.scan_action == SIGN_IN:
             self.btn_action.config(text="CURRENTLY: SIGN IN", bg=SUCCESS_GREEN)
+        else:
+            self.btn_action.config(text="CURRENTLY: SIGN OUT", bg=ACTION_BLUE)
 
-    def _update_read_log(self, data):
+    def _update_occupancy(self):
         if self.mode == "READ":
-            # State Management: Parse Data
-            # Note: process_scan_data handles parsing. Officer Manager handles checks.
-            record = process_scan_data(data, self.scan_action)
-            
-            # Logic: Check Officer
-            if self.officer_manager.check_and_welcome(record['Email']):
-                pass # Triggered in check
+            count = self.present
+            self.lbl_occupancy.config(text=f"{count} {'person' if count == 1 else 'people'} in the room")
+
+    def _show_scan(self, event, display_seconds=SCAN_DISPLAY_SECONDS):
+        """ Displays a scan the daemon has recorded (or ignored as a repeat tap) """
+        self.present = event.get("present", self.present)
+        if self.mode == "READ":
+            record = event["record"]
+            if event.get("repeat"):
+                state = "signed in" if event.get("signed_in") else "signed out"
+                self.lbl_status_msg.config(text=f"Already {state} - tap again later to change")
+                return
 
-            # Memory & File Log
-            self.log_data.append(record)
-            append_to_backup(record)
-            
             # Update UI
             fname = record.get("First Name", "Unknown")
             lname = record.get("Last Name", "")
@@ -235,12 +265,19 @@ class RFIDClientApp:
                 self.lbl_welcome_header.config(text="Welcome to the\nEngineering Leadership Council MakerSpace")
                 self.lbl_name.config(text="Unknown Card", foreground=ERROR_RED)
 
-            self.lbl_status_msg.config(text=f"{action} Recorded at {timestamp}")
+            status = f"{action} Recorded at {timestamp}"
+            if event.get("duration") is not None:
+                status += f" ({format_duration(datetime.timedelta(seconds=event['duration']))} in the room)"
+            self.lbl_status_msg.config(text=status)
+            self._update_occupancy()
+            if event.get("seq"):
+                seq = event["seq"]
+                self.ui_events.on_painted(lambda: self.client.report_painted(seq, time.time()))
             
             # Reset Timer
             if self.clear_timer:
                 self.root.after_cancel(self.clear_timer)
-            self.clear_timer = self.root.after(5000, self.clear_display)
+            self.clear_timer = self.root.after(int(display_seconds * 1000), self.clear_display)
 
     def clear_display(self):
         """ Resets the display to waiting state """
@@ -251,30 +288,33 @@ class RFIDClientApp:
             self.clear_timer = None
 
     # --- EXPORT LOGIC ---
-    def check_auto_export(self):
-        now = datetime.datetime.now()
-        # Check if it's 11:59 PM (23:59)
-        if now.hour == 23 and now.minute == 59:
-            today_str = now.strftime("%Y-%m-%d")
-            if self.last_export_date != today_str:
-                self.manual_export()
-                self.last_export_date = today_str
-        
-        # Check every 30 seconds
-        self.root.after(30000, self.check_auto_export)
-
     def manual_export(self):
-        success, msg = export_logs_to_excel(self.log_data)
-        if success:
-            self.log_data = [] # Clear memory
-            if os.path.exists(BACKUP_CSV):
-                os.remove(BACKUP_CSV)
-            if self.mode == "READ":
-                 messagebox.showinfo("Auto-Export", f"Daily log exported successfully to:\n{msg}")
+        if self.client.export_now():
+            self.export_requested = True
         else:
-            print(f"Export Log: {msg}")
-            if self.mode == "READ" and msg != "No data to export.":
-                 messagebox.showerror("Export Failed", msg)
+            messagebox.showerror("Error", "The client daemon is not running.")
+
+    def on_export_result(self, results):
+        """ Runs on the Tk thread when the daemon reports an export; the daemon logs the details """
+        failed = [(day, msg) for day, success, msg in results if not success and msg != "No data to export."]
+        exported = [(day, msg) for day, success, msg in results if success]
+
+        now = datetime.datetime.now().strftime("%I:%M %p")
+        if failed:
+            self.export_status = (f"* Export failed at {now}: {failed[-1][1]}", ERROR_RED)
+        elif exported:
+            self.export_status = (f"* Last export {now}: {exported[-1][1]}", "gray")
+        if self.export_status and self.mode == "READ":
+            self.lbl_export.config(text=self.export_status[0], foreground=self.export_status[1])
+
+        if self.export_requested:
+            self.export_requested = False
+            if failed:
+                messagebox.showerror("Export Failed", "\n".join(f"{day}: {msg}" for day, msg in failed))
+            elif exported:
+                messagebox.showinfo("Export", "Exported:\n" + "\n".join(msg for _, msg in exported))
+            else:
+                messagebox.showinfo("Export", "No data to export.")
 
     # --- ADMIN VIEW ---
     def setup_write_view(self):
@@ -284,6 +324,8 @@ class RFIDClientApp:
         ttk.Label(net_frame, text=f"Current Target IP: {self.last_ip}").pack(side="left", padx=(0, 10))
         ttk.Button(net_frame, text="Change IP & Connect", command=self.prompt_connection, width=20).pack(side="left", padx=5)
         ttk.Button(net_frame, text="Force Export Log", command=self.manual_export, width=20).pack(side="left", padx=5)
+        ttk.Button(net_frame, text="Server Stats", command=self.request_server_stats, width=14).pack(side="left", padx=5)
+        ttk.Button(net_frame, text="Tap Latency", command=self.request_tap_latency, width=12).pack(side="left", padx=5)
         
         form_frame = ttk.LabelFrame(self.content_frame, text="Write User Data to Card", padding=15)
         form_frame.pack(fill="both", expand=True)
@@ -309,43 +351,274 @@ class RFIDClientApp:
         self.chk_officer = ttk.Checkbutton(center_form, variable=self.var_officer, text="Yes, grant officer privileges")
         self.chk_officer.grid(row=4, column=1, sticky="w", pady=10)
 
-        self.btn_write = ttk.Button(center_form, text="WRITE DATA TO CARD", command=self.handle_write, width=25)
-        self.btn_write.grid(row=5, column=0, columnspan=2, pady=30)
+        ttk.Label(center_form, text="Overwrite:").grid(row=5, column=0, sticky="e", padx=10, pady=10)
+        self.var_overwrite = tk.BooleanVar()
+        ttk.Checkbutton(center_form, variable=self.var_overwrite,
+                        text="Allow writing over an existing member card").grid(row=5, column=1, sticky="w", pady=10)
+
+        btn_frame = ttk.Frame(center_form)
+        btn_frame.grid(row=6, column=0, columnspan=2, pady=30)
+        self.btn_write = ttk.Button(btn_frame, text="WRITE DATA TO CARD", command=self.handle_write, width=25)
+        self.btn_write.pack(side="left", padx=5)
+        self.btn_cancel_write = ttk.Button(btn_frame, text="Cancel", command=self.cancel_write, width=10, state="disabled")
+        self.btn_cancel_write.pack(side="left", padx=5)
         
         self.write_status = ttk.Label(center_form, text="", foreground=MCC_GOLD)
-        self.write_status.grid(row=6, column=0, columnspan=2)
+        self.write_status.grid(row=7, column=0, columnspan=2)
+
+        # Batch provisioning from a roster CSV
+        batch_frame = ttk.LabelFrame(self.content_frame, text="Batch Provisioning (Roster CSV)", padding=10)
+        batch_frame.pack(fill="x", pady=(10, 0))
+        btn_row = ttk.Frame(batch_frame)
+        btn_row.pack(fill="x")
+        ttk.Button(btn_row, text="Load Roster", command=self.load_roster, width=12).pack(side="left", padx=5)
+        self.btn_batch_start = ttk.Button(btn_row, text="Start", command=self.start_batch, width=8)
+        self.btn_batch_start.pack(side="left", padx=5)
+        self.btn_batch_skip = ttk.Button(btn_row, text="Skip Card", command=self.batch.skip, width=10)
+        self.btn_batch_skip.pack(side="left", padx=5)
+        self.btn_batch_stop = ttk.Button(btn_row, text="Stop", command=self.batch.stop, width=8)
+        self.btn_batch_stop.pack(side="left", padx=5)
+        self.batch_status = ttk.Label(batch_frame, text="No roster loaded.", foreground="gray")
+        self.batch_status.pack(anchor="w", pady=(8, 0))
+        self.refresh_batch_view()
 
     def handle_write(self):
-        if not self.client.connected:
+        if not (self.client.connected or self.client.auto_reconnect):
             messagebox.showerror("Error", "Not connected to Raspberry Pi.")
             return
 
         fname = self.entry_fname.get().strip()
         lname = self.entry_lname.get().strip()
         email = self.entry_email.get().strip()
-        officer = str(self.var_officer.get())
+        officer = self.var_officer.get()
 
         if not (fname and lname and email):
             messagebox.showwarning("Input Error", "Please fill in all text fields.")
             return
 
-        data_str = f"{email},{fname},{lname},{officer}"
+        card = member_card(email, fname, lname, officer)
+        try:
+            encode_card(card)
+        except CardFormatError as e:
+            messagebox.showwarning("Input Error", str(e))
+            return
         
         self.btn_write.config(state="disabled")
         self.write_status.config(text="Sending command... Place card on Reader.", foreground=MCC_GOLD)
-        self.root.update()
-        self.client.send_write(data_str)
+        job_id = self.client.send_write(card_text(card), overwrite=self.var_overwrite.get(), card=card)
+        if job_id:
+            self.current_write_job = job_id
+            self.btn_cancel_write.config(state="normal")
+            if not self.client.connected:
+                self.write_status.config(text="Reconnecting to Raspberry Pi... the write will be sent when it is back.",
+                                         foreground=MCC_GOLD)
+        else:
+            self.btn_write.config(state="normal")
+            self.write_status.config(text="Failed: could not send to Raspberry Pi", foreground=ERROR_RED)
+
+    # --- BATCH PROVISIONING ---
+    def load_roster(self):
+        if self.batch.running:
+            messagebox.showwarning("Batch Running", "Stop the current batch before loading a new roster.")
+            return
+        path = filedialog.askopenfilename(title="Select Roster CSV",
+                                          filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            count, errors = self.batch.load(path)
+        except Exception as e:
+            messagebox.showerror("Roster Error", str(e))
+            return
+        if errors:
+            shown = "\n".join(errors[:15]) + ("\n..." if len(errors) > 15 else "")
+            messagebox.showwarning("Roster Warnings", f"Loaded {count} card(s). Skipped rows:\n{shown}")
+
+    def start_batch(self):
+        if not (self.client.connected or self.client.auto_reconnect):
+            messagebox.showerror("Error", "Not connected to Raspberry Pi.")
+            return
+        self.batch.overwrite = self.var_overwrite.get()
+        if self.batch.start():
+            self.batch_was_running = True
+
+    def refresh_batch_view(self):
+        if self.batch_was_running and not self.batch.running and self.batch.current_job is None:
+            self.batch_was_running = False
+            self.finish_batch()
+
+        if self.mode != "WRITE":
+            return
+        total = len(self.batch.entries)
+        counts = self.batch.summary()
+        entry = self.batch.current()
+        failed = sum(counts.get(status, 0) for status in ("failed", "timeout", "cancelled"))
+        if not total:
+            text = "No roster loaded."
+        elif self.batch.running and entry:
+            state = entry["status"].replace("_", " ")
+            text = (f"Card {self.batch.index + 1}/{total}: {entry['fname']} {entry['lname']} ({entry['email']}) - {state}"
+                    f"\nWritten {counts.get('done', 0)}, not written {failed}")
+            if entry["msg"] and entry["status"] == "waiting_for_card":
+                text += f"  |  last attempt: {entry['msg']}"
+        else:
+            text = f"{total} card(s) in roster, {counts.get('done', 0)} written. Press Start to write the rest."
+        self.batch_status.config(text=text, foreground=MCC_GOLD if self.batch.running else "gray")
+        self.btn_batch_start.config(state="disabled" if self.batch.running else "normal")
+        self.btn_batch_skip.config(state="normal" if self.batch.running else "disabled")
+        self.btn_batch_stop.config(state="normal" if self.batch.running else "disabled")
+        self.btn_write.config(state="disabled" if self.batch.running else "normal")
+
+    def finish_batch(self):
+        try:
+            report = self.batch.write_report()
+        except Exception as e:
+            report = f"(report failed: {e})"
+        counts = self.batch.summary()
+        lines = [f"{status}: {n}" for status, n in sorted(counts.items())]
+        messagebox.showinfo("Batch Finished", "\n".join(lines) + f"\n\nReport saved to:\n{report}")
+
+    def cancel_write(self):
+        if self.current_write_job:
+            self.client.cancel_write(self.current_write_job)
+
+    def request_server_stats(self):
+        if not self.client.request_stats():
+            messagebox.showerror("Error", "Not connected to Raspberry Pi.")
+
+    def _show_server_stats(self, stats):
+        counters = stats.get("counters", {})
+        gauges = stats.get("gauges", {})
+        lines = [f"Uptime: {stats.get('uptime_s', 0) / 3600:.1f} h", ""]
+        lines += [f"{k}: {v}" for k, v in sorted(counters.items())]
+        lines += [f"{k}: {v}" for k, v in sorted(gauges.items())]
+        lines.append("")
+        for name, h in sorted(stats.get("latency", {}).items()):
+            lines.append(f"{name}: p50 {h['p50_ms']} ms, p95 {h['p95_ms']} ms, max {h['max_ms']} ms (n={h['count']})")
+        ui = self.ui_events.stats()
+        if ui["count"]:
+            lines.append(f"gui_queue_to_paint: p50 {ui['p50_ms']} ms, p95 {ui['p95_ms']} ms, max {ui['max_ms']} ms "
+                         f"(n={ui['count']}, {ui['posted']} events in {ui['frames']} frames)")
+        messagebox.showinfo("Server Stats", "\n".join(lines))
+
+    def request_tap_latency(self, dump=False):
+        if not self.client.request_tap_latency(dump):
+            messagebox.showerror("Error", "The client daemon is not running.")
+
+    def _show_tap_latency(self, msg):
+        if "error" in msg:
+            messagebox.showerror("Tap Latency", f"Could not save the traces: {msg['error']}")
+            return
+        if "dumped" in msg:
+            messagebox.showinfo("Tap Latency", f"Saved {msg['dumped']} taps to {os.path.abspath(msg['file'])}")
+            return
+        offset = msg.get("clock_offset_ms")
+        lines = ["Pi clock offset: " + (f"{offset:+.1f} ms" if offset is not None else "unknown (no ping yet)"), ""]
+        segments = msg.get("segments", {})
+        for name, start, end in SEGMENTS:
+            h = segments.get(name)
+            if h:
+                lines.append(f"{name} ({start} -> {end}): p50 {h['p50_ms']} ms, p95 {h['p95_ms']} ms, "
+                             f"p99 {h['p99_ms']} ms, max {h['max_ms']} ms (n={h['count']})")
+        if not segments:
+            lines.append("No taps traced yet.")
+            messagebox.showinfo("Tap Latency", "\n".join(lines))
+        elif messagebox.askyesno("Tap Latency", "\n".join(lines) + "\n\nSave every trace to a CSV file?"):
+            self.request_tap_latency(dump=True)
 
     # --- Callbacks ---
-    def on_rfid_read(self, data):
-        self.root.after(0, lambda: self._update_read_log(data))
+    def on_daemon_event(self, msg):
+        # Called from the daemon link thread; Tk must only be touched from the main loop.
+        # Display state (scans, counts, the action button) only needs its latest value per frame;
+        # every scan is already in the daemon's journal.
+        key = msg.get("type") if msg.get("type") in COALESCED_EVENTS else None
+        self.ui_events.post(self._handle_daemon_event, msg, key=key)
+
+    def _handle_daemon_event(self, msg):
+        mtype = msg.get("type")
+        if mtype == "SCAN":
+            self._show_scan(msg)
+        elif mtype == "STATE":
+            self.scan_action = msg.get("scan_action", self.scan_action)
+            self.present = msg.get("present", 0)
+            self.last_ip = msg.get("ip") or self.last_ip
+            if msg.get("export_results") and self.export_status is None:
+                self.on_export_result(msg["export_results"])
+            if self.mode == "READ":
+                self._update_action_button()
+                self._update_occupancy()
+            if msg.get("recent"):
+                self._replay_scan(msg["recent"][-1])
+        elif mtype == "CONNECTION":
+            self.last_ip = msg.get("ip") or self.last_ip
+        elif mtype == "ACTION":
+            self.scan_action = msg.get("scan_action", self.scan_action)
+            if self.mode == "READ":
+                self._update_action_button()
+        elif mtype == "PRESENCE":
+            self.present = msg.get("present", 0)
+            self._update_occupancy()
+        elif mtype == "EXPORT":
+            self.on_export_result(msg.get("results", []))
+        elif mtype == "TAP_LATENCY":
+            self._show_tap_latency(msg)
+
+    def _replay_scan(self, event):
+        """
+        Shows the daemon's latest scan on (re)subscribe if it would still be
+        on screen, e.g. a tap made while this GUI was starting or had lost
+        the daemon. Not reported as painted: the delay is the reconnect's,
+        not the display's.
+        """
+        remaining = SCAN_DISPLAY_SECONDS - (time.time() - event.get("at", 0))
+        if remaining > 0:
+            self._show_scan({**event, "seq": None}, display_seconds=remaining)
+
+    def on_write_result(self, success, msg, job_id=None):
+        self.ui_events.post(self._update_write_status, success, msg, job_id)
+
+    def on_write_progress(self, progress):
+        self.ui_events.post(self._update_write_progress, progress)  # Batch jobs need every event
+
+    def _update_write_progress(self, progress):
+        if self.batch.is_batch_job(progress.get("job_id")):
+            self.batch.handle_progress(progress)
+            return
+        if self.mode != "WRITE" or progress.get("job_id") != self.current_write_job:
+            return
+        status_text = {
+            "queued": "Queued behind other writes...",
+            "waiting_for_card": "Waiting for card... Place card on Reader.",
+            "writing": "Writing... Hold the card still.",
+        }.get(progress.get("status"))
+        if status_text:
+            if progress.get("msg") and progress.get("status") == "waiting_for_card":
+                status_text += f" (last attempt: {progress['msg']})"
+            self.write_status.config(text=status_text, foreground=MCC_GOLD)
+
+    def on_connection_change(self, state, msg):
+        self.ui_events.post(self._update_connection_label, state, msg, key="connection")
+
+    def _update_connection_label(self, state, msg):
+        if state == CONNECTED:
+            self.lbl_connection.config(text=msg, foreground=SUCCESS_GREEN)
+        elif state == CONNECTING:
+            self.lbl_connection.config(text=msg, foreground=MCC_GOLD)
+        else:
+            self.lbl_connection.config(text=f"Disconnected ({msg})", foreground=ERROR_RED)
 
-    def on_write_result(self, success, msg):
-        self.root.after(0, lambda: self._update_write_status(success, msg))
+    def on_server_stats(self, stats):
+        self.ui_events.post(self._show_server_stats, stats)
 
-    def _update_write_status(self, success, msg):
+    def _update_write_status(self, success, msg, job_id=None):
+        if self.current_write_job is None:
+            return  # Batch job results are handled through progress events
+        if job_id is not None and job_id != self.current_write_job:
+            return  # Another job's result (e.g. a batch card), not this write's
+        self.current_write_job = None
         if self.mode == "WRITE":
             self.btn_write.config(state="normal")
+            self.btn_cancel_write.config(state="disabled")
             if success:
                 self.write_status.config(text=f"Success: {msg}", foreground=SUCCESS_GREEN)
                 messagebox.showinfo("Write Success", msg)
@@ -0,0 +1,287 @@
+import csv
+import datetime
+import gzip
+import os
+import shutil
+import sys
+import threading
+from .config import BACKUP_CSV, BACKUP_FLUSH_SECONDS, BACKUP_FLUSH_ROWS, BACKUP_KEEP_DAYS, BACKUP_MAX_MB
+
+BACKUP_FIELDS = ["Date", "Time", "Action", "First Name", "Last Name", "Email", "Raw Data"]
+ARCHIVE_SUFFIX = "_backup.csv.gz"
+ROW_TIME_FORMAT = "%Y-%m-%d %I:%M:%S %p"  # Date + Time columns
+TORN_SUFFIX = ".torn"  # Rows cut off by a crash mid-write, kept next to the journal for inspection
+TAIL_SCAN_BYTES = 64 * 1024  # How far back from the end a torn row is looked for (rows are ~100 bytes)
+
+
+def archive_path(day, folder=None):
+    """ Where the rotated backup for day (YYYY-MM-DD) is kept """
+    folder = folder or os.path.dirname(BACKUP_CSV)
+    return os.path.join(folder, f"{day}{ARCHIVE_SUFFIX}")
+
+
+def read_rows(path):
+    """
+    Streams the scan rows of a backup CSV (plain or gzipped) as dicts.
+
+    Every line is parsed on its own, strictly: a row torn by a crash can
+    end inside the quoted Raw Data field, and a multi-line csv.reader
+    would then swallow the next scan into that field. Torn or short rows
+    are skipped. (No field the journal writes contains a newline.)
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    try:
+        with opener(path, "rt", newline="", encoding="utf-8") as f:
+            header = None
+            for line in f:
+                try:
+                    row = next(csv.reader([line], strict=True), None)
+                except csv.Error:
+                    continue  # Torn inside a quoted field
+                if not row:
+                    continue
+                if header is None:
+                    header = row
+                    width = len(header)
+                elif len(row) >= width:  # Shorter: a row torn by a crash mid-write
+                    yield dict(zip(header, row))
+    except FileNotFoundError:
+        return
+
+
+def first_row_date(path):
+    """ Date column of the first scan in a backup CSV, or None if it has none """
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                return row.get("Date") or None
+    except FileNotFoundError:
+        pass
+    return None
+
+
+class ScanRecord:
+    """
+    A journal row as kept in memory: epoch seconds instead of formatted Date
+    and Time strings, and the repeating strings (names, emails, raw card
+    text, action) interned, so each member's are stored once however often
+    they tap. Formatted back into a row only when one is needed.
+    """
+    __slots__ = ("at", "action", "first", "last", "email", "raw")
+
+    def __init__(self, at, action, first, last, email, raw):
+        self.at = at
+        self.action = sys.intern(action)
+        self.first = sys.intern(first)
+        self.last = sys.intern(last)
+        self.email = sys.intern(email)
+        self.raw = sys.intern(raw)
+
+    @classmethod
+    def from_row(cls, row):
+        try:
+            at = int(datetime.datetime.strptime(f"{row['Date']} {row['Time']}", ROW_TIME_FORMAT).timestamp())
+        except (KeyError, ValueError):
+            at = int(datetime.datetime.now().timestamp())
+        return cls(at, row.get("Action", ""), row.get("First Name", ""), row.get("Last Name", ""),
+                   row.get("Email", ""), row.get("Raw Data", ""))
+
+    def to_row(self):
+        date, time_str = datetime.datetime.fromtimestamp(self.at).strftime(ROW_TIME_FORMAT).split(" ", 1)
+        return {"Date": date, "Time": time_str, "Action": self.action, "First Name": self.first,
+                "Last Name": self.last, "Email": self.email, "Raw Data": self.raw}
+
+
+class BackupWriter:
+    """
+    Append-only scan journal, one CSV per day.
+
+    The current day's file (BACKUP_CSV) stays open. Rows are flushed and
+    fsynced every BACKUP_FLUSH_ROWS rows or BACKUP_FLUSH_SECONDS seconds,
+    whichever comes first, so a crash loses at most a few seconds of taps
+    without an open/close per scan. When a row for a new day arrives, the
+    file is gzipped to Backups/YYYY-MM-DD_backup.csv.gz and a fresh one is
+    started. Archives beyond BACKUP_KEEP_DAYS days or BACKUP_MAX_MB total
+    are deleted oldest first.
+    """
+
+    def __init__(self, path=BACKUP_CSV, flush_seconds=BACKUP_FLUSH_SECONDS, flush_rows=BACKUP_FLUSH_ROWS,
+                 keep_days=BACKUP_KEEP_DAYS, max_bytes=BACKUP_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.folder = os.path.dirname(path) or "."
+        self.flush_seconds = flush_seconds
+        self.flush_rows = flush_rows
+        self.keep_days = keep_days
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.writer = None
+        self.day = None
+        self.unflushed = 0
+        self.stop_event = threading.Event()
+
+        os.makedirs(self.folder, exist_ok=True)
+        with self.lock:
+            # A file left over from an earlier day (app closed overnight) is archived first
+            self.day = first_row_date(self.path)
+            today = datetime.date.today().isoformat()
+            if self.day and self.day != today:
+                self._rotate()
+            self.day = today
+            self._open()
+        self.prune()
+
+        if self.flush_seconds > 0:
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _open(self):
+        self._trim_torn_tail()
+        self.file = open(self.path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=BACKUP_FIELDS, extrasaction="ignore")
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def _trim_torn_tail(self):
+        """
+        Cuts a row torn by a crash mid-write off the end of the file, moving
+        it to the .torn file. Only appending a newline after it is not
+        enough: a tear inside the quoted Raw Data field leaves an open
+        quote that would swallow the next scan.
+        """
+        try:
+            with open(self.path, "r+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                start = max(0, size - TAIL_SCAN_BYTES)
+                f.seek(start)
+                tail = f.read()
+                if not tail or tail.endswith(b"\n"):
+                    return
+                if tail.endswith(b"\r"):
+                    f.write(b"\n")  # Complete row, cut between \r and \n
+                    return
+                keep = start + tail.rfind(b"\n") + 1
+                with open(self.path + TORN_SUFFIX, "ab") as torn:
+                    torn.write(tail[keep - start:] + b"\n")
+                f.truncate(keep)
+            print(f"Backup CSV ended in a torn row; moved it to {self.path + TORN_SUFFIX}")
+        except FileNotFoundError:
+            pass
+
+    def append(self, record):
+        try:
+            with self.lock:
+                day = record.get("Date") or datetime.date.today().isoformat()
+                if day != self.day:
+                    self._rotate()
+                    self.day = day
+                    self._open()
+                    rotated = True
+                else:
+                    rotated = False
+                self.writer.writerow(record)
+                self.unflushed += 1
+                if self.unflushed >= self.flush_rows:
+                    self._flush()
+            if rotated:
+                self.prune()
+        except Exception as e:
+            print(f"Backup CSV error: {e}")
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.file and self.unflushed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unflushed = 0
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Backup flush error: {e}")
+
+    def _rotate(self):
+        """ Compresses the current file into its day's archive and removes it (lock held) """
+        if self.file:
+            self._flush()
+            self.file.close()
+            self.file = None
+        if not os.path.exists(self.path):
+            return
+        if first_row_date(self.path) is None:
+            os.remove(self.path)  # Header only: a day without scans leaves no archive
+            return
+        day = self.day or first_row_date(self.path)
+        target = archive_path(day, self.folder)
+        tmp_path = target + ".tmp"
+        if os.path.exists(target):
+            # Same day archived before (e.g. clock set back): keep both sets of rows
+            with gzip.open(target, "rb") as old, gzip.open(tmp_path, "wb") as out, open(self.path, "rb") as cur:
+                shutil.copyfileobj(old, out)
+                cur.readline()  # Header is already in the old archive
+                shutil.copyfileobj(cur, out)
+        else:
+            with open(self.path, "rb") as cur, gzip.open(tmp_path, "wb") as out:
+                shutil.copyfileobj(cur, out)
+        os.replace(tmp_path, target)
+        os.remove(self.path)
+        print(f"Backup for {day} archived to {target}")
+
+    def roll_over(self):
+        """ Archives the current file if the date has changed since it was opened, even with no new scans """
+        today = datetime.date.today().isoformat()
+        with self.lock:
+            if self.day == today:
+                return False
+            self._rotate()
+            self.day = today
+            self._open()
+        self.prune()
+        return True
+
+    def replay_today(self):
+        """
+        Streams today's scans back from the journal, e.g. to rebuild memory
+        after a restart. Rows written by this process are flushed first.
+        """
+        self.flush()
+        with self.lock:
+            day = self.day
+        for row in read_rows(self.path):
+            if row.get("Date") == day:
+                yield row
+
+    def archives(self):
+        """ Rotated archives as [(day, path)], oldest first """
+        days = []
+        for name in os.listdir(self.folder):
+            if name.endswith(ARCHIVE_SUFFIX):
+                days.append((name[:-len(ARCHIVE_SUFFIX)], os.path.join(self.folder, name)))
+        return sorted(days)
+
+    def prune(self):
+        """ Deletes the oldest archives past the age or total size limit """
+        try:
+            archives = self.archives()
+            cutoff = (datetime.date.today() - datetime.timedelta(days=self.keep_days)).isoformat()
+            total = sum(os.path.getsize(p) for _, p in archives)
+            for day, path in archives:
+                if day >= cutoff and total <= self.max_bytes:
+                    break
+                total -= os.path.getsize(path)
+                os.remove(path)
+                print(f"Pruned old backup {path}")
+        except Exception as e:
+            print(f"Backup prune error: {e}")
+
+    def close(self):
+        self.stop_event.set()
+        with self.lock:
+            if self.file:
+                self._flush()
+                self.file.close()
+                self.file = None
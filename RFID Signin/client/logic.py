@@ -1,93 +1,144 @@
 import os
 import json
 import threading
-import requests
-import pyttsx3
-import csv
 import datetime
+import itertools
 from pathlib import Path
-from .config import DISCORD_WEBHOOK_URL, BACKUP_CSV, OFFICER_DATA_JSON, EXPORT_DIR
+from .config import (
+    DISCORD_WEBHOOK_URL, OFFICER_DATA_JSON, OFFICERS_FILE, OFFICERS_POLL_SECONDS, EXPORT_DIR
+)
+from .speech import SpeechWorker
+from .journal import BACKUP_FIELDS
+from .presence import PresenceIndex
+from common.notifier import DiscordNotifier
+from common.card_format import make_card, parse_text
+
+
+STUDENT_EMAIL_DOMAIN = "student.monroecc.edu"
+
+
+def normalize_email(email):
+    """ Key for officer lookups: trimmed, lower-case, with the student domain if the card has a bare username """
+    email = (email or "").strip().lower()
+    if email and "@" not in email:
+        email = f"{email}@{STUDENT_EMAIL_DOMAIN}"
+    return email
+
+
+def parse_officers(text, source):
+    """ Parses a JSON officer list into {normalized email: officer} """
+    officers = {}
+    entries = json.loads(text)
+    if not isinstance(entries, list):
+        raise ValueError(f"{source} must be a JSON list of officers")
+    for officer in entries:
+        key = normalize_email(officer.get("email")) if isinstance(officer, dict) else ""
+        if key:
+            officers[key] = officer
+    return officers
+
+
+def greeting_text(officer):
+    return f"Welcome {officer.get('title', '')} {officer.get('name', '')}"
 
 
 class OfficerManager:
-    def __init__(self):
-        self.officers = []
+    def __init__(self, officers_file=OFFICERS_FILE, poll_seconds=OFFICERS_POLL_SECONDS):
+        self.officers_file = officers_file
+        self.poll_seconds = poll_seconds
+        self.officers = {}  # normalized email -> officer; replaced whole on reload, never mutated
+        self.file_stamp = None
+        self.stop_event = threading.Event()
+        self.speech = SpeechWorker()
+        self.notifier = DiscordNotifier(DISCORD_WEBHOOK_URL, username="Doorbell Access") if DISCORD_WEBHOOK_URL else None
         self.load_officers()
-        try:
-            self.tts_engine = pyttsx3.init()
-        except:
-            print("TTS Init Failed")
-            self.tts_engine = None
+
+        if self.officers_file and self.poll_seconds > 0:
+            threading.Thread(target=self._watch_file, daemon=True).start()
 
     def load_officers(self):
+        """ Builds the roster from OFFICER_DATA plus the officers file, then swaps it in at once """
+        officers = {}
         try:
-            self.officers = json.loads(OFFICER_DATA_JSON)
-        except json.JSONDecodeError:
+            officers.update(parse_officers(OFFICER_DATA_JSON, "OFFICER_DATA"))
+        except (ValueError, AttributeError):
             print("Failed to parse OFFICER_DATA from environment")
-            self.officers = []
 
+        self.file_stamp = self._file_stamp()
+        if self.file_stamp is not None:
+            try:
+                with open(self.officers_file, "r", encoding="utf-8") as f:
+                    officers.update(parse_officers(f.read(), self.officers_file))
+            except (OSError, ValueError, AttributeError) as e:
+                # Likely caught mid-save; keep the current roster and retry on the next change
+                print(f"Failed to load {self.officers_file}: {e}")
+                if not self.officers:
+                    self.officers = officers  # First load: at least use OFFICER_DATA
+                    self.speech.prerender(greeting_text(o) for o in officers.values())
+                return False
+
+        self.officers = officers
+        self.speech.prerender(greeting_text(o) for o in officers.values())
+        return True
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.officers_file)
+            return (st.st_mtime_ns, st.st_size)
+        except (OSError, TypeError):
+            return None
+
+    def _watch_file(self):
+        while not self.stop_event.wait(self.poll_seconds):
+            if self._file_stamp() != self.file_stamp and self.load_officers():
+                print(f"Officer roster reloaded: {len(self.officers)} officers")
 
     def check_and_welcome(self, email):
-        for officer in self.officers:
-            if officer.get("email") == email:
-                self.trigger_officer_welcome(officer)
-                return True
-        return False
+        officer = self.officers.get(normalize_email(email))
+        if officer is None:
+            return False
+        self.trigger_officer_welcome(officer)
+        return True
 
     def trigger_officer_welcome(self, officer):
-        # 1. TTS Welcome
-        title = officer.get("title", "")
-        name = officer.get("name", "")
-        
-        welcome_text = f"Welcome {title} {name}"
+        # 1. TTS Welcome (played from the pre-rendered cache when available)
+        welcome_text = greeting_text(officer)
         print(f"Speaking: {welcome_text}")
-        
-        if self.tts_engine:
-            try:
-                threading.Thread(target=self._speak, args=(welcome_text,), daemon=True).start()
-            except Exception as e:
-                print(f"TTS Error: {e}")
+        self.speech.say(welcome_text)
 
-        # 2. Discord Ping
+        # 2. Discord Ping (queued; repeats of the same message are coalesced)
         discord_msg = officer.get("discord_message", "")
-        if discord_msg and DISCORD_WEBHOOK_URL:
-             threading.Thread(target=self._send_discord, args=(discord_msg,), daemon=True).start()
+        if discord_msg and self.notifier:
+            self.notifier.notify(discord_msg)
 
-    def _speak(self, text):
-        try:
-            # Re-init in thread to be safe if the global one fails
-            engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
-        except Exception as e:
-            print(f"Thread TTS Error: {e}")
-
-    def _send_discord(self, message):
-        try:
-            payload = {"content": message, "username": "Doorbell Access"}
-            requests.post(DISCORD_WEBHOOK_URL, json=payload)
-        except Exception as e:
-             print(f"Discord Error: {e}")
-    
     def cleanup(self):
-        try:
-            if self.tts_engine:
-                self.tts_engine.stop()
-        except: pass
+        self.stop_event.set()
+        self.speech.stop()
+        if self.notifier:
+            self.notifier.close(timeout=2)
+
+def member_card(email, fname, lname, officer):
+    """ Card fields to write; student emails are stored as the bare username, which process_scan_data expands """
+    email = email.strip()
+    suffix = f"@{STUDENT_EMAIL_DOMAIN}"
+    if email.lower().endswith(suffix):
+        email = email[:-len(suffix)]
+    return make_card(email, fname, lname, officer)
 
-def process_scan_data(data, action):
-    # Format expected: email_user,fname,lname,officer
+def process_scan_data(data, action, card=None):
+    # card: the fields the server decoded; without it (older server) parse the text: email_user,fname,lname,officer
     timestamp = datetime.datetime.now().strftime("%I:%M:%S %p")
     date_str = datetime.datetime.now().strftime("%Y-%m-%d")
     
-    parts = data.split(',')
-    if len(parts) >= 3:
-        email_user = parts[0].strip()
-        fname = parts[1].strip()
-        lname = parts[2].strip()
+    if card is None:
+        card = parse_text(data)
+    if card is not None:
+        email_user = card["member_id"]
+        fname = card["first"]
+        lname = card["last"]
         
         if "@" not in email_user:
-            email_full = f"{email_user}@student.monroecc.edu"
+            email_full = f"{email_user}@{STUDENT_EMAIL_DOMAIN}"
         else:
             email_full = email_user
         
@@ -113,48 +164,102 @@ def process_scan_data(data, action):
         
     return parsed_record
 
-def append_to_backup(record):
-    try:
-        file_exists = os.path.exists(BACKUP_CSV)
-        with open(BACKUP_CSV, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=["Date", "Time", "Action", "First Name", "Last Name", "Email", "Raw Data"])
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(record)
-    except Exception as e:
-        print(f"Backup CSV error: {e}")
+SUMMARY_FIELDS = ["Email", "First Name", "Last Name", "Scans", "Sign Ins", "Sign Outs", "First Scan", "Last Scan",
+                  "Minutes In Room", "Still In"]
+
+
+def export_path(day):
+    """ Exports/YYYY/Month/DD_attendance.xlsx for day (YYYY-MM-DD) """
+    date = datetime.datetime.strptime(day, "%Y-%m-%d")
+    return Path(EXPORT_DIR) / date.strftime("%Y") / date.strftime("%B") / date.strftime("%d_attendance.xlsx")
 
-def export_logs_to_excel(log_data):
-    if not log_data:
+
+def export_logs_to_excel(rows, day=None):
+    """
+    Streams scan rows (e.g. from the backup journal) into the day's xlsx,
+    with a per-person summary sheet. Memory stays flat in the number of
+    scans; only the summary grows, per person. The file is written to a
+    temp name and moved into place, so a failed export never leaves a
+    truncated workbook behind. Returns (success, path or error message).
+    """
+    day = day or datetime.date.today().isoformat()
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
         return False, "No data to export."
 
+    tmp_path = None
     try:
-        import pandas as pd
-        
-        now = datetime.datetime.now()
-        year_folder = now.strftime("%Y")
-        month_folder = now.strftime("%B") 
-        date_file_name = now.strftime("%d_attendance.xlsx")
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
 
-        base_path = Path(EXPORT_DIR)
+        file_path = export_path(day)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
 
-        full_path = base_path / year_folder / month_folder
-        full_path.mkdir(parents=True, exist_ok=True)
-        
-        file_path = full_path / date_file_name
+        wb = Workbook(write_only=True)
+        scans = wb.create_sheet("Attendance")
+        summary_sheet = wb.create_sheet("Summary")
+        bold = Font(bold=True)
+
+        def header(sheet, fields):
+            cells = []
+            for field in fields:
+                cell = WriteOnlyCell(sheet, value=field)
+                cell.font = bold
+                cells.append(cell)
+            sheet.append(cells)
+
+        header(scans, BACKUP_FIELDS)
+        people = {}
+        presence = PresenceIndex()  # Pairs each sign-out with its sign-in for time in the room
+        for row in itertools.chain([first], rows):
+            scans.append([row.get(field, "") for field in BACKUP_FIELDS])
 
-        df = pd.DataFrame(log_data)
-        cols = ["Date", "Time", "Action", "First Name", "Last Name", "Email", "Raw Data"]
-        df = df[cols]
+            key = (row.get("Email") or "N/A").lower()
+            person = people.get(key)
+            if person is None:
+                person = people[key] = {
+                    "Email": row.get("Email", ""), "First Name": row.get("First Name", ""),
+                    "Last Name": row.get("Last Name", ""), "Scans": 0, "Sign Ins": 0, "Sign Outs": 0,
+                    "First Scan": row.get("Time", ""), "Last Scan": "", "Minutes In Room": 0, "Still In": "",
+                }
+            person["Scans"] += 1
+            if row.get("Action") == "SIGN IN":
+                person["Sign Ins"] += 1
+            elif row.get("Action") == "SIGN OUT":
+                person["Sign Outs"] += 1
+            person["Last Scan"] = row.get("Time", "")
+            duration = presence.apply(row)
+            if duration is not None:
+                person["Minutes In Room"] += round(duration.total_seconds() / 60)
 
-        df.to_excel(file_path, index=False)
+        for key in presence.sessions:
+            if key in people:
+                people[key]["Still In"] = "Yes"  # Signed in with no sign-out by the export
+
+        header(summary_sheet, SUMMARY_FIELDS)
+        for person in sorted(people.values(), key=lambda p: (p["Last Name"].lower(), p["First Name"].lower())):
+            summary_sheet.append([person[field] for field in SUMMARY_FIELDS])
+
+        wb.save(tmp_path)
+        os.replace(tmp_path, file_path)
         return True, str(file_path)
 
     except Exception as e:
+        if tmp_path is not None:
+            try: os.remove(tmp_path)
+            except OSError: pass
         return False, str(e)
 
 def update_last_ip(new_ip):
     """ Updates the LAST_IP in .env file safely """
+    update_env_value("LAST_IP", new_ip)
+
+
+def update_env_value(key, value):
+    """ Sets key=value in the .env file, replacing an existing line or appending one """
     env_path = Path(".env")
     if not env_path.exists():
         return # Can't update if not there
@@ -164,18 +269,18 @@ def update_last_ip(new_ip):
         with open(env_path, "r") as f:
             lines = f.readlines()
         
-        # Modify LAST_IP line or append
+        # Modify the key's line or append
         found = False
         new_lines = []
         for line in lines:
-            if line.strip().startswith("LAST_IP="):
-                new_lines.append(f"LAST_IP={new_ip}\n")
+            if line.strip().startswith(f"{key}="):
+                new_lines.append(f"{key}={value}\n")
                 found = True
             else:
                 new_lines.append(line)
         
         if not found:
-            new_lines.append(f"\nLAST_IP={new_ip}\n")
+            new_lines.append(f"\n{key}={value}\n")
             
         # Write back
         with open(env_path, "w") as f:
@@ -1,9 +1,13 @@
 from .gui import RFIDClientApp
 import tkinter as tk
+import time
 
-def main():
+def main(started=None):
     root = tk.Tk()
     app = RFIDClientApp(root)
+    if started is not None:
+        # First idle moment of the mainloop: the window is up and taking input
+        root.after_idle(lambda: print(f"Startup took {(time.perf_counter() - started) * 1000:.0f} ms"))
     root.mainloop()
 
 if __name__ == "__main__":
@@ -1,7 +1,34 @@
+import collections
+import random
 import socket
 import threading
-import json
-from .config import DEFAULT_PORT
+import time
+import uuid
+from .config import DEFAULT_PORT, HEARTBEAT_INTERVAL, HEARTBEAT_TIMEOUT, AUTO_DISCOVERY, DISCOVERY_PORT
+from .tracing import ClockOffset
+from common.protocol import (
+    MessageDecoder, RECV_SIZE, HEARTBEAT_TICK,
+    encode_message, hello_message, is_hello, recv_messages, enable_keepalive
+)
+from common.discovery import DEFAULT_TARGETS, discover
+
+CONNECT_TIMEOUT = 5
+BACKOFF_BASE = 0.5  # Seconds before the first retry
+BACKOFF_MAX = 30
+PENDING_LIMIT = 100  # Commands held while reconnecting
+FAILOVER_AFTER = 2  # Failed connects before looking for the server elsewhere on the LAN
+
+# Connection states reported to callback_connection
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """ Exponential backoff with jitter, so several clients don't retry in lockstep """
+    ceiling = min(cap, base * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
 
 class NetworkClient:
     def __init__(self, callback_read, callback_write_result):
@@ -9,77 +36,349 @@ class NetworkClient:
         self.connected = False
         self.callback_read = callback_read
         self.callback_write_result = callback_write_result
+        self.callback_stats = None  # Optional: called with the server's metrics snapshot
+        self.callback_write_progress = None  # Optional: called with each WRITE_PROGRESS message
+        self.callback_connection = None  # Optional: called with (state, msg) from the network threads
         self.stop_event = threading.Event()
+        self.send_lock = threading.Lock()
+        self.server_version = None
+        self.server_caps = set()
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.heartbeat_timeout = HEARTBEAT_TIMEOUT
+        self.last_rx = self.last_tx = 0.0
+        self.rtt = None  # Last ping round trip, seconds
+        self.clock = ClockOffset()  # Server clock vs ours, for READ traces
+        self.drop_reason = None
 
-    def connect(self, ip):
-        self.disconnect()
+        # Background connection manager, see start()
+        self.target = None
+        self.auto_reconnect = False
+        self.manager_thread = None
+        self.wake_event = threading.Event()
+        self.pending = collections.deque()  # Commands held while reconnecting
+        self.pending_lock = threading.Lock()
+
+        # LAN discovery, see pick_server()
+        self.discovery_enabled = AUTO_DISCOVERY
+        self.discovery_port = DISCOVERY_PORT
+        self.discovery_targets = DEFAULT_TARGETS
+        self.preferred_name = None  # Name of the last good server, followed across IP changes
+        self.server_name = None
+        self.servers = []  # Announcements from the last discovery
+
+    # --- Connection management ---
+    def start(self, ip, port=DEFAULT_PORT):
+        """
+        Keeps a connection to ip open in the background, reconnecting with
+        backoff whenever it drops. Never blocks the caller; progress is
+        reported through callback_connection. With discovery enabled the
+        manager first checks the LAN and, after FAILOVER_AFTER failed
+        attempts, moves to wherever the server is now answering.
+        """
+        target = (ip, port) if ip else None
+        if target != self.target:
+            self.server_name = None  # Unknown until discovery sees it
+        self.target = target
+        self.auto_reconnect = True
+        self.stop_event.clear()
+        if self.manager_thread and self.manager_thread.is_alive():
+            # Switching servers: drop the current link, the manager picks up the new target
+            self.drop_reason = f"Switching to {ip}"
+            self._close_socket()
+            self.wake_event.set()
+            return
+        self.manager_thread = threading.Thread(target=self._manager_loop, daemon=True)
+        self.manager_thread.start()
+
+    def _manager_loop(self):
+        attempt = 0
+        if self.discovery_enabled:
+            self.pick_server()
+        while not self.stop_event.is_set():
+            if self.target is None:
+                msg = "No server found on the network"
+            else:
+                ip, port = self.target
+                self.wake_event.clear()
+                self._notify(CONNECTING, f"Connecting to {ip}...")
+                ok, msg = self._open(ip, port)
+                if self.stop_event.is_set():
+                    self._close_socket()
+                    break
+                if ok:
+                    attempt = 0
+                    self._notify(CONNECTED, f"Connected to {self.describe_server()}")
+                    self._flush_pending()
+                    msg = self.listen_loop(self.socket)
+                    if self.stop_event.is_set():
+                        break
+                    self._close_socket()
+                    if self.target != (ip, port):
+                        continue  # Switched servers: connect to the new one right away
+
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self._notify(DISCONNECTED, f"{msg} - retrying in {delay:.1f}s")
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+            if self.discovery_enabled and attempt >= FAILOVER_AFTER and not self.stop_event.is_set():
+                self.pick_server()
+
+    def pick_server(self):
+        """
+        Probes the LAN and retargets to the best server that answered: the
+        current target, else the last good server by name, else the first
+        answer. Keeps the current target if nobody answered.
+        """
         try:
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(5)
-            self.socket.connect((ip, DEFAULT_PORT))
-            self.connected = True
-            self.stop_event.clear()
-            
-            # Start listener thread
-            self.thread = threading.Thread(target=self.listen_loop, daemon=True)
+            self.servers = discover(port=self.discovery_port, targets=self.discovery_targets)
+        except OSError as e:
+            print(f"Discovery failed: {e}")
+            return self.target
+        if not self.servers:
+            return self.target
+
+        def address(server):
+            return (server["ip"], server.get("port", DEFAULT_PORT))
+
+        choice = next((s for s in self.servers if address(s) == self.target), None)
+        if choice is None and self.preferred_name:
+            choice = next((s for s in self.servers if s.get("name") == self.preferred_name), None)
+        if choice is None:
+            choice = self.servers[0]
+        if address(choice) != self.target:
+            print(f"Discovered {choice.get('name')} at {choice['ip']}:{address(choice)[1]}")
+        self.target = address(choice)
+        self.server_name = choice.get("name")
+        return self.target
+
+    def describe_server(self):
+        ip = self.target[0] if self.target else "?"
+        return f"{self.server_name} ({ip})" if self.server_name else ip
+
+    def connect(self, ip, port=DEFAULT_PORT):
+        """ One-shot blocking connect without reconnects. Returns (ok, msg) """
+        self.disconnect()
+        self.stop_event.clear()
+        ok, msg = self._open(ip, port)
+        if ok:
+            self.thread = threading.Thread(target=self._listen_once, args=(self.socket,), daemon=True)
             self.thread.start()
-            return True, "Connected"
+        return ok, msg
+
+    def _listen_once(self, sock):
+        reason = self.listen_loop(sock)
+        if sock is self.socket and not self.stop_event.is_set():
+            # Dropped, not disconnected on purpose: release the socket and tell the UI
+            self._close_socket()
+            self._notify(DISCONNECTED, reason)
+
+    def _open(self, ip, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect((ip, port))
+            sock.settimeout(HEARTBEAT_TICK)
+            enable_keepalive(sock)
         except Exception as e:
+            try: sock.close()
+            except: pass
             return False, str(e)
 
-    def disconnect(self):
+        self.socket = sock
+        self.connected = True
+        self.last_rx = self.last_tx = time.monotonic()
+        self.drop_reason = None
+        self.server_version = None
+        self.server_caps = set()
+
+        # Announce ourselves; a v1 server just ignores the unknown action
+        if not self._send(hello_message("client")):
+            self._close_socket()
+            return False, self.drop_reason or "Handshake failed"
+        return True, "Connected"
+
+    def _close_socket(self):
         self.connected = False
-        self.stop_event.set()
-        if self.socket:
-            try: self.socket.close()
+        sock = self.socket
+        if sock:
+            # shutdown() wakes a listener blocked in recv; close() alone may not
+            try: sock.shutdown(socket.SHUT_RDWR)
+            except: pass
+            try: sock.close()
             except: pass
+
+    def disconnect(self):
+        """ Closes the connection, stops reconnecting and drops held commands """
+        self.auto_reconnect = False
+        self.stop_event.set()
+        self.wake_event.set()
+        self._close_socket()
         self.socket = None
+        self.server_version = None
+        self.server_caps = set()
+        with self.pending_lock:
+            self.pending.clear()
+
+    def _notify(self, state, msg):
+        if self.callback_connection:
+            self.callback_connection(state, msg)
+
+    # --- Sending ---
+    def send_write(self, text, timeout=None, priority=0, overwrite=True, verify=False, card=None, job_id=None):
+        """
+        Queues a write job on the server. Returns its job id, or False if not
+        sent. While reconnecting the write is held and sent once the link is
+        back, and its job id is returned straight away. card (see
+        common.card_format.make_card) gives the exact fields; text is what
+        an older server writes instead.
+        """
+        job_id = job_id or uuid.uuid4().hex[:8]
+        cmd = {"action": "write", "content": text, "job_id": job_id,
+               "priority": priority, "overwrite": overwrite, "verify": verify}
+        if card is not None:
+            cmd["card"] = card
+        if timeout is not None:
+            cmd["timeout"] = timeout
+        if self._send_or_hold(cmd):
+            return job_id
+        return False
+
+    def cancel_write(self, job_id):
+        held = None
+        with self.pending_lock:
+            for cmd in self.pending:
+                if cmd.get("action") == "write" and cmd.get("job_id") == job_id:
+                    held = cmd
+                    self.pending.remove(cmd)
+                    break
+        if held is None:
+            return self._send_or_hold({"action": "cancel_write", "job_id": job_id})
+
+        # Never reached the server, so report the cancel here the way the server would
+        if self.callback_write_progress:
+            self.callback_write_progress({"type": "WRITE_PROGRESS", "job_id": job_id, "status": "cancelled",
+                                          "msg": "Cancelled", "attempts": 0})
+        self.callback_write_result(False, "Cancelled", job_id)
+        return True
+
+    def has_pending(self):
+        with self.pending_lock:
+            return bool(self.pending)
+
+    def _send_or_hold(self, cmd):
+        if self.connected and self._send(cmd):
+            return True
+        if not self.auto_reconnect:
+            return False
+        with self.pending_lock:
+            if len(self.pending) >= PENDING_LIMIT:
+                return False
+            self.pending.append(cmd)
+        return True
+
+    def _flush_pending(self):
+        """ Sends held commands in order; anything unsent waits for the next connection """
+        while True:
+            with self.pending_lock:
+                if not self.pending:
+                    return
+                cmd = self.pending[0]
+            if not self._send(cmd):
+                return
+            with self.pending_lock:
+                if self.pending and self.pending[0] is cmd:
+                    self.pending.popleft()
 
-    def send_write(self, text):
+    def _send(self, cmd):
         if not self.connected:
             return False
         try:
-            cmd = {"action": "write", "content": text}
-            msg = json.dumps(cmd) + "\n"
-            self.socket.sendall(msg.encode('utf-8'))
+            with self.send_lock:
+                self.socket.sendall(encode_message(cmd))
+            self.last_tx = time.monotonic()
             return True
         except Exception as e:
-            self.disconnect()
+            # Wake the listener, which releases the socket and reports the drop
+            self.drop_reason = f"Send failed: {e}"
+            self.connected = False
+            try: self.socket.shutdown(socket.SHUT_RDWR)
+            except: pass
             return False
 
-    def listen_loop(self):
-        buffer = ""
+    def request_stats(self):
+        """ Asks the server for its metrics; the reply goes to callback_stats """
+        return self._send({"action": "stats"})
+
+    # --- Receiving ---
+    def listen_loop(self, sock):
+        """ Reads and dispatches messages until the link drops; returns the reason """
+        decoder = MessageDecoder()
+        recv_buffer = bytearray(RECV_SIZE)
+        reason = "Server closed the connection"
         while not self.stop_event.is_set():
             try:
-                data = self.socket.recv(1024)
-                if not data:
+                messages = recv_messages(sock, decoder, recv_buffer)
+                if messages is None:
                     break # Server closed
-                
-                buffer += data.decode('utf-8')
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    if not line: continue
-                    self.process_msg(line)
+
+                self.last_rx = time.monotonic()
+                for msg in messages:
+                    self.process_msg(msg)
             except socket.timeout:
-                continue
+                pass
             except Exception as e:
-                print(f"Network Error: {e}")
+                reason = f"Network Error: {e}"
+                break
+
+            if not self.check_heartbeat():
+                reason = "Server stopped responding"
                 break
-        
+
         self.connected = False
+        reason = self.drop_reason or reason
+        if not self.stop_event.is_set():
+            print(f"Connection lost: {reason}")
+        return reason
 
-    def process_msg(self, line):
-        try:
-            msg = json.loads(line)
-            mtype = msg.get("type")
-            
-            if mtype == "READ":
-                data = msg.get("data", "")
-                self.callback_read(data)
-            elif mtype == "WRITE_RESULT":
-                success = msg.get("success")
-                text = msg.get("msg")
-                self.callback_write_result(success, text)
-                
-        except json.JSONDecodeError:
-            pass
+    def check_heartbeat(self):
+        """ Pings an idle server; returns False once it has been silent too long """
+        if "heartbeat" not in self.server_caps:
+            return True  # v1 server: no pings, rely on TCP keepalive
+        now = time.monotonic()
+        if now - self.last_rx > self.heartbeat_timeout:
+            return False
+        if now - self.last_tx > self.heartbeat_interval:
+            self._send({"action": "ping", "t": time.time()})
+        return True
+
+    def process_msg(self, msg):
+        mtype = msg.get("type")
+
+        if is_hello(msg):
+            self.server_version = msg.get("version")
+            self.server_caps = set(msg.get("capabilities", []))
+            self.clock.reset()  # Possibly a different Pi
+        elif mtype == "PING":
+            self._send({"action": "pong"})
+        elif mtype == "PONG":
+            if msg.get("t"):
+                now = time.time()
+                self.rtt = now - msg["t"]
+                if msg.get("server_time"):
+                    self.clock.add_sample(msg["t"], msg["server_time"], now)
+        elif mtype == "READ":
+            data = msg.get("data", "")
+            trace = self.clock.to_local(msg["trace"]) if isinstance(msg.get("trace"), dict) else {}
+            trace["received"] = time.time()
+            self.callback_read(data, msg.get("card"), trace)
+        elif mtype == "WRITE_RESULT":
+            success = msg.get("success")
+            text = msg.get("msg")
+            self.callback_write_result(success, text, msg.get("job_id"))  # job_id is None from v1 servers
+        elif mtype == "WRITE_PROGRESS":
+            if self.callback_write_progress:
+                self.callback_write_progress(msg)
+        elif mtype == "STATS":
+            if self.callback_stats:
+                self.callback_stats(msg.get("stats", {}))
@@ -0,0 +1,79 @@
+import datetime
+from .config import REPEAT_TAP_SECONDS
+
+SIGN_IN = "SIGN IN"
+SIGN_OUT = "SIGN OUT"
+AUTO = "AUTO"
+
+
+def record_time(record):
+    """ When a scan record happened, from its Date and Time columns (now if unparseable) """
+    try:
+        return datetime.datetime.strptime(f"{record['Date']} {record['Time']}", "%Y-%m-%d %I:%M:%S %p")
+    except (KeyError, ValueError):
+        return datetime.datetime.now()
+
+
+def format_duration(duration):
+    minutes = int(duration.total_seconds() // 60)
+    return f"{minutes // 60}h {minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+
+class PresenceIndex:
+    """
+    Who is in the room: email -> open session.
+
+    A tap by someone without an open session signs them in, a tap by
+    someone with one signs them out and yields the session's duration.
+    Taps by the same person within REPEAT_TAP_SECONDS are repeats (card
+    left on the reader, double tap) rather than a state change. The index
+    is rebuilt after a restart by applying the day's journal in order.
+    """
+
+    def __init__(self, repeat_seconds=REPEAT_TAP_SECONDS):
+        self.repeat_seconds = repeat_seconds
+        self.sessions = {}  # email -> {"since": datetime, "name": str}
+        self.last_tap = {}  # email -> datetime of the last recorded scan
+
+    @staticmethod
+    def key(email):
+        email = (email or "").strip().lower()
+        return email if email and email != "n/a" else None
+
+    def next_action(self, email):
+        return SIGN_OUT if self.key(email) in self.sessions else SIGN_IN
+
+    def is_repeat(self, email, when=None):
+        key = self.key(email)
+        last = self.last_tap.get(key)
+        if key is None or last is None:
+            return False
+        return ((when or datetime.datetime.now()) - last).total_seconds() < self.repeat_seconds
+
+    def apply(self, record):
+        """ Applies a recorded scan; returns the closed session's duration on a sign-out, else None """
+        key = self.key(record.get("Email"))
+        if key is None:
+            return None
+        when = record_time(record)
+        self.last_tap[key] = when
+        action = record.get("Action")
+        if action == SIGN_IN:
+            # A repeated sign-in (older logs, manual override) keeps the original start
+            self.sessions.setdefault(key, {"since": when, "name": f"{record.get('First Name', '')} {record.get('Last Name', '')}".strip()})
+        elif action == SIGN_OUT:
+            session = self.sessions.pop(key, None)
+            if session is not None:
+                return max(when - session["since"], datetime.timedelta(0))
+        return None
+
+    def count(self):
+        return len(self.sessions)
+
+    def present(self):
+        """ [(name, since)] of everyone signed in, longest first """
+        return sorted(((s["name"], s["since"]) for s in self.sessions.values()), key=lambda p: p[1])
+
+    def clear(self):
+        self.sessions.clear()
+        self.last_tap.clear()
@@ -0,0 +1,176 @@
+import csv
+import datetime
+from pathlib import Path
+from .config import EXPORT_DIR
+from .logic import member_card
+from common.card_format import CardFormatError, card_text, encode_card
+
+# Accepted roster header spellings (lower-cased) for each card field
+ROSTER_COLUMNS = {
+    "email": ["email", "email username", "email_user", "username", "student email"],
+    "fname": ["first name", "first", "fname", "first_name"],
+    "lname": ["last name", "last", "lname", "last_name"],
+    "officer": ["officer", "is officer", "is_officer"],
+}
+REPORT_FIELDS = ["Email", "First Name", "Last Name", "Officer", "Status", "Message", "Attempts", "Job ID", "Finished"]
+
+PENDING = "pending"
+FINAL_STATUSES = ("done", "failed", "timeout", "cancelled")
+
+
+def load_roster(path):
+    """ Reads a roster CSV into card entries. Returns (entries, errors) """
+    entries, errors = [], []
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        headers = {h.strip().lower(): h for h in (reader.fieldnames or [])}
+        columns = {}
+        for field, names in ROSTER_COLUMNS.items():
+            columns[field] = next((headers[n] for n in names if n in headers), None)
+        missing = [f for f in ("email", "fname", "lname") if columns[f] is None]
+        if missing:
+            return [], [f"Roster is missing column(s): {', '.join(missing)}"]
+
+        for line_no, row in enumerate(reader, start=2):
+            email = (row.get(columns["email"]) or "").strip()
+            fname = (row.get(columns["fname"]) or "").strip()
+            lname = (row.get(columns["lname"]) or "").strip()
+            officer_raw = (row.get(columns["officer"]) or "") if columns["officer"] else ""
+            officer = officer_raw.strip().lower() in ("1", "true", "yes", "y", "x")
+            if not (email or fname or lname):
+                continue  # Blank line
+            if not (email and fname and lname):
+                errors.append(f"Line {line_no}: missing email or name")
+                continue
+            try:
+                encode_card(member_card(email, fname, lname, officer))  # Separator byte, fits on the card
+            except CardFormatError as e:
+                errors.append(f"Line {line_no}: {e}")
+                continue
+            entries.append({
+                "email": email, "fname": fname, "lname": lname, "officer": officer,
+                "status": PENDING, "msg": "", "attempts": 0, "job_id": None, "finished": "",
+            })
+    return entries, errors
+
+
+class BatchProvisioner:
+    """
+    Streams one write job at a time to the server and advances when the
+    job finishes, so an officer can just keep presenting blank cards.
+
+    Every method runs on the Tk thread (progress messages are marshalled
+    through the GUI's UI event queue). on_change() is called after each state
+    change so the view can refresh.
+    """
+
+    def __init__(self, client, on_change, job_timeout=60, verify=True):
+        self.client = client
+        self.on_change = on_change
+        self.job_timeout = job_timeout
+        self.verify = verify
+        self.overwrite = False
+        self.entries = []
+        self.index = 0
+        self.running = False
+        self.current_job = None
+        self.started = None
+
+    def load(self, path):
+        self.entries, errors = load_roster(path)
+        self.index = 0
+        self.current_job = None
+        self.running = False
+        self.on_change()
+        return len(self.entries), errors
+
+    def current(self):
+        return self.entries[self.index] if self.index < len(self.entries) else None
+
+    def start(self):
+        """ Starts (or resumes); every entry not yet written is (re)tried in roster order """
+        if not self.entries or self.running:
+            return False
+        self.running = True
+        self.index = 0
+        self.started = self.started or datetime.datetime.now()
+        self._submit_next()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.current_job:
+            self.client.cancel_write(self.current_job)
+        self.on_change()
+
+    def skip(self):
+        """ Gives up on the current card; the cancel result advances the batch """
+        if self.current_job:
+            self.client.cancel_write(self.current_job)
+
+    def _submit_next(self):
+        while self.index < len(self.entries) and self.entries[self.index]["status"] == "done":
+            self.index += 1
+        entry = self.current()
+        if not self.running or entry is None:
+            self.running = False
+            self.current_job = None
+            self.on_change()
+            return
+
+        card = member_card(entry["email"], entry["fname"], entry["lname"], entry["officer"])
+        job_id = self.client.send_write(card_text(card), timeout=self.job_timeout, overwrite=self.overwrite,
+                                        verify=self.verify, card=card)
+        if not job_id:
+            # Lost the Pi: pause here, start() resumes with this entry
+            entry["msg"] = "Not connected"
+            self.running = False
+            self.current_job = None
+        else:
+            entry["job_id"] = job_id
+            entry["status"] = "queued"
+            self.current_job = job_id
+        self.on_change()
+
+    def handle_progress(self, progress):
+        if progress.get("job_id") != self.current_job:
+            return
+        entry = self.current()
+        status = progress.get("status")
+        entry["status"] = status
+        entry["msg"] = progress.get("msg", "")
+        entry["attempts"] = progress.get("attempts", entry["attempts"])
+        if status in FINAL_STATUSES:
+            entry["finished"] = datetime.datetime.now().strftime("%Y-%m-%d %I:%M:%S %p")
+            self.current_job = None
+            self.index += 1
+            self._submit_next()
+        else:
+            self.on_change()
+
+    def is_batch_job(self, job_id):
+        return job_id is not None and job_id == self.current_job
+
+    def summary(self):
+        counts = {}
+        for entry in self.entries:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def write_report(self):
+        """ Writes the per-card results CSV and returns its path """
+        stamp = (self.started or datetime.datetime.now()).strftime("%Y-%m-%d_%H%M%S")
+        folder = Path(EXPORT_DIR) / "Provisioning"
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{stamp}_provisioning.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for entry in self.entries:
+                writer.writerow({
+                    "Email": entry["email"], "First Name": entry["fname"], "Last Name": entry["lname"],
+                    "Officer": entry["officer"], "Status": entry["status"], "Message": entry["msg"],
+                    "Attempts": entry["attempts"], "Job ID": entry["job_id"] or "",
+                    "Finished": entry["finished"],
+                })
+        return str(path)
@@ -0,0 +1,255 @@
+"""
+Attendance reports across the daily exports (Exports/YYYY/Month/DD_attendance.xlsx).
+
+Each workbook is summarised once into REPORT_INDEX (per member: visits and
+minutes in the room) and the summary is reused until the file's mtime or
+size changes, so a report only opens new or re-exported days. A large
+backfill is spread over a process pool.
+
+    python -m client.reports [--month 2026-10 | --semester fall-2026 | --from D --to D]
+                             [--by member|week|month] [--rebuild]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from .config import EXPORT_DIR
+from .presence import PresenceIndex, SIGN_IN
+
+REPORT_INDEX = os.path.join(EXPORT_DIR, "report_index.json")
+INDEX_VERSION = 1
+POOL_THRESHOLD = 8  # Fewer changed files than this are parsed in-process; a pool costs more to start
+SEMESTERS = {"spring": (1, 5), "summer": (6, 8), "fall": (9, 12)}  # First and last month
+
+
+def export_day(path):
+    """ YYYY-MM-DD from an export's Exports/YYYY/Month/DD_attendance.xlsx path, or None """
+    try:
+        return datetime.datetime.strptime(f"{path.parent.parent.name} {path.parent.name} {path.name[:2]}",
+                                          "%Y %B %d").date().isoformat()
+    except ValueError:
+        return None
+
+
+def summarize_export(path):
+    """
+    Per-member summary of one export: {"day", "members": {email: {"name",
+    "visits", "minutes"}}}. Visits are sign-ins (at least 1 for anyone who
+    scanned); minutes come from pairing sign-ins with sign-outs.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = wb["Attendance"] if "Attendance" in wb.sheetnames else wb.worksheets[0]  # Older exports: Sheet1
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, [])]
+        day = export_day(Path(path))
+        members = {}
+        presence = PresenceIndex()
+        for values in rows:
+            row = {k: ("" if v is None else str(v)) for k, v in zip(header, values)}
+            key = presence.key(row.get("Email"))
+            if key is None:
+                continue
+            day = day or row.get("Date")
+            member = members.get(key)
+            if member is None:
+                member = members[key] = {"name": f"{row.get('First Name', '')} {row.get('Last Name', '')}".strip(),
+                                         "visits": 0, "minutes": 0}
+            if row.get("Action") == SIGN_IN and key not in presence.sessions:
+                member["visits"] += 1
+            duration = presence.apply(row)
+            if duration is not None:
+                member["minutes"] += round(duration.total_seconds() / 60)
+        for member in members.values():
+            member["visits"] = max(member["visits"], 1)
+        return {"day": day, "members": members}
+    finally:
+        wb.close()
+
+
+def _summarize_job(path):
+    """ Process pool entry point: never raises, so one bad workbook doesn't sink the backfill """
+    try:
+        return path, summarize_export(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class ReportIndex:
+    """ Cached per-export summaries, keyed by path and validated by mtime + size """
+
+    def __init__(self, export_dir=EXPORT_DIR, index_path=None):
+        self.export_dir = export_dir
+        self.index_path = index_path or os.path.join(export_dir, os.path.basename(REPORT_INDEX))
+        self.entries = {}  # relative path -> {"mtime", "size", "day", "members"}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("files", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring unreadable report index: {e}")
+
+    def save(self):
+        """ Atomic write, like the card cache """
+        tmp_path = self.index_path + ".tmp"
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self, workers=None):
+        """ Parses exports that are new or changed since they were indexed. Returns (parsed, failed) """
+        found = {}
+        for path in Path(self.export_dir).glob("*/*/*_attendance.xlsx"):
+            stat = path.stat()
+            found[path.relative_to(self.export_dir).as_posix()] = (stat.st_mtime, stat.st_size)
+
+        stale = [rel for rel, (mtime, size) in found.items()
+                 if rel not in self.entries
+                 or (self.entries[rel]["mtime"], self.entries[rel]["size"]) != (mtime, size)]
+        removed = [rel for rel in self.entries if rel not in found]
+        for rel in removed:
+            del self.entries[rel]
+
+        paths = [os.path.join(self.export_dir, rel) for rel in stale]
+        if len(paths) >= POOL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_summarize_job, paths, chunksize=4))
+        else:
+            results = [_summarize_job(path) for path in paths]
+
+        failed = []
+        for rel, (path, summary, error) in zip(stale, results):
+            if summary is None:
+                # Remembered too, so a broken workbook isn't reopened until it changes
+                failed.append((rel, error))
+                summary = {"day": None, "members": {}, "error": error}
+            mtime, size = found[rel]
+            self.entries[rel] = {"mtime": mtime, "size": size, **summary}
+        if stale or removed:
+            self.save()
+        return len(stale) - len(failed), failed
+
+    def days(self, start=None, end=None):
+        """ (day, members) of every indexed export in [start, end] (ISO dates, inclusive) """
+        for entry in sorted(self.entries.values(), key=lambda e: e["day"] or ""):
+            day = entry["day"]
+            if day and (start is None or day >= start) and (end is None or day <= end):
+                yield day, entry["members"]
+
+
+def period_key(day, by):
+    date = datetime.date.fromisoformat(day)
+    if by == "week":
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    return day[:7]
+
+
+def build_report(index, start=None, end=None, by="member"):
+    """
+    Totals and rows for the date range. Rows are per member (name, visits,
+    hours, days) or per week/month (visits, unique members, hours).
+    """
+    totals = {"days": 0, "visits": 0, "members": set(), "minutes": 0}
+    groups = {}
+    for day, members in index.days(start, end):
+        totals["days"] += 1
+        for email, m in members.items():
+            totals["visits"] += m["visits"]
+            totals["minutes"] += m["minutes"]
+            totals["members"].add(email)
+            key = email if by == "member" else period_key(day, by)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"name": m["name"], "visits": 0, "minutes": 0, "members": set(), "days": 0}
+            group["visits"] += m["visits"]
+            group["minutes"] += m["minutes"]
+            group["members"].add(email)
+            group["days"] += 1
+
+    rows = []
+    for key, g in groups.items():
+        if by == "member":
+            rows.append({"member": g["name"] or key, "email": key, "visits": g["visits"], "days": g["days"],
+                         "hours": round(g["minutes"] / 60, 1)})
+        else:
+            rows.append({by: key, "visits": g["visits"], "members": len(g["members"]),
+                         "hours": round(g["minutes"] / 60, 1)})
+    if by == "member":
+        rows.sort(key=lambda r: (-r["hours"], -r["visits"], r["member"].lower()))
+    else:
+        rows.sort(key=lambda r: r[by])
+    summary = {"days": totals["days"], "visits": totals["visits"], "members": len(totals["members"]),
+               "hours": round(totals["minutes"] / 60, 1)}
+    return summary, rows
+
+
+def date_range(args):
+    if args.month:
+        year, month = (int(part) for part in args.month.split("-"))
+        last = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)).day
+        return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{last:02d}"
+    if args.semester:
+        name, year = args.semester.lower().split("-")
+        first, last = SEMESTERS[name]
+        end = datetime.date(int(year) + last // 12, last % 12 + 1, 1) - datetime.timedelta(days=1)
+        return f"{year}-{first:02d}-01", end.isoformat()
+    return args.start, args.end
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attendance report across the daily Excel exports")
+    span = parser.add_mutually_exclusive_group()
+    span.add_argument("--month", help="YYYY-MM")
+    span.add_argument("--semester", help="spring-YYYY, summer-YYYY or fall-YYYY")
+    parser.add_argument("--from", dest="start", help="First day, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD")
+    parser.add_argument("--by", choices=["member", "week", "month"], default="member")
+    parser.add_argument("--top", type=int, default=0, help="Only show the first N rows")
+    parser.add_argument("--rebuild", action="store_true", help="Re-read every export")
+    parser.add_argument("--export-dir", default=EXPORT_DIR)
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    index = ReportIndex(args.export_dir)
+    if args.rebuild:
+        index.entries = {}
+    parsed, failed = index.refresh()
+    indexed_at = time.perf_counter()
+    for rel, error in failed:
+        print(f"Skipped {rel}: {error}")
+
+    start, end = date_range(args)
+    summary, rows = build_report(index, start, end, args.by)
+    done = time.perf_counter()
+
+    print(f"--- Attendance {start or 'start'} to {end or 'today'} ---")
+    print(f"{summary['days']} days, {summary['visits']} visits, {summary['members']} unique members, "
+          f"{summary['hours']} hours")
+    if args.top:
+        rows = rows[:args.top]
+    if rows:
+        columns = list(rows[0].keys())
+        widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in columns]
+        print("  ".join(c.title().ljust(w) for c, w in zip(columns, widths)).rstrip())
+        for r in rows:
+            print("  ".join(str(r[c]).ljust(w) for c, w in zip(columns, widths)).rstrip())
+    print(f"({len(index.entries)} exports indexed, {parsed} parsed now in {(indexed_at - start_time) * 1000:.0f} ms, "
+          f"report in {(done - indexed_at) * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
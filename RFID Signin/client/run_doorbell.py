@@ -1,5 +1,8 @@
 import sys
 import os
+import time
+
+STARTED = time.perf_counter()
 
 # Ensure the parent directory is in path so 'client' can be imported as a package
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -8,17 +11,27 @@ sys.path.append(parent_dir)
 
 
 def start():
-    # 1. Check Dependencies
+    # 1. Check Dependencies (a full scan only when requirements.txt or the interpreter changed)
+    force = "--check-deps" in sys.argv
     try:
         from client.dependency_checker import check_and_install_dependencies
-        check_and_install_dependencies()
+        elapsed = check_and_install_dependencies(force=force)
+        print(f"Dependency check: {elapsed * 1000:.0f} ms")
 
     except Exception as e:
         print(f"Dependency Check Warning: {e}")
 
     # 2. Launch App
-    from client.main import main
-    main()
+    try:
+        from client.main import main
+    except ImportError as e:
+        # Something was uninstalled behind the stamp's back: rescan once, then retry
+        print(f"Import failed ({e}), re-checking dependencies...")
+        from client.dependency_checker import check_and_install_dependencies, invalidate_stamp
+        invalidate_stamp()
+        check_and_install_dependencies(force=True)
+        from client.main import main
+    main(started=STARTED)
 
 if __name__ == "__main__":
     start()
@@ -0,0 +1,118 @@
+import datetime
+import os
+import threading
+import time
+from .config import EXPORT_TIME
+from .journal import read_rows
+from .logic import export_logs_to_excel, export_path
+
+MAX_SLEEP = 300  # Longest single timer; each wake re-checks the wall clock
+JUMP_TOLERANCE = 60  # Seconds a wake may be off before it counts as a clock jump or sleep
+
+
+class ExportScheduler:
+    """
+    Exports the day's attendance at EXPORT_TIME and catches up on days that
+    were never exported (PC asleep or app closed at the deadline).
+
+    Only one Tk timer is pending at a time. It is armed for the next
+    deadline but never longer than MAX_SLEEP, and every wake re-reads the
+    wall clock, so sleep, a clock change or DST just shortens or lengthens
+    the next wait. Exports run on a worker thread; on_result(results) is
+    called on the Tk thread with a list of (day, success, message).
+    """
+
+    def __init__(self, root, backup, on_result, on_deadline=None, export_time=EXPORT_TIME):
+        self.root = root
+        self.backup = backup
+        self.on_result = on_result
+        self.on_deadline = on_deadline  # Optional: called on the Tk thread when the deadline passes
+        self.hour, self.minute = export_time
+        self.timer = None
+        self.deadline = None
+        self.expected_wake = None
+        self.last_export_date = None
+        self.lock = threading.Lock()
+        self.running = False
+        self.pending_today = None  # None: nothing queued; else whether the queued run includes today
+
+    def start(self):
+        """ Catches up on past days in the background and arms the first deadline """
+        self.run_in_background(include_today=False)
+        self.arm()
+
+    def stop(self):
+        if self.timer:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    # --- Timer (Tk thread) ---
+    def next_deadline(self, now):
+        deadline = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.last_export_date == now.date().isoformat():
+            deadline += datetime.timedelta(days=1)
+        return deadline
+
+    def arm(self):
+        now = datetime.datetime.now()
+        self.deadline = self.next_deadline(now)
+        wait = max(0.0, min((self.deadline - now).total_seconds(), MAX_SLEEP))
+        self.expected_wake = time.time() + wait
+        self.timer = self.root.after(int(wait * 1000), self._wake)
+
+    def _wake(self):
+        self.timer = None
+        drift = time.time() - self.expected_wake
+        if abs(drift) > JUMP_TOLERANCE:
+            print(f"Export scheduler: clock jumped or system slept ({drift:+.0f}s), re-arming")
+        now = datetime.datetime.now()
+        if now >= self.deadline:
+            day = self.deadline.date().isoformat()
+            self.last_export_date = day
+            if self.on_deadline:
+                self.on_deadline(day)
+            self.run_in_background(include_today=True)
+        self.arm()
+
+    # --- Exports (worker thread) ---
+    def export_now(self):
+        """ Exports today (and any missed days) right away, e.g. from the admin panel """
+        self.run_in_background(include_today=True)
+
+    def run_in_background(self, include_today):
+        with self.lock:
+            if self.running:
+                # One worker at a time; fold this request into a rerun when it finishes
+                self.pending_today = bool(self.pending_today) or include_today
+                return
+            self.running = True
+        threading.Thread(target=self._export_loop, args=(include_today,), daemon=True).start()
+
+    def _export_loop(self, include_today):
+        while True:
+            try:
+                results = self.export_pending(include_today)
+            except Exception as e:
+                results = [(None, False, str(e))]
+            if results:
+                self.root.after(0, lambda r=results: self.on_result(r))
+            with self.lock:
+                if self.pending_today is None:
+                    self.running = False
+                    return
+                include_today, self.pending_today = self.pending_today, None
+
+    def export_pending(self, include_today):
+        """ Exports every archived day whose workbook is missing or older than its journal, then today """
+        results = []
+        self.backup.roll_over()
+        for day, path in self.backup.archives():
+            xlsx = export_path(day)
+            if xlsx.exists() and os.path.getmtime(xlsx) >= os.path.getmtime(path):
+                continue
+            success, msg = export_logs_to_excel(read_rows(path), day)
+            results.append((day, success, msg))
+        if include_today:
+            success, msg = export_logs_to_excel(self.backup.replay_today(), self.backup.day)
+            results.append((self.backup.day, success, msg))
+        return results
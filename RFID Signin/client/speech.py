@@ -0,0 +1,152 @@
+import hashlib
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import pyttsx3
+from .config import TTS_CACHE_DIR
+
+QUEUE_SIZE = 4  # Greetings waiting to be spoken; more than this are dropped
+REPEAT_WINDOW = 5  # Seconds during which the same text isn't spoken twice (double taps)
+PLAY_TIMEOUT = 30
+
+
+def find_player():
+    """ Command that plays a wav file and blocks until done, or None (Windows uses winsound) """
+    if sys.platform.startswith("win"):
+        return None
+    for cmd in (["afplay"], ["aplay", "-q"], ["paplay"]):
+        if shutil.which(cmd[0]):
+            return cmd
+    return None
+
+
+class SpeechWorker:
+    """
+    One long-lived text-to-speech thread fed by a queue.
+
+    pyttsx3 engines belong to the thread that created them, so the engine is
+    created once on the worker and every request goes through say(). Texts
+    passed to prerender() are rendered to wav files under TTS_CACHE_DIR
+    (named by a hash of the text, so they survive restarts) and played from
+    there, which skips synthesis on the tap itself.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.engine = None
+        self.player = find_player()
+        self.last_text = None
+        self.last_spoken = 0.0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # --- Called from any thread ---
+    def say(self, text):
+        """ Queues text to be spoken; returns False if it was dropped """
+        try:
+            self.queue.put_nowait(("say", text))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"TTS busy, dropped: {text}")
+            return False
+
+    def prerender(self, texts):
+        """ Renders any of texts that aren't cached yet, between greetings """
+        try:
+            self.queue.put_nowait(("render", list(texts)))
+        except queue.Full:
+            pass  # Rendered on the next roster load instead
+
+    def stop(self):
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def cache_path(self, text):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def _part_path(self, text):
+        # Keep the extension: some engines pick the audio format from it
+        return self.cache_path(text)[:-4] + ".part.wav"
+
+    # --- Worker thread ---
+    def _run(self):
+        try:
+            self.engine = pyttsx3.init()
+        except Exception as e:
+            print(f"TTS Init Failed: {e}")
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "render":
+                self._render(payload)
+            else:
+                self._speak(payload)
+
+        if self.engine:
+            try: self.engine.stop()
+            except: pass
+
+    def _speak(self, text):
+        now = time.monotonic()
+        if text == self.last_text and now - self.last_spoken < REPEAT_WINDOW:
+            return  # Same greeting again within a few seconds: coalesce
+        self.last_text, self.last_spoken = text, now
+
+        path = self.cache_path(text)
+        if os.path.exists(path) and self._play(path):
+            self.last_spoken = time.monotonic()
+            return
+        if self.engine:
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+        self.last_spoken = time.monotonic()
+
+    def _play(self, path):
+        try:
+            if sys.platform.startswith("win"):
+                import winsound
+                winsound.PlaySound(path, winsound.SND_FILENAME)
+                return True
+            if self.player:
+                subprocess.run(self.player + [path], timeout=PLAY_TIMEOUT, check=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                return True
+        except Exception as e:
+            print(f"TTS playback failed, speaking instead: {e}")
+        return False
+
+    def _render(self, texts):
+        if not self.engine:
+            return
+        missing = [t for t in dict.fromkeys(texts) if not os.path.exists(self.cache_path(t))]
+        if not missing:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for text in missing:
+                # Render to a temp name so a half-written file is never played
+                self.engine.save_to_file(text, self._part_path(text))
+            self.engine.runAndWait()
+            for text in missing:
+                tmp_path = self._part_path(text)
+                if os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
+                    os.replace(tmp_path, self.cache_path(text))
+            print(f"Pre-rendered {len(missing)} greeting(s)")
+        except Exception as e:
+            print(f"TTS pre-render failed: {e}")
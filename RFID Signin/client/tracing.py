@@ -0,0 +1,117 @@
+"""
+Where the time goes between a tap and the name on screen.
+
+The Pi stamps each READ with "trace": {"detected", "read", "sent"} (its
+wall clock, epoch seconds). The client converts those to its own clock
+with ClockOffset, then adds "received" (NetworkClient), "persisted" (the
+daemon handed the record to the journal) and "painted" (the GUI's frame
+showing it was drawn). TapTraces keeps the completed traces and turns
+them into per-segment percentiles.
+"""
+import collections
+import csv
+import os
+from .config import TRACE_FILE
+
+STAGES = ("detected", "read", "sent", "received", "persisted", "painted")
+SERVER_STAGES = ("detected", "read", "sent")
+# (name, from stage, to stage)
+SEGMENTS = (
+    ("card_read", "detected", "read"),
+    ("server_send", "read", "sent"),
+    ("network", "sent", "received"),
+    ("record", "received", "persisted"),
+    ("display", "persisted", "painted"),
+    ("total", "detected", "painted"),
+)
+CLOCK_SAMPLES = 8  # Recent pings considered for the offset
+TRACE_SAMPLES = 1000  # Completed traces kept for percentiles and dumps
+PENDING_TRACES = 100  # Recorded scans waiting for a GUI to paint them
+
+
+class ClockOffset:
+    """
+    Pi clock minus local clock, from ping/pong: the Pi's time is assumed to
+    be read halfway through the round trip. The sample with the shortest
+    round trip of the last few is used, since it has the least queueing in
+    it. The Pi has no RTC, so this can be minutes off until it syncs NTP.
+    """
+
+    def __init__(self):
+        self.samples = collections.deque(maxlen=CLOCK_SAMPLES)  # (rtt, offset)
+
+    def add_sample(self, sent, server_time, received):
+        rtt = received - sent
+        if rtt >= 0:
+            self.samples.append((rtt, server_time - (sent + rtt / 2)))
+
+    def reset(self):
+        self.samples.clear()
+
+    @property
+    def offset(self):
+        """ Seconds to subtract from a Pi timestamp, or None before the first pong """
+        return min(self.samples)[1] if self.samples else None
+
+    def to_local(self, trace):
+        """ Copy of the Pi's stamps on the local clock (unchanged before the first pong) """
+        offset = self.offset or 0.0
+        return {stage: trace[stage] - offset for stage in SERVER_STAGES if isinstance(trace.get(stage), (int, float))}
+
+
+def percentiles(values):
+    values = sorted(values)
+    n = len(values)
+    return {
+        "count": n,
+        "p50_ms": round(values[n // 2] * 1000, 1),
+        "p95_ms": round(values[min(n - 1, int(n * 0.95))] * 1000, 1),
+        "p99_ms": round(values[min(n - 1, int(n * 0.99))] * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+    }
+
+
+class TapTraces:
+    """ Completed tap traces; everything runs on the daemon loop thread """
+
+    def __init__(self, maxlen=TRACE_SAMPLES):
+        self.pending = collections.OrderedDict()  # scan seq -> trace, until painted
+        self.traces = collections.deque(maxlen=maxlen)
+
+    def recorded(self, seq, trace):
+        self.pending[seq] = trace
+        while len(self.pending) > PENDING_TRACES:
+            self.pending.popitem(last=False)  # Coalesced away or no GUI open: never painted
+
+    def painted(self, seq, when):
+        """ First paint report wins when several GUIs are subscribed """
+        trace = self.pending.pop(seq, None)
+        if trace is not None:
+            trace["painted"] = when
+            self.traces.append(trace)
+
+    def clear(self):
+        self.pending.clear()
+        self.traces.clear()
+
+    def summary(self):
+        """ {segment: {"count", "p50_ms", ...}} over the kept traces, segments with no data left out """
+        result = {}
+        for name, start, end in SEGMENTS:
+            values = [t[end] - t[start] for t in self.traces if start in t and end in t]
+            if values:
+                result[name] = percentiles(values)
+        return result
+
+    def dump(self, path=TRACE_FILE):
+        """ One CSV row per trace: detection time, then ms from detection to each stage """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["detected_epoch"] + [f"{stage}_ms" for stage in STAGES[1:]])
+            for t in self.traces:
+                origin = t.get("detected")
+                writer.writerow([f"{origin:.3f}" if origin is not None else ""] +
+                                [f"{(t[stage] - origin) * 1000:.1f}" if origin is not None and stage in t else ""
+                                 for stage in STAGES[1:]])
+        return len(self.traces)
@@ -0,0 +1,101 @@
+"""
+Frame-paced delivery of background events to the Tk thread.
+
+Network and daemon threads post events here instead of calling
+root.after(0, ...) once per message. The Tk thread drains the queue every
+UI_FRAME_MS and, for events posted with a coalesce key, applies only the
+latest one of each key per frame, so a burst of taps repaints the labels
+once instead of once per tap. Events without a key (write progress, export
+results) are all applied, in order.
+"""
+import collections
+import queue
+import time
+from .config import UI_FRAME_MS
+
+LATENCY_SAMPLES = 1000  # Most recent queue-to-paint times kept for percentiles
+
+
+class UIEventQueue:
+    def __init__(self, root, frame_ms=UI_FRAME_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.events = queue.SimpleQueue()
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)  # seconds, posted -> painted
+        self.posted = 0
+        self.applied = 0
+        self.frames = 0  # Frames that had something to paint
+        self.timer = None
+        self.paint_hooks = []
+
+    def post(self, handler, *args, key=None):
+        """ Thread-safe. handler(*args) runs on the Tk thread at the next frame """
+        self.events.put((time.perf_counter(), key, handler, args))
+
+    def on_painted(self, callback):
+        """ callback() runs once the frame being applied is drawn. Tk thread only """
+        self.paint_hooks.append(callback)
+
+    def start(self):
+        if self.timer is None:
+            self.timer = self.root.after(self.frame_ms, self._frame)
+
+    def stop(self):
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def _frame(self):
+        try:
+            self.drain()
+        finally:
+            self.timer = self.root.after(self.frame_ms, self._frame)
+
+    def drain(self):
+        """ Applies everything queued so far (latest per key) and paints. Tk thread only """
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+
+        latest = {key: i for i, (_, key, _, _) in enumerate(batch) if key is not None}
+        applied = 0
+        for i, (_, key, handler, args) in enumerate(batch):
+            if key is not None and latest[key] != i:
+                continue  # Superseded later in this frame
+            try:
+                handler(*args)
+            except Exception as e:
+                print(f"UI update error: {e}")
+            applied += 1
+        self.root.update_idletasks()  # Paint now, so the latency below is what a student sees
+
+        painted = time.perf_counter()
+        self.latencies.extend(painted - posted for posted, _, _, _ in batch)
+        hooks, self.paint_hooks = self.paint_hooks, []
+        for callback in hooks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"UI update error: {e}")
+        self.posted += len(batch)
+        self.applied += applied
+        self.frames += 1
+        return applied
+
+    def stats(self):
+        """ Queue-to-paint latency and coalescing counts, like the server's STATS histograms """
+        samples = sorted(self.latencies)
+        result = {"posted": self.posted, "applied": self.applied, "frames": self.frames,
+                  "count": len(samples)}
+        if samples:
+            result.update({
+                "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+            })
+        return result
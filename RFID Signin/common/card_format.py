@@ -0,0 +1,147 @@
+"""
+What is stored on a member card.
+
+SimpleMFRC522 gives each card 3 data blocks of 16 bytes (sector 2). Cards
+written before version 1 hold plain text "email,first,last,officer",
+space padded. Version 1 packs the same fields into a framed record:
+
+    byte 0      VERSION (1; legacy text always starts with a printable byte)
+    byte 1      flags (FLAG_OFFICER)
+    byte 2      body length N
+    bytes 3..   body: member id, first name, last name, UTF-8, joined by 0x1f
+    last 2      CRC-16/CCITT over everything before it, big-endian
+
+The member id is the college username (the student email without its
+domain), or the full email for other addresses. Most records fit in one
+or two blocks, so a reader that looks at the first block's length byte
+can skip the rest, and the CRC lets the server drop a torn or misread
+card instead of logging garbage. Names may contain commas.
+"""
+import binascii
+
+VERSION = 1
+FLAG_OFFICER = 0x01
+SEPARATOR = "\x1f"
+CARD_FIELDS = ("member_id", "first", "last")
+
+BLOCK_SIZE = 16
+DATA_BLOCKS = 3
+CAPACITY = BLOCK_SIZE * DATA_BLOCKS
+HEADER_BYTES = 3
+CRC_BYTES = 2
+MAX_BODY = CAPACITY - HEADER_BYTES - CRC_BYTES
+
+
+class CardFormatError(ValueError):
+    """ Card content that is corrupt, or fields that don't fit on a card """
+
+
+def make_card(member_id, first, last, officer=False):
+    """ The card fields as sent in READ messages and write commands """
+    if not all(isinstance(field, str) for field in (member_id, first, last)):
+        raise CardFormatError("Card fields must be text")
+    return {"member_id": member_id.strip(), "first": first.strip(), "last": last.strip(), "officer": bool(officer)}
+
+
+def check_card(card):
+    """ Card fields from a peer (e.g. a write command's "card"), normalised; raises CardFormatError if malformed """
+    if not isinstance(card, dict):
+        raise CardFormatError("Card fields must be an object")
+    missing = [field for field in CARD_FIELDS if field not in card]
+    if missing:
+        raise CardFormatError(f"Card is missing {', '.join(missing)}")
+    return make_card(card["member_id"], card["first"], card["last"], card.get("officer", False))
+
+
+def card_text(card):
+    """ Legacy text form, for old peers and the log's Raw Data column """
+    fields = [card["member_id"], card["first"], card["last"]]
+    return ",".join(f.replace(",", " ") for f in fields) + f",{card['officer']}"
+
+
+def parse_text(text):
+    """ Fields of a legacy text card, or None if it doesn't hold a member """
+    parts = text.split(",")
+    if len(parts) < 3:
+        return None
+    officer = len(parts) > 3 and parts[3].strip().lower() == "true"
+    return make_card(parts[0], parts[1], parts[2], officer)
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def encode_card(card):
+    """ Version 1 record for card (see make_card) """
+    fields = [card["member_id"], card["first"], card["last"]]
+    if any(SEPARATOR in field for field in fields):
+        raise CardFormatError("Card fields can't contain the 0x1f separator")
+    body = SEPARATOR.join(fields).encode("utf-8")
+    if len(body) > MAX_BODY:
+        raise CardFormatError(f"Card data too long ({len(body)} of {MAX_BODY} bytes)")
+    record = bytes([VERSION, FLAG_OFFICER if card.get("officer") else 0, len(body)]) + body
+    return record + crc16(record).to_bytes(CRC_BYTES, "big")
+
+
+def encode_write(content, card=None):
+    """
+    Bytes to write for a write command: a version 1 record from its card
+    fields (or from legacy text that parses as a member), empty to erase,
+    otherwise the text as is.
+    """
+    if not isinstance(content, str):
+        raise CardFormatError("Card content must be text")
+    if card is None:
+        card = parse_text(content)
+    else:
+        card = check_card(card)
+    if card is not None:
+        return encode_card(card)
+    data = content.strip().encode("ascii", "replace")
+    if len(data) > CAPACITY:
+        raise CardFormatError(f"Card data too long ({len(data)} of {CAPACITY} bytes)")
+    return data
+
+
+def blocks_needed(first_block):
+    """ How many data blocks hold the card's content, judging by its first block """
+    if first_block and first_block[0] == VERSION and len(first_block) >= HEADER_BYTES:
+        total = HEADER_BYTES + first_block[2] + CRC_BYTES
+        return min(DATA_BLOCKS, -(-total // BLOCK_SIZE))
+    return DATA_BLOCKS
+
+
+def payload(raw):
+    """ raw (as read from the blocks) without the padding after the content """
+    if raw and raw[0] == VERSION and len(raw) >= HEADER_BYTES:
+        return bytes(raw[:HEADER_BYTES + raw[2] + CRC_BYTES])
+    return bytes(raw).rstrip(b" \x00")
+
+
+def decode_card(raw):
+    """
+    Card fields from raw content. Returns (card, text): card is None for
+    blank cards and legacy text that isn't a member, text is the legacy
+    text form. Raises CardFormatError for corrupt content.
+    """
+    raw = payload(raw)
+    if not raw:
+        return None, ""
+    if raw[0] == VERSION:
+        if len(raw) < HEADER_BYTES + CRC_BYTES or len(raw) != HEADER_BYTES + raw[2] + CRC_BYTES:
+            raise CardFormatError("Truncated card record")
+        if crc16(raw[:-CRC_BYTES]) != int.from_bytes(raw[-CRC_BYTES:], "big"):
+            raise CardFormatError("Card CRC mismatch")
+        try:
+            fields = raw[HEADER_BYTES:-CRC_BYTES].decode("utf-8").split(SEPARATOR)
+        except UnicodeDecodeError:
+            raise CardFormatError("Card record is not UTF-8")
+        if len(fields) != 3:
+            raise CardFormatError("Card record has the wrong number of fields")
+        card = make_card(fields[0], fields[1], fields[2], raw[1] & FLAG_OFFICER)
+        return card, card_text(card)
+    if any(b < 0x20 or b > 0x7e for b in raw):
+        raise CardFormatError("Unreadable card data")
+    text = raw.decode("ascii")
+    return parse_text(text), text
@@ -0,0 +1,139 @@
+"""
+LAN discovery of RFID servers.
+
+The client broadcasts a small UDP probe ({"action": "discover"}) to
+DISCOVERY_PORT; every server listening there answers the sender directly
+with an announcement:
+
+    {"type": "ANNOUNCE", "name": ..., "version": ..., "port": ..., "capabilities": [...]}
+
+The server's address is taken from the reply's source address, so a Pi
+that got a new DHCP lease is found again without anyone typing its IP.
+Probes are also sent to 127.0.0.1, which covers a server on the same
+machine and lets the whole exchange be tested over loopback.
+"""
+import json
+import socket
+import threading
+import time
+
+from .protocol import PROTOCOL_VERSION, CAPABILITIES, encode_message
+
+DISCOVERY_PORT = 65433
+DISCOVERY_TIMEOUT = 1.0  # Seconds the client listens for answers
+PROBE_REPEATS = 3  # UDP can drop a packet; probe a few times within the window
+DEFAULT_TARGETS = ("255.255.255.255", "127.0.0.1")
+
+
+def probe_message():
+    return {"action": "discover", "version": PROTOCOL_VERSION}
+
+
+def announce_message(name, port, capabilities=None):
+    return {
+        "type": "ANNOUNCE",
+        "name": name,
+        "version": PROTOCOL_VERSION,
+        "port": port,
+        "capabilities": list(CAPABILITIES if capabilities is None else capabilities),
+    }
+
+
+class DiscoveryResponder:
+    """
+    Answers discovery probes on a daemon thread. info() is called for every
+    probe, so the announcement always carries the server's current port.
+    """
+
+    def __init__(self, info, port=DISCOVERY_PORT, host=""):
+        self.info = info
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.running = False
+        self.answered = 0
+
+    def start(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((self.host, self.port))
+        self.port = self.sock.getsockname()[1]
+        self.running = True
+        threading.Thread(target=self.serve, daemon=True).start()
+        return self
+
+    def serve(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                break  # Socket closed by stop()
+            if not self.running:
+                break
+            try:
+                msg = json.loads(data.decode("utf-8"))
+            except Exception:
+                continue  # Not ours
+            if not isinstance(msg, dict) or msg.get("action") != "discover":
+                continue
+            try:
+                self.sock.sendto(encode_message(self.info()), addr)
+                self.answered += 1
+            except OSError as e:
+                print(f"[DISCOVERY] Reply to {addr[0]} failed: {e}")
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            # shutdown() wakes the thread blocked in recvfrom, so the port is free right away
+            try: self.sock.shutdown(socket.SHUT_RDWR)
+            except: pass
+            try: self.sock.close()
+            except: pass
+
+
+def discover(timeout=DISCOVERY_TIMEOUT, port=DISCOVERY_PORT, targets=DEFAULT_TARGETS):
+    """
+    Probes for servers and collects answers for `timeout` seconds.
+    Returns announcements in arrival order, each with an added "ip" key.
+    """
+    found = {}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        probe = encode_message(probe_message())
+        deadline = time.monotonic() + timeout
+        next_probe = 0.0
+        probes_left = PROBE_REPEATS
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if probes_left and now >= next_probe:
+                for target in targets:
+                    try:
+                        sock.sendto(probe, (target, port))
+                    except OSError:
+                        pass  # e.g. no broadcast route on this interface
+                probes_left -= 1
+                next_probe = now + timeout / (PROBE_REPEATS + 1)
+            sock.settimeout(max(0.01, min(deadline, next_probe if probes_left else deadline) - now))
+            try:
+                data, addr = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                msg = json.loads(data.decode("utf-8"))
+            except Exception:
+                continue
+            if not isinstance(msg, dict) or msg.get("type") != "ANNOUNCE":
+                continue
+            msg["ip"] = addr[0]
+            found.setdefault((addr[0], msg.get("port")), msg)
+    finally:
+        sock.close()
+
+    # A server on this machine answers both the broadcast and the loopback probe; keep its LAN address
+    lan = {(m.get("name"), m.get("port")) for m in found.values() if not m["ip"].startswith("127.")}
+    return [m for m in found.values() if not (m["ip"].startswith("127.") and (m.get("name"), m.get("port")) in lan)]
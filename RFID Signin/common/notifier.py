@@ -0,0 +1,179 @@
+"""
+Discord webhook notifier shared by the RFID client and the ELC Doorbell.
+
+Messages go onto a bounded queue and are posted by one worker thread over
+a persistent requests.Session, so callers (Tk handlers, GPIO callbacks)
+never block on the network and a burst of events reuses one connection.
+
+- Retries: connection errors and 5xx are retried with backoff, every
+  request has a bounded timeout, other 4xx errors are given up on.
+- Rate limits: a 429 waits for Discord's retry_after before retrying, and
+  an exhausted bucket (X-RateLimit-Remaining: 0) pauses the next send.
+- Coalescing: a message whose text matches one still queued, or one sent
+  within COALESCE_WINDOW seconds (ignoring case and whitespace), is
+  dropped; e.g. an officer double-tapping or a doorbell pressed twice.
+"""
+import queue
+import re
+import threading
+import time
+
+import requests
+
+QUEUE_SIZE = 20
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0
+MAX_RETRY_AFTER = 60  # Never sleep longer than this on a rate limit
+COALESCE_WINDOW = 30
+
+QUEUED = "queued"
+COALESCED = "coalesced"
+DROPPED = "dropped"
+
+
+def coalesce_key(content):
+    return re.sub(r"\s+", " ", content or "").strip().lower()
+
+
+class DiscordNotifier:
+    def __init__(self, url, username=None, on_result=None, queue_size=QUEUE_SIZE,
+                 timeout=REQUEST_TIMEOUT, max_attempts=MAX_ATTEMPTS, coalesce_window=COALESCE_WINDOW):
+        self.url = url
+        self.username = username
+        self.on_result = on_result  # Optional: called as on_result(ok, detail, payload) from the worker
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.coalesce_window = coalesce_window
+        self.session = requests.Session()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.pending_keys = set()
+        self.recent = {}  # coalesce key -> monotonic time it was sent
+        self.paused_until = 0.0
+        self.stats = {"sent": 0, "failed": 0, "coalesced": 0, "dropped": 0, "retries": 0, "rate_limited": 0}
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def notify(self, content, username=None, **extra):
+        """ Queues a message; returns QUEUED, COALESCED or DROPPED (queue full) """
+        key = coalesce_key(content)
+        now = time.monotonic()
+        with self.lock:
+            sent_at = self.recent.get(key)
+            if key in self.pending_keys or (sent_at is not None and now - sent_at < self.coalesce_window):
+                self.stats["coalesced"] += 1
+                return COALESCED
+            payload = {"content": content, **extra}
+            if username or self.username:
+                payload["username"] = username or self.username
+            try:
+                self.queue.put_nowait((key, payload))
+            except queue.Full:
+                self.stats["dropped"] += 1
+                print(f"Discord queue full, dropped: {content}")
+                return DROPPED
+            self.pending_keys.add(key)
+        return QUEUED
+
+    def flush(self, timeout=None):
+        """ Waits until everything queued has been sent or given up on; returns True if drained """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout=5):
+        self.flush(timeout)
+        self.queue.put(None)
+        self.session.close()
+
+    # --- Worker thread ---
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            key, payload = item
+            try:
+                ok, detail = self._deliver(payload)
+            except Exception as e:
+                ok, detail = False, str(e)
+            with self.lock:
+                self.pending_keys.discard(key)
+                if ok:
+                    self.recent[key] = time.monotonic()
+                    self._prune_recent()
+                self.stats["sent" if ok else "failed"] += 1
+            if not ok:
+                print(f"Discord Error: {detail}")
+            if self.on_result:
+                try:
+                    self.on_result(ok, detail, payload)
+                except Exception as e:
+                    print(f"Discord callback error: {e}")
+            self.queue.task_done()
+
+    def _prune_recent(self):
+        cutoff = time.monotonic() - self.coalesce_window
+        for key in [k for k, t in self.recent.items() if t < cutoff]:
+            del self.recent[key]
+
+    def _deliver(self, payload):
+        """ Posts one message with retries; returns (ok, detail) """
+        detail = "not sent"
+        for attempt in range(self.max_attempts):
+            wait = self.paused_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            if attempt:
+                self.stats["retries"] += 1
+
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                if isinstance(e, (requests.exceptions.MissingSchema, requests.exceptions.InvalidURL)):
+                    return False, f"Invalid webhook URL: {e}"
+                detail = f"Network error: {e}"
+                time.sleep(BACKOFF_BASE * (2 ** attempt))
+                continue
+
+            self._note_bucket(response)
+            if 200 <= response.status_code < 300:
+                return True, "sent"
+            if response.status_code == 429:
+                self.stats["rate_limited"] += 1
+                retry_after = self._retry_after(response)
+                detail = f"Rate limited, retry after {retry_after:.1f}s"
+                time.sleep(retry_after)
+                continue
+            detail = f"HTTP {response.status_code}: {response.text[:200]}"
+            if response.status_code < 500:
+                return False, detail  # Bad URL or payload: retrying won't help
+            time.sleep(BACKOFF_BASE * (2 ** attempt))
+        return False, detail
+
+    def _retry_after(self, response):
+        value = None
+        try:
+            value = response.json().get("retry_after")
+        except Exception:
+            pass
+        if value is None:
+            value = response.headers.get("Retry-After")
+        try:
+            return max(0.0, min(float(value), MAX_RETRY_AFTER))
+        except (TypeError, ValueError):
+            return BACKOFF_BASE
+
+    def _note_bucket(self, response):
+        """ Pauses sending when Discord says this webhook's bucket is empty """
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = min(float(response.headers.get("X-RateLimit-Reset-After", 0)), MAX_RETRY_AFTER)
+            except ValueError:
+                return
+            self.paused_until = time.monotonic() + reset_after
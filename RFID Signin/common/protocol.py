@@ -0,0 +1,157 @@
+"""
+Wire protocol shared by the Pi RFID server and the desktop client.
+
+Messages are UTF-8 JSON objects, one per line. Server -> client messages
+carry a "type" key (READ, WRITE_RESULT, ...), client -> server messages an
+"action" key (write, ...). That is the same format version 1 used, so an
+old peer still understands everything except the extras listed here:
+
+- HELLO handshake: each side announces its protocol version and
+  capabilities right after connecting. Extras are only used when the peer
+  advertised them.
+- Batches: several messages packed into one line
+  ({"type": "BATCH", "messages": [...]} / {"action": "batch", ...}).
+- Heartbeats: a side that has sent nothing for HEARTBEAT_INTERVAL sends a
+  ping ({"action": "ping"} / {"type": "PING"}), answered by a pong. Any
+  received message counts as a sign of life; a peer that has been silent
+  for HEARTBEAT_TIMEOUT is treated as dead and its socket is closed.
+- Tap traces: READ carries "trace": {"detected", "read", "sent"}, the
+  server's wall clock at each step. The pong's "server_time" lets the
+  client estimate the offset between the two clocks. Old clients ignore
+  the key.
+"""
+import json
+import socket
+
+PROTOCOL_VERSION = 2
+CAPABILITIES = ["batch", "heartbeat"]
+
+RECV_SIZE = 4096
+MAX_LINE = 64 * 1024  # Anything longer than this is garbage, not a message
+
+HEARTBEAT_INTERVAL = 2.0  # Seconds of send silence before pinging
+HEARTBEAT_TIMEOUT = 6.0  # Seconds of receive silence before the peer is declared dead
+HEARTBEAT_TICK = 0.5  # recv() timeout, i.e. how often liveness is checked
+
+
+def encode_message(msg):
+    """ Serializes one message to a framed line of bytes """
+    return (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def encode_batch(msgs, key="type"):
+    """ Packs several messages into a single framed line """
+    if len(msgs) == 1:
+        return encode_message(msgs[0])
+    batch = {key: "BATCH" if key == "type" else "batch", "messages": list(msgs)}
+    return encode_message(batch)
+
+
+def hello_message(role, capabilities=None):
+    """ Handshake sent by both sides right after connecting """
+    key = "type" if role == "server" else "action"
+    return {
+        key: "HELLO" if role == "server" else "hello",
+        "role": role,
+        "version": PROTOCOL_VERSION,
+        "capabilities": list(CAPABILITIES if capabilities is None else capabilities),
+    }
+
+
+def is_hello(msg):
+    return msg.get("type") == "HELLO" or msg.get("action") == "hello"
+
+
+class LineFramer:
+    """
+    Splits a byte stream into decoded text lines.
+
+    Data is appended to a bytearray; everything up to the last b"\\n" is cut
+    out, decoded and split in one go, so a burst costs linear time instead
+    of re-copying the whole string per message. Splitting happens on raw
+    bytes, before decoding: 0x0A never occurs inside a multi-byte UTF-8
+    sequence, so a character split across two recv() calls stays in the
+    buffer until the next chunk completes it.
+    """
+
+    def __init__(self, max_line=MAX_LINE):
+        self.max_line = max_line
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """ Adds received bytes and returns the list of complete lines """
+        buf = self._buffer
+        buf += data
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > self.max_line:
+                print(f"[PROTOCOL] Dropping {len(buf)} bytes without a line break")
+                buf.clear()
+            return []
+        text = buf[:end].decode("utf-8", errors="replace")
+        del buf[:end + 1]
+        return [line for line in text.split("\n") if line]
+
+    def reset(self):
+        self._buffer.clear()
+
+
+class MessageDecoder:
+    """ Incremental bytes -> message decoder (framing, JSON, batch expansion) """
+
+    def __init__(self, max_line=MAX_LINE):
+        self.framer = LineFramer(max_line)
+
+    def feed(self, data):
+        """ Returns every complete message in the received chunk, batches unpacked """
+        messages = []
+        for line in self.framer.feed(data):
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(msg, dict):
+                continue
+            if msg.get("type") == "BATCH" or msg.get("action") == "batch":
+                messages.extend(m for m in msg.get("messages", []) if isinstance(m, dict))
+            else:
+                messages.append(msg)
+        return messages
+
+    def reset(self):
+        self.framer.reset()
+
+
+def recv_messages(sock, decoder, recv_buffer):
+    """
+    Reads one chunk from sock into a preallocated bytearray and decodes it.
+    Returns None when the peer closed the connection.
+    """
+    n = sock.recv_into(recv_buffer)
+    if not n:
+        return None
+    return decoder.feed(memoryview(recv_buffer)[:n])
+
+
+def enable_keepalive(sock, idle=5, interval=2, count=3):
+    """
+    Turns on TCP keepalive with short timers, as a backstop for the
+    application heartbeat (OS defaults wait two hours). Options missing on
+    the current platform are skipped.
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+        elif hasattr(socket, "TCP_KEEPALIVE"):  # macOS
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, idle)
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval)
+        if hasattr(socket, "TCP_KEEPCNT"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, count)
+        if hasattr(socket, "TCP_USER_TIMEOUT"):  # Linux: cap how long unacked data may sit
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, (idle + interval * count) * 1000)
+        if hasattr(sock, "ioctl") and hasattr(socket, "SIO_KEEPALIVE_VALS"):  # Windows
+            sock.ioctl(socket.SIO_KEEPALIVE_VALS, (1, idle * 1000, interval * 1000))
+    except OSError as e:
+        print(f"[PROTOCOL] Keepalive setup failed: {e}")
@@ -0,0 +1,68 @@
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from client.journal import BackupWriter, TORN_SUFFIX, read_rows
+
+
+def scan(n):
+    return {"Date": datetime.date.today().isoformat(), "Time": "09:00:00 AM", "Action": "SIGN IN",
+            "First Name": f"First{n}", "Last Name": f"Last{n}", "Email": f"u{n}@x", "Raw Data": f"u{n},First{n},Last{n},False"}
+
+
+class TornRowTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "daily_backup.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def write(self, *numbers):
+        writer = BackupWriter(self.path, flush_seconds=0)
+        for n in numbers:
+            writer.append(scan(n))
+        writer.close()
+
+    def tear_last_row_inside_raw_data(self):
+        """ Cuts the file inside the last row's quoted Raw Data, as a crash mid-write would """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        cut = data.rindex(b'"u') + 4
+        with open(self.path, "wb") as f:
+            f.write(data[:cut])
+
+    def emails(self):
+        return [row["Email"] for row in read_rows(self.path)]
+
+    def test_restart_after_tear_in_quoted_field(self):
+        self.write(1, 2, 3)
+        self.tear_last_row_inside_raw_data()
+        self.write(4, 5)
+        self.assertEqual(self.emails(), ["u1@x", "u2@x", "u4@x", "u5@x"])
+        with open(self.path + TORN_SUFFIX, "rb") as f:
+            self.assertIn(b"u3@x", f.read())
+
+    def test_reader_skips_tear_left_by_an_older_writer(self):
+        # Before the writer trimmed torn rows it only started a new line after one
+        self.write(1, 2, 3)
+        self.tear_last_row_inside_raw_data()
+        row = scan(4)
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            f.write(f"\r\n{row['Date']},{row['Time']},SIGN IN,First4,Last4,u4@x,\"u4,First4,Last4,False\"\r\n")
+        self.assertEqual(self.emails(), ["u1@x", "u2@x", "u4@x"])
+
+    def test_cut_between_cr_and_lf_keeps_the_row(self):
+        self.write(1, 2)
+        with open(self.path, "rb+") as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        self.write(3)
+        self.assertEqual(self.emails(), ["u1@x", "u2@x", "u3@x"])
+
+
+if __name__ == "__main__":
+    unittest.main()